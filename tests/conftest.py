@@ -0,0 +1,20 @@
+import copy
+import os
+
+import pytest
+
+from trade.config import load_config
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.toml")
+_CONFIG = load_config(CONFIG_PATH)
+
+
+@pytest.fixture
+def config():
+    """The shipped config on a small, seeded map, without history or metrics."""
+    config = copy.deepcopy(_CONFIG)
+    config["map"]["size"] = 60
+    config["generation"]["seed"] = 1
+    config["history"]["enabled"] = False
+    config["metrics"]["enabled"] = False
+    return config
@@ -0,0 +1,88 @@
+from panda3d.core import CardMaker, NodePath, Texture
+
+from trade.assets import AssetManager
+
+TEXTURE_BYTES = 64 * 64 * 4
+
+
+class FakeLoader:
+    """Loads cards for any model path except `missing`, finishing async loads on `finish`."""
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.requests = []
+
+    def loadModel(self, path, callback=None, extraArgs=(), okMissing=False):
+        model = None
+        if path not in self.missing:
+            model = NodePath(path)
+            model.attachNewNode(CardMaker(path).generate())
+        if callback is None:
+            return model
+        self.requests.append((callback, model, list(extraArgs)))
+
+    def loadTexture(self, path):
+        tex = Texture(path)
+        tex.setup2dTexture(64, 64, Texture.T_unsigned_byte, Texture.F_rgba)
+        return tex
+
+    def finish(self):
+        requests, self.requests = self.requests, []
+        for callback, model, args in requests:
+            callback(model, *args)
+
+
+def manager(loader, budget_bytes, async_load=True):
+    config = {"assets": {"memory_budget_mb": budget_bytes / (1024 * 1024), "async_load": async_load}}
+    return AssetManager(loader, config)
+
+
+def test_models_and_textures_share_one_lru_order():
+    assets = manager(FakeLoader(), 3 * TEXTURE_BYTES, async_load=False)
+    assets.get_texture("a")
+    assets.release(assets.get_instance("models/card", NodePath("root")))
+    assets.get_texture("b")
+    assets.get_texture("a")
+    assert list(assets._sizes) == ["model:models/card", "tex:b", "tex:a"]
+
+    # The unused model is the least recently used entry, so it goes before any texture
+    assets.get_texture("c")
+    assert "models/card" not in assets.models
+    assert set(assets.textures) == {"a", "b", "c"}
+
+    assets.get_texture("d")
+    assert set(assets.textures) == {"a", "c", "d"}
+    assert assets.memory_used <= assets.memory_budget
+
+
+def test_models_in_use_are_not_evicted():
+    assets = manager(FakeLoader(), 2 * TEXTURE_BYTES, async_load=False)
+    holder = assets.get_instance("models/card", NodePath("root"))
+    assets.get_texture("a")
+    assets.get_texture("b")
+    assert "models/card" in assets.models
+    assert set(assets.textures) == {"b"}
+
+    assets.release(holder)
+    assets.get_texture("c")
+    assert "models/card" not in assets.models
+    assert set(assets.textures) == {"b", "c"}
+
+
+def test_failed_async_load_falls_back_to_the_placeholder():
+    loader = FakeLoader(missing={"models/broken"})
+    assets = manager(loader, 10 * TEXTURE_BYTES)
+    done = []
+    holder = assets.get_instance("models/broken", NodePath("root"))
+    assets.preload(["models/broken"], lambda: done.append(True))
+    loader.finish()
+
+    assert done == [True]
+    assert "models/broken" not in assets.models
+    assert "models/broken" not in assets._pending
+    assert holder.getNumChildren() == 1
+    assert holder.getChild(0).getName() == "models/box"
+
+    # Nothing was cached for the failed path, so it is requested again
+    assets.get_instance("models/broken", NodePath("root"))
+    assert len(loader.requests) == 1
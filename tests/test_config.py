@@ -0,0 +1,49 @@
+import os
+
+from trade.config import ConfigWatcher, load_config
+from tests.conftest import CONFIG_PATH
+
+
+def _rewrite(path, text):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000_000))
+
+
+def test_only_handled_sections_are_applied(tmp_path, capsys):
+    path = tmp_path / "config.toml"
+    text = open(CONFIG_PATH, encoding="utf-8").read()
+    path.write_text(text, encoding="utf-8")
+    config = load_config(str(path))
+    watcher = ConfigWatcher(config, str(path))
+    seen = []
+    watcher.on_change({"simulation"}, seen.append)
+
+    _rewrite(path, text.replace("growth_chance = 0.01", "growth_chance = 0.02")
+                       .replace("parallel_workers = 0", "parallel_workers = 4")
+                       .replace("height_scale = 10.0", "height_scale = 20.0")
+                       .replace("sun_tilt = -60.0", "sun_tilt = -30.0"))
+    assert watcher.poll() == {"simulation"}
+    assert seen == [{"simulation"}]
+    assert config["simulation"]["growth_chance"] == 0.02
+    assert config["simulation"]["parallel_workers"] == 0 # Frozen key
+    assert config["visuals"]["height_scale"] == 10.0 # Frozen section
+    assert config["lighting"]["sun_tilt"] == -60.0 # Nothing handles it
+
+    output = capsys.readouterr().out
+    assert "lighting, simulation.parallel_workers, visuals take effect on restart" in output
+    assert "Config reloaded: simulation\n" in output
+
+
+def test_section_with_only_frozen_changes_is_not_reloaded(tmp_path):
+    path = tmp_path / "config.toml"
+    text = open(CONFIG_PATH, encoding="utf-8").read()
+    path.write_text(text, encoding="utf-8")
+    config = load_config(str(path))
+    watcher = ConfigWatcher(config, str(path))
+    seen = []
+    watcher.on_change({"simulation"}, seen.append)
+
+    _rewrite(path, text.replace("region_size = 64", "region_size = 32"))
+    assert watcher.poll() == set()
+    assert seen == []
+    assert config["simulation"]["region_size"] == 64
@@ -0,0 +1,54 @@
+from trade.constants import ResourceType
+from trade.difftest import DiffTest, Variant
+from trade.generation import WorldGenerator
+from trade.simulation import WorldSimulation
+
+original_generate = WorldGenerator.generate
+original_production = WorldSimulation._process_production_and_consumption
+
+
+def generate_without_gold(generator):
+    """Drops a potential key, so only the other side has it."""
+    world_map = original_generate(generator)
+    for tile in world_map.tiles.values():
+        del tile.potentials[ResourceType.GOLD]
+    return world_map
+
+
+def production_with_extra_grain(simulation):
+    original_production(simulation)
+    buildings = [b for tile in simulation.world_map.tiles.values() for b in tile.buildings]
+    buildings[len(buildings) // 2].add_resource(ResourceType.GRAIN, 1)
+
+
+def production_without_silver_buffers(simulation):
+    original_production(simulation)
+    for tile in simulation.world_map.tiles.values():
+        for b in tile.buildings:
+            b._resource_buffers.pop(ResourceType.SILVER, None)
+
+
+def test_identical_sides_do_not_diverge(config):
+    test = DiffTest(config, Variant("reference"), Variant("candidate"), seed=1, turns=3)
+    assert test.run() is None
+    assert test.turns_run == 3
+
+
+def test_divergent_candidate_is_detected(config):
+    candidate = Variant("candidate", replacements={"production": production_with_extra_grain})
+    divergence = DiffTest(config, Variant("reference"), candidate, seed=1, turns=3).run()
+    assert divergence is not None
+    assert divergence.turn == "turn 1"
+    assert divergence.aspect == "inventories"
+    assert divergence.candidate == divergence.reference + 1
+
+
+def test_keys_only_the_candidate_has_are_compared(config):
+    reference = Variant("reference", replacements={"generate": generate_without_gold})
+    divergence = DiffTest(config, reference, Variant("candidate"), seed=1, turns=1).run()
+    assert (divergence.aspect, divergence.reference, divergence.candidate) == ("potentials", None, 0.0)
+
+    reference = Variant("reference", replacements={"production": production_without_silver_buffers})
+    divergence = DiffTest(config, reference, Variant("candidate"), seed=1, turns=1).run()
+    assert divergence.aspect == "inventories"
+    assert divergence.where.endswith("SILVER")
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from panda3d.core import Vec3
+
+from trade.heightfield import HeightField, quad_normals
+
+
+def test_sample_interpolates_corner_heights():
+    elevations = np.array([[0.0, 1.0], [2.0, 3.0]]) # [x, y]
+    field = HeightField(elevations, scale=10.0)
+    assert field.sample([0, 1, 0, 1], [0, 0, 1, 1]).tolist() == [0.0, 20.0, 10.0, 30.0]
+    assert field.height_at(0.5, 0.5) == pytest.approx(15.0)
+    assert field.height_at(0.25, 0.0) == pytest.approx(5.0)
+
+    # The far edge repeats the last tiles, and positions beyond the map are clamped
+    assert field.height_at(2.0, 2.0) == pytest.approx(30.0)
+    assert field.height_at(1.5, 0.0) == pytest.approx(20.0)
+    assert field.height_at(-3.0, 9.0) == pytest.approx(10.0)
+
+
+def test_sample_takes_arrays():
+    rng = np.random.default_rng(1)
+    field = HeightField(rng.random((8, 8)))
+    xs, ys = rng.uniform(0, 8, 50), rng.uniform(0, 8, 50)
+    assert np.allclose(field.sample(xs, ys), [field.height_at(x, y) for x, y in zip(xs, ys)])
+
+
+def test_normals_match_the_rendered_quads():
+    rng = np.random.default_rng(2)
+    field = HeightField(rng.random((6, 6)), scale=3.0)
+    normals = field.normals()
+    assert normals.shape == (6, 6, 3)
+    assert np.allclose(np.linalg.norm(normals, axis=-1), 1.0)
+    c = field.corners
+    for x, y in [(0, 0), (2, 3), (5, 5)]:
+        v0 = Vec3(x, y, c[x, y])
+        n = (Vec3(x + 1, y, c[x + 1, y]) - v0).cross(Vec3(x, y + 1, c[x, y + 1]) - v0)
+        n.normalize()
+        assert np.allclose(normals[x, y], n, atol=1e-6)
+
+
+def test_normals_of_flat_and_sloped_ground():
+    assert np.array_equal(quad_normals(np.zeros((3, 3))), np.tile([0.0, 0.0, 1.0], (2, 2, 1)))
+    # Rising by 1 per tile along x tilts the normal back towards -x
+    slope = np.add.outer(np.arange(3.0), np.zeros(3))
+    assert np.allclose(quad_normals(slope), np.tile([-1.0, 0.0, 1.0], (2, 2, 1)) / np.sqrt(2))
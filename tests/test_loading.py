@@ -0,0 +1,67 @@
+import time
+
+from direct.task.Task import TaskManager
+
+from trade.loading import StartupPipeline
+
+
+def counting_stage(log, name, slices, pause=0.0):
+    def stage():
+        for i in range(slices):
+            if pause:
+                time.sleep(pause)
+            log.append(name)
+            yield (i + 1) / slices
+    return stage
+
+
+def run_frames(task_mgr, limit=100):
+    frames = 0
+    while "StartupPipeline" in [task.name for task in task_mgr.getAllTasks()] and frames < limit:
+        task_mgr.step()
+        frames += 1
+    return frames
+
+
+def test_stages_run_in_order_and_report_progress():
+    log, progress, done = [], [], []
+    task_mgr = TaskManager()
+    pipeline = StartupPipeline(task_mgr, frame_budget=10.0,
+                               on_progress=lambda name, p: progress.append((name, p)),
+                               on_done=lambda: done.append(True))
+    pipeline.add_stage("first", counting_stage(log, "first", 2))
+    pipeline.add_stage("second", counting_stage(log, "second", 1))
+    pipeline.start()
+    assert run_frames(task_mgr) == 1
+
+    assert log == ["first", "first", "second"]
+    assert done == [True]
+    # Overall progress counts each stage as an equal share, and a stage ends on its exhaustion
+    assert progress == [("first", 0.25), ("first", 0.5), ("first", 0.5), ("second", 1.0), ("second", 1.0)]
+    assert list(pipeline.timings) == ["first", "second"]
+    assert pipeline.first_frame is not None
+    assert pipeline.report().startswith("Startup: first frame")
+
+
+def test_every_frame_makes_progress_within_its_budget():
+    log = []
+    task_mgr = TaskManager()
+    pipeline = StartupPipeline(task_mgr, frame_budget=0.0)
+    pipeline.add_stage("work", counting_stage(log, "work", 3))
+    pipeline.start()
+    task_mgr.step()
+    assert log == ["work"]
+    # Three slices, the stage's exhaustion, then the frame that finishes startup
+    assert run_frames(task_mgr) == 4
+    assert log == ["work"] * 3
+
+
+def test_slices_stop_once_the_budget_is_spent():
+    log = []
+    task_mgr = TaskManager()
+    pipeline = StartupPipeline(task_mgr, frame_budget=0.05)
+    pipeline.add_stage("slow", counting_stage(log, "slow", 20, pause=0.02))
+    pipeline.start()
+    task_mgr.step()
+    assert 1 <= len(log) <= 4
+    assert pipeline.timings["slow"] >= 0.02 * len(log)
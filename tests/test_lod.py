@@ -0,0 +1,74 @@
+import pytest
+from panda3d.core import NodePath, Point3
+
+from trade.constants import BuildingType
+from trade.lod import BuildingLOD
+from trade.map import WorldMap
+from trade.models import Building, Settlement, Tile
+
+
+@pytest.fixture
+def world_map(config):
+    world_map = WorldMap(40)
+    for x in range(40):
+        for y in range(40):
+            world_map.tiles[(x, y)] = Tile(x, y, 0.5, 0.4, config["thresholds"])
+    return world_map
+
+
+def place(lod, world_map, x, y, settlement=None):
+    building = Building(BuildingType.FARM, world_map.tiles[(x, y)], (0.5, 0.5), settlement)
+    return building, lod.group_for(building, Point3(x + 0.5, y + 0.5, 1.0))
+
+
+def test_buildings_group_by_settlement_and_cell(config, world_map):
+    config["lod"]["cluster_cell_size"] = 16
+    lod = BuildingLOD(NodePath("render"), config)
+    town = Settlement("Town", world_map.tiles[(30, 30)])
+    _, a = place(lod, world_map, 1, 1)
+    _, b = place(lod, world_map, 15, 15)
+    _, c = place(lod, world_map, 16, 15)
+    _, d = place(lod, world_map, 2, 2, town)
+    _, e = place(lod, world_map, 35, 35, town)
+    assert a == b and d == e
+    assert len({a, c, d}) == 3
+    assert set(lod.groups) == {("cell", 0, 0), ("cell", 1, 0), ("settlement", "Town")}
+
+
+def test_groups_switch_to_impostors_when_far_or_zoomed_out(config, world_map):
+    config["lod"].update(zoom_threshold=150.0, detail_radius=20.0, cluster_cell_size=16)
+    lod = BuildingLOD(NodePath("render"), config)
+    place(lod, world_map, 1, 1)
+    place(lod, world_map, 3, 2)
+    place(lod, world_map, 36, 36)
+    lod.refresh()
+    near, far = lod.groups[("cell", 0, 0)], lod.groups[("cell", 2, 2)]
+    assert near.center == Point3(2.5, 2.0, 1.0)
+    assert near.impostor.isStashed() and not near.detail.isStashed()
+
+    lod.update(Point3(2, 2, 10), 100.0)
+    assert near.showing_detail and not far.showing_detail
+    assert far.detail.isStashed() and not far.impostor.isStashed()
+
+    lod.update(Point3(2, 2, 10), 200.0)
+    assert not near.showing_detail
+    assert near.detail.isStashed() and not near.impostor.isStashed()
+
+
+def test_impostor_shade_follows_density(config, world_map):
+    config["lod"].update(density_full=0.5, resource_color=[1.0, 1.0, 1.0], cluster_cell_size=16)
+    lod = BuildingLOD(NodePath("render"), config)
+    building, _ = place(lod, world_map, 4, 4)
+    lod.refresh()
+    group = lod.groups[("cell", 0, 0)]
+    assert group.impostor.getColor()[0] == pytest.approx(1.0, abs=1e-3) # One building on its own tile
+
+    place(lod, world_map, 8, 4)
+    lod.refresh()
+    # Two buildings over a 5 x 1 footprint: 0.4 per tile of the 0.5 needed for full colour
+    assert group.impostor.getColor()[0] == pytest.approx(0.4 + 0.6 * 0.8, abs=1e-3)
+
+    lod.remove(building)
+    lod.refresh()
+    assert building not in group.members
+    assert group.impostor.getColor()[0] == pytest.approx(1.0, abs=1e-3)
@@ -0,0 +1,107 @@
+import heapq
+import math
+import random
+
+import pytest
+
+from trade.constants import BuildingType
+from trade.generation import WorldGenerator
+from trade.logistics import LogisticsNetwork, PathFinder, _NEIGHBOURS
+from trade.map import WorldMap
+from trade.models import Building, Tile
+
+
+def plain_astar(finder: PathFinder, start, goal):
+    """Tile-level A* over the whole map with the pathfinder's own step costs."""
+    best = {start: 0.0}
+    heap = [(finder._heuristic(start, goal), 0.0, start)]
+    while heap:
+        _, g, pos = heapq.heappop(heap)
+        if pos == goal:
+            return g
+        if g > best[pos]:
+            continue
+        for dx, dy, step in _NEIGHBOURS:
+            nxt = (pos[0] + dx, pos[1] + dy)
+            cost = finder._step_cost(pos, nxt, step)
+            if cost is not None and g + cost < best.get(nxt, math.inf):
+                best[nxt] = g + cost
+                heapq.heappush(heap, (g + cost + finder._heuristic(nxt, goal), g + cost, nxt))
+    return None
+
+
+def flat_map(config, size=24, ocean=()):
+    """Flat grassland with ocean on the given tiles."""
+    world_map = WorldMap(size)
+    for x in range(size):
+        for y in range(size):
+            elevation = 0.1 if (x, y) in ocean else 0.5
+            world_map.tiles[(x, y)] = Tile(x, y, elevation, 0.4, config["thresholds"])
+    return world_map
+
+
+@pytest.fixture
+def logistics_config(config):
+    config["logistics"]["cluster_size"] = 8
+    return config
+
+
+def test_route_costs_match_plain_astar(logistics_config):
+    world_map = WorldGenerator(logistics_config["map"]["size"], logistics_config).generate()
+    finder = PathFinder(world_map, logistics_config)
+    rng = random.Random(3)
+    tiles = list(world_map.tiles)
+    for _ in range(40):
+        start, goal = rng.sample(tiles, 2)
+        optimal = plain_astar(finder, start, goal)
+        route = finder.find_route(start, goal)
+        if optimal is None:
+            assert route is None
+            continue
+        # Entrances are a subset of the border, so a hierarchical route is never cheaper
+        # than the best tile path and only a little dearer
+        assert route is not None
+        assert route.cost >= optimal - 1e-9
+        assert route.cost <= optimal * 1.5
+        if finder._cluster_of(start) == finder._cluster_of(goal) and len(route.waypoints) == 2:
+            assert route.cost == pytest.approx(optimal)
+
+
+def test_route_across_a_cluster_border(logistics_config):
+    world_map = flat_map(logistics_config)
+    finder = PathFinder(world_map, logistics_config)
+    # Along the first row the border entrance lies on the straight line
+    route = finder.find_route((2, 0), (13, 0))
+    assert route.cost == pytest.approx(plain_astar(finder, (2, 0), (13, 0)))
+    assert route.waypoints == [(2, 0), (7, 0), (8, 0), (13, 0)]
+    assert route.clusters == {(0, 0), (1, 0)}
+
+
+def test_ocean_blocks_routes(logistics_config):
+    ocean = {(11, y) for y in range(24)}
+    finder = PathFinder(flat_map(logistics_config, ocean=ocean), logistics_config)
+    assert plain_astar(finder, (2, 2), (20, 2)) is None
+    assert finder.find_route((2, 2), (20, 2)) is None
+    assert finder.find_route((11, 5), (2, 2)) is None
+
+    # A gap in the wall is found even though it lies in another cluster row
+    ocean.discard((11, 20))
+    finder = PathFinder(flat_map(logistics_config, ocean=ocean), logistics_config)
+    route = finder.find_route((2, 2), (20, 2))
+    assert route is not None
+    assert route.cost >= plain_astar(finder, (2, 2), (20, 2)) - 1e-9
+    assert (1, 2) in route.clusters
+
+
+def test_building_added_invalidates_cached_routes(logistics_config):
+    world_map = flat_map(logistics_config)
+    logistics = LogisticsNetwork(world_map, logistics_config)
+    route = logistics.pathfinder.find_route((1, 3), (6, 3))
+    assert logistics.pathfinder.find_route((1, 3), (6, 3)) is route
+
+    road = Building(BuildingType.RESIDENTIAL_LOW, world_map.tiles[(3, 3)], (0.5, 0.5))
+    logistics.on_building_added(road)
+    rerouted = logistics.pathfinder.find_route((1, 3), (6, 3))
+    assert rerouted is not route
+    assert rerouted.cost < route.cost
+    assert rerouted.cost == pytest.approx(plain_astar(logistics.pathfinder, (1, 3), (6, 3)))
@@ -0,0 +1,24 @@
+from trade.constants import BuildingType, ResourceType
+from trade.generation import WorldGenerator
+from trade.logistics import LogisticsNetwork
+from trade.market import Market, RESOURCE_INDEX
+from trade.models import Building, Settlement
+
+
+def test_producers_supply_their_nearest_settlement(config):
+    world_map = WorldGenerator(config["map"]["size"], config).generate()
+    near, far = Settlement("Near", world_map.tiles[(10, 10)]), Settlement("Far", world_map.tiles[(50, 50)])
+    world_map.settlements += [near, far]
+    Building(BuildingType.RESIDENTIAL_LOW, world_map.tiles[(11, 10)], (0.5, 0.5), near)
+    farm = Building(BuildingType.FARM, world_map.tiles[(14, 12)], (0.5, 0.5))
+    farm.add_resource(ResourceType.GRAIN, 7)
+    logistics = LogisticsNetwork(world_map, config)
+    logistics.find_producers()
+
+    market = Market(world_map, config, logistics)
+    market.clear()
+    grain = RESOURCE_INDEX[ResourceType.GRAIN]
+    assert market.supply[0, grain] == 7
+    assert market.supply[1, grain] == 0
+    assert market.price(far, ResourceType.GRAIN) == market.prices[1, grain]
+    assert market.price(Settlement("Unknown", world_map.tiles[(0, 0)]), ResourceType.GRAIN) == market.base_prices[grain]
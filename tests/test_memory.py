@@ -0,0 +1,52 @@
+import sys
+import tracemalloc
+
+import pytest
+from panda3d.core import CardMaker, NodePath
+
+from trade.memory import MemoryTracker
+
+
+@pytest.fixture
+def tracker():
+    tracing = tracemalloc.is_tracing()
+    yield MemoryTracker({"memory": {"top": 5}})
+    if not tracing:
+        tracemalloc.stop()
+
+
+def test_objects_are_counted_once_under_the_first_owner(tracker):
+    shared = bytearray(300)
+    b = [bytearray(500), shared]
+    a = [bytearray(1000), shared, b]
+    report = tracker.report(1, {"a": [a], "b": [b]})
+
+    # Another subsystem's anchor stops the walk, and a shared object goes to whoever reaches it first
+    assert report.subsystems["a"] == sys.getsizeof(a) + sys.getsizeof(a[0]) + sys.getsizeof(shared)
+    assert report.subsystems["b"] == sys.getsizeof(b) + sys.getsizeof(b[0])
+    assert report.object_types["bytearray"] == (3, sum(sys.getsizeof(x) for x in (a[0], b[0], shared)))
+    assert report.changes == {}
+
+
+def test_reports_track_growth_per_subsystem(tracker):
+    a, b = [], []
+    tracker.report(1, {"a": [a], "b": [b]})
+    a.append(bytearray(10_000))
+    report = tracker.report(2, {"a": [a], "b": [b], "c": []})
+    assert report.changes["a"] >= 10_000
+    assert report.changes["b"] == 0
+    assert "c" not in report.changes
+
+    text = report.format(top=3)
+    assert text.startswith("Memory at turn 2")
+    assert "  a " in text and "largest types:" in text
+
+
+def test_scene_usage_counts_geometry(tracker):
+    scene = NodePath("scene")
+    card = scene.attachNewNode(CardMaker("card").generate())
+    card.instanceTo(scene.attachNewNode("holder"))
+    usage = tracker.report(1, {}, scene).scene
+    assert usage["nodes"] == 4 # scene, card, holder and the card instanced under it
+    assert usage["geom nodes"] == 1
+    assert usage["vertex bytes"] > 0
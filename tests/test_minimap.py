@@ -0,0 +1,67 @@
+import numpy as np
+from panda3d.core import NodePath
+
+from trade.constants import BuildingType
+from trade.map import WorldMap
+from trade.minimap import Minimap
+from trade.models import Building, Settlement, Tile
+
+
+def small_map(config, size=4):
+    """Ocean in the left column, grassland elsewhere."""
+    world_map = WorldMap(size)
+    for x in range(size):
+        for y in range(size):
+            world_map.tiles[(x, y)] = Tile(x, y, 0.1 if x == 0 else 0.5, 0.4, config["thresholds"])
+    return world_map
+
+
+def texel(minimap, x, y):
+    """RGBA bytes of one texel as stored in the texture."""
+    image = np.asarray(memoryview(minimap.texture.getRamImage())).reshape(minimap.texels, minimap.texels, 4)
+    return image[y, x][[2, 1, 0, 3]]
+
+
+def test_colors_blend_buildings_and_mark_settlements(config):
+    config["minimap"]["max_texels"] = 2
+    world_map = small_map(config)
+    minimap = Minimap(NodePath("2d"), world_map, config)
+    assert (minimap.scale, minimap.texels) == (2, 2)
+
+    Building(BuildingType.FARM, world_map.tiles[(2, 1)], (0.5, 0.5))
+    settlement = Settlement("Town", world_map.tiles[(3, 3)])
+    minimap.sync([b for tile in world_map.tiles.values() for b in tile.buildings], [settlement])
+
+    ocean = np.array(config["colors"]["OCEAN"][:3])
+    grass = np.array(config["colors"]["GRASSLAND"][:3])
+    building = np.array(config["minimap"]["building_color"])
+    density = 1 / (2 * 2 * config["minimap"]["density_full"])
+    rgb = np.array([[ocean, grass * (1 - density) + building * density],
+                    [ocean, config["minimap"]["settlement_color"]]])
+    expected = np.concatenate([rgb, np.ones((2, 2, 1))], axis=-1)
+    assert np.array_equal(minimap._colors(np.s_[:, :]), (expected.astype(np.float32) * 255).astype(np.uint8))
+    assert np.array_equal(texel(minimap, 1, 0), minimap._colors((0, 1)))
+
+
+def test_only_touched_texels_are_rewritten(config):
+    world_map = small_map(config, size=8)
+    minimap = Minimap(NodePath("2d"), world_map, config)
+    assert minimap.scale == 1
+    empty = texel(minimap, 2, 3).copy()
+
+    first = Building(BuildingType.FARM, world_map.tiles[(2, 3)], (0.2, 0.2))
+    second = Building(BuildingType.FARM, world_map.tiles[(2, 3)], (0.8, 0.8))
+    third = Building(BuildingType.FARM, world_map.tiles[(5, 5)], (0.5, 0.5))
+    town = Settlement("Town", world_map.tiles[(5, 5)])
+    assert minimap.add([first, second, third], [town]) == 2
+    assert minimap.counts[3, 2] == 2 and minimap.settled[5, 5] == 1
+    assert not np.array_equal(texel(minimap, 2, 3), empty)
+
+    # Already tracked objects touch nothing
+    assert minimap.add([first, third], [town]) == 0
+
+    # A full sync only rewrites where something went away
+    assert minimap.sync([first, second], []) == 1
+    assert minimap.counts[5, 5] == 0 and minimap.settled[5, 5] == 0
+    assert minimap.sync([], []) == 1
+    assert np.array_equal(texel(minimap, 2, 3), empty)
@@ -0,0 +1,73 @@
+import pytest
+
+from trade.constants import BuildingType, ResourceType
+from trade.generation import WorldGenerator
+from trade.models import Building, Settlement
+from trade.paging import PagedWorld
+from trade.simulation import WorldSimulation, TurnManager
+
+
+def _paged_world(config, tmp_path):
+    config["map"]["size"] = 256
+    config["paging"].update(path=str(tmp_path / "chunks"), chunk_size=16, focus_radius=1, resident_chunks=12)
+    return PagedWorld(WorldGenerator(256, config), config)
+
+
+def _tiles_of(paged, key):
+    x0, y0, x1, y1 = paged.bounds(key)
+    return [paged.world_map.tiles[(x, y)] for x in range(x0, x1) for y in range(y0, y1)]
+
+
+def test_roaming_keeps_resident_chunks_bounded(config, tmp_path):
+    paged = _paged_world(config, tmp_path)
+    world_map = paged.world_map
+    placed = {}
+    for step in range(16):
+        paged.focus(8 + step * 16, 8 + step * 12, max_loads=9)
+        assert len(paged.resident) <= paged.max_resident
+        assert len(world_map.tiles) <= paged.max_resident * paged.chunk_size ** 2
+        # Every chunk gets a building, and the first one a settlement, as growth would leave them
+        for key in paged.resident:
+            tiles = _tiles_of(paged, key)
+            if key not in placed and not any(t.buildings for t in tiles):
+                if not world_map.settlements:
+                    world_map.settlements.append(Settlement("First", tiles[0]))
+                building = Building(BuildingType.FARM, tiles[1], (0.25, 0.75), world_map.settlements[0])
+                building.add_resource(ResourceType.GRAIN, 3.5)
+                placed[key] = (tiles[1].x, tiles[1].y)
+
+    first = (0, 0)
+    assert first not in paged.resident
+    assert len(world_map.settlements[0].buildings) < len(placed)
+
+    paged.focus(8, 8, max_loads=9)
+    assert len(paged.resident) <= paged.max_resident
+    (building,) = world_map.tiles[placed[first]].buildings
+    assert building in paged.restored
+    assert building.type == BuildingType.FARM and building.local_pos == (0.25, 0.75)
+    assert building.inventory[ResourceType.GRAIN] == 3
+    assert building._resource_buffers[ResourceType.GRAIN] == 0.5
+    assert building in world_map.settlements[0].buildings
+    assert world_map.settlements[0].tile is world_map.tiles[(0, 0)]
+
+
+def test_paged_worlds_have_no_history_to_rewind(config, tmp_path):
+    config["history"]["enabled"] = True
+    paged = _paged_world(config, tmp_path)
+    paged.focus(8, 8, max_loads=9)
+    simulation = WorldSimulation(paged.world_map, config)
+    turn_mgr = TurnManager(simulation)
+    assert turn_mgr.history is None
+
+    tile = paged.world_map.tiles[(1, 1)]
+    Building(BuildingType.FARM, tile, (0.5, 0.5))
+    turn_mgr.next_turn()
+    paged.focus(200, 200, max_loads=9) # Pages the first chunk out
+    assert (0, 0) not in paged.resident
+    paged.focus(8, 8, max_loads=9)
+    turn_mgr.next_turn()
+    with pytest.raises(RuntimeError):
+        turn_mgr.rewind(1)
+    for pos, tile in paged.world_map.tiles.items():
+        assert all(b.tile is tile for b in tile.buildings)
+    turn_mgr.close()
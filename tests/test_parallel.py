@@ -0,0 +1,31 @@
+import hashlib
+
+from trade.generation import WorldGenerator
+from trade.simulation import WorldSimulation, TurnManager
+
+
+def state_hash(world_map) -> str:
+    """Digest of settlements, building placements and inventories, in map order."""
+    h = hashlib.sha256()
+    for s in world_map.settlements:
+        h.update(f"{s.name} {s.tile.x} {s.tile.y}\n".encode())
+    for pos in sorted(world_map.tiles):
+        for b in world_map.tiles[pos].buildings:
+            settlement = b.settlement.name if b.settlement else None
+            h.update(f"{pos} {b.type.name} {b.local_pos} {settlement} {list(b.inventory.values())}\n".encode())
+    return h.hexdigest()
+
+
+def run(config, workers: int, turns: int = 4) -> str:
+    config["simulation"]["parallel_workers"] = workers
+    config["simulation"]["region_size"] = 16
+    simulation = WorldSimulation(WorldGenerator(config["map"]["size"], config).generate(), config)
+    turn_mgr = TurnManager(simulation)
+    for _ in range(turns):
+        turn_mgr.next_turn()
+    turn_mgr.close()
+    return state_hash(simulation.world_map)
+
+
+def test_worker_count_does_not_change_the_world(config):
+    assert run(config, 1) == run(config, 3)
@@ -0,0 +1,47 @@
+import pytest
+
+from trade.pipeline import TurnPipeline, ALL
+
+
+def noop():
+    pass
+
+
+def test_stages_join_the_earliest_wave_without_conflicts():
+    pipeline = TurnPipeline()
+    pipeline.add_stage("a", noop, reads=("x",), writes=("y",))
+    pipeline.add_stage("b", noop, reads=("x",), writes=("z",)) # Shares a read only
+    pipeline.add_stage("c", noop, reads=("y",), writes=("w",)) # Reads what a writes
+    pipeline.add_stage("d", noop, writes=("z",)) # Writes what b writes
+    pipeline.add_stage("e", noop, reads=("x",)) # Reads what nothing before it writes
+    assert pipeline.describe() == "a | b | e -> c | d"
+
+    pipeline.add_stage("all", noop, writes=(ALL,))
+    pipeline.add_stage("after", noop, reads=("q",), writes=("r",))
+    assert pipeline.describe() == "a | b | e -> c | d -> all -> after"
+
+    pipeline.add_stage("first", noop, writes=("x",), before="a")
+    assert pipeline.describe() == "first -> a | b | e -> c | d -> all -> after"
+    pipeline.remove_stage("first")
+    assert pipeline.describe() == "a | b | e -> c | d -> all -> after"
+
+
+def test_stage_names_are_unique():
+    pipeline = TurnPipeline()
+    pipeline.add_stage("a", noop)
+    with pytest.raises(ValueError):
+        pipeline.add_stage("a", noop)
+    with pytest.raises(KeyError):
+        pipeline.add_stage("b", noop, before="missing")
+
+
+def test_waves_run_in_order_with_workers():
+    ran = []
+    pipeline = TurnPipeline(workers=2)
+    pipeline.add_stage("write", lambda: ran.append("write"), writes=("x",))
+    pipeline.add_stage("read 1", lambda: ran.append("read"), reads=("x",))
+    pipeline.add_stage("read 2", lambda: ran.append("read"), reads=("x",))
+    timings = pipeline.run()
+    pipeline.close()
+    assert ran == ["write", "read", "read"]
+    assert list(timings) == ["write", "read 1", "read 2"]
@@ -0,0 +1,48 @@
+import copy
+
+from trade.generation import WorldGenerator
+from trade.protocol import DELTA, SNAPSHOT, encode_state, decode, WorldReplica
+from trade.simulation import WorldSimulation, TurnManager
+
+
+def _state(world_map):
+    return sorted((t.x, t.y, b.type.name, b.local_pos, b.settlement.name if b.settlement else None,
+                   tuple(b.inventory.values())) for t in world_map.tiles.values() for b in t.buildings)
+
+
+def _send(replica, kind, delta):
+    kind, payload = decode(encode_state(kind, delta))
+    replica.apply(kind, payload)
+
+
+def test_replica_follows_deltas_and_a_snapshot_after_rewind(config):
+    config["history"]["enabled"] = True
+    config["simulation"]["growth_chance"] = 0.05
+    config["simulation"]["settlement_spawn_chance"] = 1.0
+    replica_config = copy.deepcopy(config)
+    simulation = WorldSimulation(WorldGenerator(config["map"]["size"], config).generate(), config)
+    turn_mgr = TurnManager(simulation)
+    history = turn_mgr.history
+    replica = WorldReplica(WorldGenerator(config["map"]["size"], replica_config).generate())
+
+    _send(replica, SNAPSHOT, history.snapshot())
+    assert _state(replica.world_map) == _state(simulation.world_map)
+    for _ in range(6):
+        turn_mgr.next_turn()
+        _send(replica, DELTA, history.deltas[turn_mgr.turn_count])
+        assert _state(replica.world_map) == _state(simulation.world_map)
+    built = len(replica.buildings)
+
+    turn_mgr.rewind(2)
+    _send(replica, SNAPSHOT, history.snapshot())
+    assert replica.turn == 2
+    assert _state(replica.world_map) == _state(simulation.world_map)
+    assert len(replica.buildings) < built
+
+    # The turns after the rewind reuse the ids of the buildings it dropped
+    for _ in range(4):
+        turn_mgr.next_turn()
+        _send(replica, DELTA, history.deltas[turn_mgr.turn_count])
+    assert _state(replica.world_map) == _state(simulation.world_map)
+    assert [s.name for s in replica.world_map.settlements] == [s.name for s in simulation.world_map.settlements]
+    turn_mgr.close()
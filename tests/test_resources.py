@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+from trade.config import ConfigWatcher
+from trade.generation import WorldGenerator
+from trade.map import WorldMap
+from trade.models import Building, Tile
+from trade.resources import RESOURCE_INDEX, ResourceField
+from trade.constants import BuildingType, ResourceType
+from trade.simulation import WorldSimulation, RELOADABLE_SECTIONS
+from tests.conftest import CONFIG_PATH
+
+
+def test_reloading_resources_reconfigures_the_field(config, tmp_path):
+    path = tmp_path / "config.toml"
+    text = open(CONFIG_PATH, encoding="utf-8").read()
+    path.write_text(text, encoding="utf-8")
+    simulation = WorldSimulation(WorldGenerator(config["map"]["size"], config).generate(), config)
+    watcher = ConfigWatcher(config, str(path))
+    watcher.on_change(RELOADABLE_SECTIONS, simulation.reconfigure)
+
+    field = simulation.resources
+    wood = RESOURCE_INDEX[ResourceType.WOOD]
+    stone = RESOURCE_INDEX[ResourceType.STONE]
+    assert dict(field.renewable)[wood] == 0.05
+    assert stone not in field._habitat
+
+    path.write_text(text.replace("regrowth = { WOOD = 0.05,", "regrowth = { WOOD = 0.3, STONE = 0.01,"),
+                    encoding="utf-8")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000_000))
+    assert "resources" in watcher.poll()
+
+    assert dict(field.renewable)[wood] == 0.3
+    assert dict(field.renewable)[stone] == 0.01
+    inv_capacity, _ = field._habitat[stone]
+    assert np.array_equal(inv_capacity > 0, field.capacity[stone] > 0)
+
+
+def test_overlapping_extraction_yields_what_was_removed(config):
+    world_map = WorldMap(8)
+    for x in range(8):
+        for y in range(8):
+            world_map.tiles[(x, y)] = Tile(x, y, 0.5, 0.9, config["thresholds"])
+    field = ResourceField(world_map, config)
+    wood = RESOURCE_INDEX[ResourceType.WOOD]
+    field.stock[wood] = 1.0
+    before = field.stock.sum()
+
+    # Rates far beyond the stock, so both buildings ask the shared tiles for all they hold
+    a = Building(BuildingType.LUMBER_YARD, world_map.tiles[(2, 2)], (0.5, 0.5))
+    b = Building(BuildingType.LUMBER_YARD, world_map.tiles[(3, 2)], (0.5, 0.5))
+    field._extractors = [(a, wood, 2, 2, 1000.0), (b, wood, 3, 2, 1000.0)]
+    yields = field.extract()
+
+    got = yields[a][ResourceType.WOOD] + yields[b][ResourceType.WOOD]
+    assert got == pytest.approx(before - field.stock.sum(), rel=1e-5)
+    assert got == pytest.approx(12.0, rel=1e-5) # The 4 x 3 tiles the two windows cover
+    assert yields[a][ResourceType.WOOD] == pytest.approx(yields[b][ResourceType.WOOD])
+    assert (field.stock >= 0).all()
@@ -0,0 +1,67 @@
+from trade.generation import WorldGenerator
+from trade.scheduler import EventScheduler
+from trade.simulation import WorldSimulation, TurnManager
+
+
+def test_events_run_by_turn_then_insertion_order():
+    scheduler = EventScheduler()
+    ran = []
+    scheduler.schedule(3, ran.append, ("c",))
+    scheduler.schedule(2, ran.append, ("a",))
+    scheduler.schedule(3, ran.append, ("d",))
+    scheduler.schedule(2, ran.append, ("b",))
+    scheduler.schedule(5, ran.append, ("later",))
+    assert len(scheduler) == 5
+
+    assert scheduler.run_due(1) == 0
+    assert scheduler.run_due(3) == 4
+    assert ran == ["a", "b", "c", "d"]
+    assert len(scheduler) == 1
+
+
+def test_cancelled_events_do_not_run():
+    scheduler = EventScheduler()
+    ran = []
+    once = scheduler.schedule(1, ran.append, ("once",))
+    repeat = scheduler.schedule(1, ran.append, ("repeat",), interval=1)
+    scheduler.cancel(once)
+    scheduler.cancel(once)
+    assert len(scheduler) == 1
+
+    scheduler.run_due(1)
+    scheduler.cancel(repeat)
+    scheduler.run_due(2)
+    assert ran == ["repeat"]
+    assert len(scheduler) == 0
+
+
+def test_events_scheduled_while_running_wait_for_the_next_call():
+    scheduler = EventScheduler()
+    ran = []
+
+    def spawn():
+        ran.append("spawn")
+        scheduler.schedule(1, ran.append, ("spawned",))
+
+    scheduler.schedule(1, spawn)
+    assert scheduler.run_due(1) == 1
+    assert ran == ["spawn"]
+    assert scheduler.run_due(1) == 1
+    assert ran == ["spawn", "spawned"]
+
+
+def test_actions_added_during_a_turn_run_next_turn(config):
+    simulation = WorldSimulation(WorldGenerator(config["map"]["size"], config).generate(), config)
+    turn_mgr = TurnManager(simulation)
+    ran = []
+
+    def action():
+        ran.append(turn_mgr.turn_count)
+        if len(ran) < 3:
+            turn_mgr.add_action(action)
+
+    turn_mgr.add_action(action)
+    for _ in range(4):
+        turn_mgr.next_turn()
+    assert ran == [1, 2, 3]
+    turn_mgr.close()
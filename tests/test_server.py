@@ -0,0 +1,21 @@
+import time
+from multiprocessing import Pipe
+
+from trade.server import ViewerLink
+
+
+def test_a_viewer_that_stops_reading_does_not_block_sends():
+    ours, theirs = Pipe()
+    link = ViewerLink(ours, max_bytes=1_000_000)
+    message = bytes(200_000)
+    started = time.perf_counter()
+    accepted = [link.send(message) for _ in range(50)]
+    assert time.perf_counter() - started < 1.0
+    assert accepted[0] and not all(accepted) # Refused once the queue is full
+
+    for _ in range(accepted.index(False)):
+        assert theirs.recv_bytes() == message
+    assert link.send(message)
+    theirs.close()
+    link.close()
+    assert link.closed
@@ -0,0 +1,30 @@
+import pytest
+
+from trade.generation import WorldGenerator
+from trade.simulation import WorldSimulation, TurnManager
+
+
+def test_rewind_without_history_raises(config):
+    simulation = WorldSimulation(WorldGenerator(config["map"]["size"], config).generate(), config)
+    turn_mgr = TurnManager(simulation)
+    for _ in range(3):
+        turn_mgr.next_turn()
+    with pytest.raises(RuntimeError):
+        turn_mgr.rewind(1)
+    assert turn_mgr.history is None
+    assert turn_mgr.turn_count == 3
+    turn_mgr.close()
+
+
+def test_rewind_restores_an_earlier_turn(config):
+    config["history"]["enabled"] = True
+    simulation = WorldSimulation(WorldGenerator(config["map"]["size"], config).generate(), config)
+    turn_mgr = TurnManager(simulation)
+    counts = [sum(simulation.get_stats()["buildings"].values())]
+    for _ in range(6):
+        turn_mgr.next_turn()
+        counts.append(sum(simulation.get_stats()["buildings"].values()))
+    turn_mgr.rewind(2)
+    assert turn_mgr.turn_count == 2
+    assert sum(simulation.get_stats()["buildings"].values()) == counts[2]
+    turn_mgr.close()
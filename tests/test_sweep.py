@@ -0,0 +1,31 @@
+import pytest
+
+from trade.difftest import DiffTest, Variant, _fixed_overrides
+from trade.sweep import Sweep, apply_overrides, parse_grid
+
+
+def test_parse_grid():
+    grid = parse_grid(["simulation.growth_chance=[0.01, 0.02]", "map.size=80",
+                       "logistics.terrain_cost.OCEAN=0.5", "generation.direction=north"])
+    assert grid == {"simulation.growth_chance": [0.01, 0.02], "map.size": [80],
+                    "logistics.terrain_cost.OCEAN": [0.5], "generation.direction": ["north"]}
+    with pytest.raises(ValueError):
+        parse_grid(["size=80"])
+
+
+def test_overrides_apply_to_a_copy(config):
+    result = apply_overrides(config, [("map.size", 80), ("logistics.terrain_cost.OCEAN", 0.5)])
+    assert result["map"]["size"] == 80
+    assert result["logistics"]["terrain_cost"]["OCEAN"] == 0.5
+    assert config["map"]["size"] == 60
+    assert config["logistics"]["terrain_cost"]["OCEAN"] == 0.0
+
+
+@pytest.mark.parametrize("key", ["mapp.size", "map.sise", "map.size.x", "logistics.terrain_cost.LAVA"])
+def test_unknown_settings_are_rejected(config, key):
+    with pytest.raises(ValueError, match="Unknown setting"):
+        apply_overrides(config, [(key, 1)])
+    with pytest.raises(ValueError, match="Unknown setting"):
+        Sweep(config, parse_grid([f"{key}=[1, 2]"]), [1], 1)
+    with pytest.raises(ValueError, match="Unknown setting"):
+        DiffTest(config, Variant("reference"), Variant("candidate", _fixed_overrides([f"{key}=1"])), 1, 1)
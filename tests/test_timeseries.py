@@ -0,0 +1,8 @@
+from trade.timeseries import TimeSeries
+
+
+def test_record_without_buildings(config):
+    series = TimeSeries(config)
+    series.record(0)
+    series.record(1, {})
+    assert series.world_series().shape[0] == 2
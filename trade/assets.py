@@ -1,20 +1,158 @@
-from panda3d.core import NodePath, Loader
-from typing import Dict
+from collections import OrderedDict
+from panda3d.core import NodePath, Loader, Texture
+from typing import Dict, List, Any, Callable, Iterable, Optional
+
 
 class AssetManager:
-    def __init__(self, loader: Loader):
+    """Keeps one prototype per model path and hands out instances of it.
+
+    `get_instance` returns a holder node with the shared prototype instanced underneath
+    (`instanceTo`), so per-object state such as colour, scale and tags goes on the holder
+    and geometry is never copied. Models load asynchronously through the loader's callback
+    API; instances requested before the load finishes are filled in when it does, with the
+    placeholder model if it fails. Prototypes with no live instances and cached textures
+    share one least-recently-used order and are evicted from it once the memory budget
+    is exceeded."""
+
+    def __init__(self, loader: Loader, config: Optional[Dict[str, Any]] = None):
+        cfg = (config or {}).get("assets", {})
         self.loader = loader
+        self.memory_budget = int(cfg.get("memory_budget_mb", 256) * 1024 * 1024)
+        self.async_load = cfg.get("async_load", True)
+        self.placeholder_path: str = cfg.get("placeholder", "models/box")
         self.models: Dict[str, NodePath] = {}
-        self.textures: Dict[str, NodePath] = {}
+        self.textures: Dict[str, Texture] = {}
+        self._sizes: "OrderedDict[str, int]" = OrderedDict() # Models and textures, least recently used first
+        self._refs: Dict[str, int] = {}
+        self._pending: Dict[str, List[NodePath]] = {} # Holders waiting for an async load
+        self._callbacks: Dict[str, List[Callable[[], None]]] = {}
+
+    @property
+    def memory_used(self) -> int:
+        return sum(self._sizes.values())
+
+    def preload(self, paths: Iterable[str], callback: Optional[Callable[[], None]] = None) -> None:
+        """Starts loading the given models; `callback` runs once all of them are available."""
+        waiting = [p for p in paths if p not in self.models]
+        if not waiting:
+            if callback:
+                callback()
+            return
+
+        remaining = set(waiting)
+        def on_loaded(path):
+            remaining.discard(path)
+            if not remaining and callback:
+                callback()
+
+        for path in waiting:
+            self._callbacks.setdefault(path, []).append(lambda p=path: on_loaded(p))
+            self._request(path)
 
     def get_model(self, path: str) -> NodePath:
-        if path not in self.models:
-            self.models[path] = self.loader.loadModel(path)
-        # Return a copy to avoid modifying the original
-        return self.models[path].copyTo(NodePath())
+        """Returns a private copy of the model, for callers that need to modify its geometry."""
+        return self._prototype(path).copyTo(NodePath())
 
     def get_instance(self, path: str, parent: NodePath) -> NodePath:
-        """Returns a copy of the model parented to the given node."""
+        """Returns a new holder node under `parent` that instances the shared model."""
+        holder = parent.attachNewNode(path.rsplit("/", 1)[-1])
+        holder.setPythonTag("asset_path", path)
+        self._refs[path] = self._refs.get(path, 0) + 1
+
+        if path in self.models:
+            self._sizes.move_to_end("model:" + path)
+            self.models[path].instanceTo(holder)
+        elif self.async_load:
+            self._request(path)
+            self._pending[path].append(holder)
+        else:
+            self._prototype(path).instanceTo(holder)
+        return holder
+
+    def release(self, holder: NodePath) -> None:
+        """Removes an instance returned by `get_instance`."""
+        path = holder.getPythonTag("asset_path")
+        if path is not None:
+            self._refs[path] -= 1
+            pending = self._pending.get(path)
+            if pending and holder in pending:
+                pending.remove(holder)
+        holder.removeNode()
+        self._evict()
+
+    def get_texture(self, path: str) -> Texture:
+        if path in self.textures:
+            self._sizes.move_to_end("tex:" + path)
+            return self.textures[path]
+        tex = self.loader.loadTexture(path)
+        self.textures[path] = tex
+        self._sizes["tex:" + path] = tex.estimateTextureMemory()
+        self._evict()
+        return tex
+
+    def _prototype(self, path: str) -> NodePath:
         if path not in self.models:
-            self.models[path] = self.loader.loadModel(path)
-        return self.models[path].copyTo(parent)
+            model = self.loader.loadModel(path, okMissing=True)
+            if model is None:
+                print(f"Could not load model {path}, using {self.placeholder_path}")
+                return self._placeholder(path)
+            self._store(path, model)
+        self._sizes.move_to_end("model:" + path)
+        return self.models[path]
+
+    def _placeholder(self, failed: str) -> NodePath:
+        if failed == self.placeholder_path:
+            return NodePath("placeholder")
+        return self._prototype(self.placeholder_path)
+
+    def _request(self, path: str) -> None:
+        if path in self._pending:
+            return
+        self._pending[path] = []
+        self.loader.loadModel(path, callback=self._on_loaded, extraArgs=[path])
+
+    def _on_loaded(self, model: Optional[NodePath], path: str) -> None:
+        if path in self.models:
+            prototype = self.models[path]
+        elif model is None:
+            # Not cached, so the next request for the path tries again
+            print(f"Could not load model {path}, using {self.placeholder_path}")
+            prototype = self._placeholder(path)
+        else:
+            self._store(path, model)
+            prototype = model
+        for holder in self._pending.pop(path, []):
+            if not holder.isEmpty():
+                prototype.instanceTo(holder)
+        for callback in self._callbacks.pop(path, []):
+            callback()
+        self._evict()
+
+    def _store(self, path: str, model: NodePath) -> None:
+        self.models[path] = model
+        self._sizes["model:" + path] = self._geometry_size(model)
+
+    def _geometry_size(self, model: NodePath) -> int:
+        size = 0
+        for geom_np in model.findAllMatches("**/+GeomNode"):
+            for geom in geom_np.node().getGeoms():
+                vdata = geom.getVertexData()
+                size += sum(vdata.getArray(i).getDataSizeBytes() for i in range(vdata.getNumArrays()))
+                primitives = [geom.getPrimitive(i) for i in range(geom.getNumPrimitives())]
+                size += sum(p.getDataSizeBytes() for p in primitives if p.isIndexed())
+        return size
+
+    def _evict(self) -> None:
+        if self.memory_used <= self.memory_budget:
+            return
+        for key in list(self._sizes):
+            if self.memory_used <= self.memory_budget:
+                return
+            kind, path = key.split(":", 1)
+            if kind == "tex":
+                del self.textures[path]
+            elif self._refs.get(path, 0) > 0 or path in self._pending:
+                continue
+            else:
+                self.models.pop(path).removeNode()
+            del self._sizes[key]
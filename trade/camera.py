@@ -11,6 +11,19 @@ class CameraController:
         
         cam_cfg = config["camera"]
         self.zoom_level = cam_cfg["start_pos"][2]
+        self.heightfield = None
+        self.configure()
+        
+        self.last_mouse_pos = None
+        
+        self.camera.setPos(*cam_cfg["start_pos"])
+        self.camera.setHpr(*cam_cfg["start_hpr"])
+        
+        self.base.taskMgr.add(self.update, "CameraControllerUpdate")
+
+    def configure(self):
+        """Reads speeds, limits and the field of view from the config; the start pose only applies at startup."""
+        cam_cfg = self.config["camera"]
         self.min_zoom = cam_cfg["min_zoom"]
         self.max_zoom = cam_cfg["max_zoom"]
         self.move_speed = cam_cfg["move_speed"]
@@ -20,17 +33,26 @@ class CameraController:
         self.zoom_ref = cam_cfg["zoom_ref"]
         self.pitch_limit_min = cam_cfg["pitch_limit_min"]
         self.pitch_limit_max = cam_cfg["pitch_limit_max"]
-        
-        self.last_mouse_pos = None
-        
-        self.camera.setPos(*cam_cfg["start_pos"])
-        self.camera.setHpr(*cam_cfg["start_hpr"])
+        self.ground_clearance = cam_cfg.get("ground_clearance", 2.0)
         self.base.camLens.setFov(cam_cfg["fov"])
         
         self.base.accept("wheel_up", self.adjust_zoom, [-self.zoom_speed])
         self.base.accept("wheel_down", self.adjust_zoom, [self.zoom_speed])
-        
-        self.base.taskMgr.add(self.update, "CameraControllerUpdate")
+
+    def set_ground(self, heightfield):
+        """Keeps the camera at least `ground_clearance` above the given terrain."""
+        self.heightfield = heightfield
+
+    def focus_on(self, x, y):
+        """Moves the camera, keeping its height and angle, so that it looks at ground point (x, y)."""
+        pos = self.camera.getPos()
+        forward = self.camera.getQuat().getForward()
+        if forward.getZ() < -0.1:
+            # Where the view meets the ground is this far ahead of the camera
+            reach = pos.getZ() / -forward.getZ()
+            x -= forward.getX() * reach
+            y -= forward.getY() * reach
+        self.camera.setPos(x, y, pos.getZ())
 
     def adjust_zoom(self, amount):
         self.zoom_level = max(self.min_zoom, min(self.max_zoom, self.zoom_level + amount))
@@ -79,6 +101,10 @@ class CameraController:
                 self.last_mouse_pos = None
         else:
             self.last_mouse_pos = None
+
+        if self.heightfield:
+            ground = self.heightfield.height_at(pos.getX(), pos.getY())
+            pos.setZ(max(pos.getZ(), ground + self.ground_clearance))
             
         self.camera.setPos(pos)
         self.camera.setHpr(hpr)
@@ -0,0 +1,109 @@
+import os
+import tomllib
+from typing import Dict, Any, Callable, Iterable, List, Set, Tuple
+
+CONFIG_PATH = "config.toml"
+
+# Read once while the world is built; changing them needs a restart, so reloads leave them alone.
+# A "section.key" entry freezes one key and lets the rest of its section reload.
+STARTUP_SECTIONS = {"map", "generation", "thresholds", "window", "paging", "server", "history",
+                    "startup", "timeseries", "hot_reload", "minimap", "visuals", "metrics", "assets",
+                    "memory", "simulation.parallel_workers", "simulation.region_size",
+                    "simulation.river_source_min_elevation", "simulation.river_stop_chance"}
+
+
+def load_config(path: str = CONFIG_PATH) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def changed_sections(old: Dict[str, Any], new: Dict[str, Any]) -> Set[str]:
+    """Top-level sections added, removed or with any value changed."""
+    return {name for name in old.keys() | new.keys() if old.get(name) != new.get(name)}
+
+
+class ConfigWatcher:
+    """Reloads the config file when its modification time changes.
+
+    The live config is updated in place, section by section, so everything holding it
+    or one of its sections sees the new values on its next read. Handlers registered for the changed
+    sections then run once each, in registration order, to rebuild whatever was
+    derived from those sections. Only sections some handler consumes are applied;
+    the rest, and anything in `frozen`, are reported as needing a restart."""
+
+    def __init__(self, config: Dict[str, Any], path: str = CONFIG_PATH, frozen: Iterable[str] = STARTUP_SECTIONS):
+        self.config = config
+        self.path = path
+        self.frozen = set(frozen)
+        self._handlers: List[Tuple[Set[str], Callable[[Set[str]], None]]] = []
+        self._loaded = load_config(path) # File contents as of the last reload, to diff against
+        self._mtime = os.stat(path).st_mtime_ns
+
+    def on_change(self, sections: Iterable[str], handler: Callable[[Set[str]], None]) -> None:
+        """Calls `handler(changed)` after a reload that changed any of `sections`."""
+        self._handlers.append((set(sections), handler))
+
+    def poll(self) -> Set[str]:
+        """Applies the file if it changed since the last poll, returning the applied sections."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return set()
+        if mtime == self._mtime:
+            return set()
+        self._mtime = mtime
+        try:
+            new = load_config(self.path)
+        except (OSError, tomllib.TOMLDecodeError) as e:
+            print(f"Config not reloaded: {e}")
+            return set()
+
+        old = self._loaded
+        self._loaded = new
+        handled = set().union(*(sections for sections, _ in self._handlers))
+        changed, restart = set(), set()
+        for name in changed_sections(old, new):
+            if name in self.frozen or name not in handled:
+                restart.add(name)
+                continue
+            keys = _changed_keys(old.get(name), new.get(name))
+            frozen_keys = {key for key in keys if f"{name}.{key}" in self.frozen}
+            restart.update(f"{name}.{key}" for key in frozen_keys)
+            if keys and keys <= frozen_keys:
+                continue
+            self._apply(name, new, frozen_keys)
+            changed.add(name)
+
+        if restart:
+            print(f"Config changes to {', '.join(sorted(restart))} take effect on restart")
+        for sections, handler in self._handlers:
+            if sections & changed:
+                handler(sections & changed)
+        if changed:
+            print(f"Config reloaded: {', '.join(sorted(changed))}")
+        return changed
+
+    def _apply(self, name: str, new: Dict[str, Any], keep: Set[str]) -> None:
+        """Replaces a live section with its new contents, except for the keys in `keep`."""
+        section = self.config.get(name)
+        if name not in new:
+            self.config.pop(name, None)
+        elif isinstance(section, dict) and isinstance(new[name], dict):
+            values = dict(new[name])
+            for key in keep:
+                if key in section:
+                    values[key] = section[key]
+                else:
+                    values.pop(key, None)
+            # Same dict object, for anything that kept a reference to the section
+            section.clear()
+            section.update(values)
+        else:
+            self.config[name] = new[name]
+
+
+def _changed_keys(old: Any, new: Any) -> Set[str]:
+    """Keys added, removed or changed between two versions of a section; empty unless both are tables."""
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return set()
+    return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
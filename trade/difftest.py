@@ -0,0 +1,294 @@
+import argparse
+import copy
+import importlib
+import math
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from .config import load_config
+from .generation import WorldGenerator
+from .resources import RESOURCES
+from .simulation import WorldSimulation, TurnManager
+from .sweep import Override, apply_overrides, parse_grid
+
+# What a faster implementation may stand in for, by the name used on the command line
+TARGETS = {
+    "generate": (WorldGenerator, "generate"),
+    "growth": (WorldSimulation, "_simulate_growth"),
+    "production": (WorldSimulation, "_process_production_and_consumption"),
+    "stats": (WorldSimulation, "get_stats"),
+}
+
+
+class Variant:
+    """One side of a comparison: config overrides and replacements for some of the TARGETS.
+
+    While installed, every target is swapped for a timed wrapper around this side's
+    implementation, so both sides can run in one process and be timed per function.
+    Methods bound during installation, such as pipeline stages, keep their wrapper."""
+
+    def __init__(self, name: str, overrides: List[Override] = (), replacements: Dict[str, Callable] = None):
+        self.name = name
+        self.overrides = list(overrides)
+        self.replacements = dict(replacements or {})
+        unknown = set(self.replacements) - set(TARGETS)
+        if unknown:
+            raise ValueError(f"Unknown targets {', '.join(sorted(unknown))}; expected one of {', '.join(TARGETS)}")
+        self.times = {target: 0.0 for target in TARGETS}
+        self.calls = {target: 0 for target in TARGETS}
+        self.turn_time = 0.0
+
+    @contextmanager
+    def installed(self):
+        saved = []
+        for target, (cls, attr) in TARGETS.items():
+            original = cls.__dict__[attr]
+            saved.append((cls, attr, original))
+            setattr(cls, attr, self._timed(target, self.replacements.get(target, original)))
+        try:
+            yield
+        finally:
+            for cls, attr, original in saved:
+                setattr(cls, attr, original)
+
+    def _timed(self, target: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.times[target] += time.perf_counter() - started
+                self.calls[target] += 1
+        return timed
+
+
+class Divergence:
+    def __init__(self, turn: str, aspect: str, where: str, reference: Any, candidate: Any):
+        self.turn = turn
+        self.aspect = aspect
+        self.where = where
+        self.reference = reference
+        self.candidate = candidate
+
+    def __str__(self):
+        return (f"{self.turn}: {self.aspect} differ at {self.where}\n"
+                f"  reference: {self.reference!r}\n  candidate: {self.candidate!r}")
+
+
+class DiffTest:
+    """Runs a reference and a candidate variant in lockstep from the same seed and config.
+
+    After generation, after the initial growth and after every turn the two worlds are
+    compared (tile types and potentials, settlements, building placements, inventories,
+    resource stocks and stats) and the run stops at the first difference. Floats are
+    equal within `tolerance`, relative or absolute."""
+
+    def __init__(self, config: Dict[str, Any], reference: Variant, candidate: Variant,
+                 seed: int, turns: int, tolerance: float = 1e-9):
+        self.config = config
+        self.sides = [reference, candidate]
+        self.seed = seed
+        self.turns = turns
+        self.tolerance = tolerance
+        self.turns_run = 0
+        for side in self.sides:
+            self._side_config(side) # Fails on unknown settings before anything runs
+
+    def run(self) -> Optional[Divergence]:
+        configs = [self._side_config(side) for side in self.sides]
+        worlds = []
+        for side, config in zip(self.sides, configs):
+            with side.installed():
+                worlds.append(WorldGenerator(config["map"]["size"], config).generate())
+        divergence = self._compare_tiles(*worlds) or self._compare_world("generation", *worlds)
+        if divergence:
+            return divergence
+
+        managers = []
+        for side, world_map, config in zip(self.sides, worlds, configs):
+            with side.installed():
+                managers.append(TurnManager(WorldSimulation(world_map, config)))
+        try:
+            divergence = self._compare_turn("initial growth", managers)
+            for turn in range(1, self.turns + 1):
+                if divergence:
+                    break
+                for side, turn_mgr in zip(self.sides, managers):
+                    with side.installed():
+                        started = time.perf_counter()
+                        turn_mgr.next_turn()
+                        side.turn_time += time.perf_counter() - started
+                self.turns_run = turn
+                divergence = self._compare_turn(f"turn {turn}", managers)
+            return divergence
+        finally:
+            for turn_mgr in managers:
+                turn_mgr.close()
+
+    def timings(self) -> List[Tuple[str, float, float]]:
+        """(what, reference seconds, candidate seconds) per target that ran, then whole turns."""
+        reference, candidate = self.sides
+        rows = [(target, reference.times[target], candidate.times[target])
+                for target in TARGETS if reference.calls[target] or candidate.calls[target]]
+        rows.append((f"{self.turns_run} turns", reference.turn_time, candidate.turn_time))
+        return rows
+
+    def _side_config(self, side: Variant) -> Dict[str, Any]:
+        config = copy.deepcopy(self.config)
+        # Neither side needs rewinding or metrics; a side's overrides can turn them back on
+        config.setdefault("history", {})["enabled"] = False
+        config.setdefault("metrics", {})["enabled"] = False
+        config = apply_overrides(config, side.overrides)
+        config["generation"]["seed"] = self.seed
+        return config
+
+    def _compare_turn(self, turn: str, managers: List[TurnManager]) -> Optional[Divergence]:
+        reference, candidate = (turn_mgr.simulation for turn_mgr in managers)
+        divergence = self._compare_world(turn, reference.world_map, candidate.world_map)
+        if divergence:
+            return divergence
+        if (reference.resources is None) != (candidate.resources is None):
+            return Divergence(turn, "resource fields", "simulation", reference.resources is not None,
+                              candidate.resources is not None)
+        if reference.resources is not None:
+            ref_stock, cand_stock = reference.resources.stock, candidate.resources.stock
+            close = np.isclose(ref_stock, cand_stock, rtol=self.tolerance, atol=self.tolerance)
+            if not close.all():
+                r, x, y = np.argwhere(~close)[0]
+                return Divergence(turn, "resource stocks", f"{RESOURCES[r].name}, tile ({x}, {y})",
+                                  float(ref_stock[r, x, y]), float(cand_stock[r, x, y]))
+
+        stats = []
+        for side, simulation in zip(self.sides, (reference, candidate)):
+            with side.installed():
+                stats.append(simulation.get_stats())
+        if stats[0] != stats[1]:
+            return Divergence(turn, "stats", "get_stats()", *stats)
+        return None
+
+    def _compare_tiles(self, reference, candidate) -> Optional[Divergence]:
+        """Generated terrain, which the simulation never changes, so it is compared once."""
+        if reference.tiles.keys() != candidate.tiles.keys():
+            return Divergence("generation", "tile coordinates", "map",
+                              len(reference.tiles), len(candidate.tiles))
+        for pos, ref_tile in reference.tiles.items():
+            cand_tile = candidate.tiles[pos]
+            if ref_tile.type != cand_tile.type:
+                return Divergence("generation", "tile types", f"tile {pos}", ref_tile.type.name, cand_tile.type.name)
+            for res in _keys(ref_tile.potentials, cand_tile.potentials):
+                amount, other = ref_tile.potentials.get(res), cand_tile.potentials.get(res)
+                if not self._close(amount, other):
+                    return Divergence("generation", "potentials", f"tile {pos}, {res.name}", amount, other)
+        return None
+
+    def _compare_world(self, turn: str, reference, candidate) -> Optional[Divergence]:
+        ref_settlements = [(s.name, s.tile.x, s.tile.y) for s in reference.settlements]
+        cand_settlements = [(s.name, s.tile.x, s.tile.y) for s in candidate.settlements]
+        if ref_settlements != cand_settlements:
+            return _first_difference(turn, "settlements", ref_settlements, cand_settlements)
+
+        for pos, ref_tile in reference.tiles.items():
+            ref_buildings, cand_buildings = ref_tile.buildings, candidate.tiles[pos].buildings
+            ref_placed = [_placement(b) for b in ref_buildings]
+            cand_placed = [_placement(b) for b in cand_buildings]
+            if len(ref_placed) != len(cand_placed) or not all(
+                    a[0] == b[0] and a[2] == b[2] and self._close(a[1][0], b[1][0]) and self._close(a[1][1], b[1][1])
+                    for a, b in zip(ref_placed, cand_placed)):
+                return Divergence(turn, "building placements", f"tile {pos}", ref_placed, cand_placed)
+
+            for i, (ref_b, cand_b) in enumerate(zip(ref_buildings, cand_buildings)):
+                for res in _keys(ref_b.inventory, cand_b.inventory, ref_b._resource_buffers, cand_b._resource_buffers):
+                    if (ref_b.inventory.get(res) != cand_b.inventory.get(res)
+                            or not self._close(ref_b._resource_buffers.get(res), cand_b._resource_buffers.get(res))):
+                        where = f"tile {pos}, building {i} ({ref_b.type.name}), {res.name}"
+                        return Divergence(turn, "inventories", where,
+                                          ref_b.inventory.get(res, 0) + ref_b._resource_buffers.get(res, 0.0),
+                                          cand_b.inventory.get(res, 0) + cand_b._resource_buffers.get(res, 0.0))
+        return None
+
+    def _close(self, a: Optional[float], b: Optional[float]) -> bool:
+        if a is None or b is None:
+            return a is b
+        return math.isclose(a, b, rel_tol=self.tolerance, abs_tol=self.tolerance)
+
+
+def _keys(*mappings: Dict) -> List:
+    """Every key of the mappings, in first-seen order, so a key only one side has is compared too."""
+    return list(dict.fromkeys(key for mapping in mappings for key in mapping))
+
+
+def _placement(building) -> Tuple[str, Tuple[float, float], Optional[str]]:
+    settlement = building.settlement.name if building.settlement else None
+    return building.type.name, tuple(building.local_pos), settlement
+
+
+def _first_difference(turn: str, aspect: str, reference: List, candidate: List) -> Divergence:
+    for i, (a, b) in enumerate(zip(reference, candidate)):
+        if a != b:
+            return Divergence(turn, aspect, f"index {i}", a, b)
+    i = min(len(reference), len(candidate))
+    return Divergence(turn, aspect, f"index {i}", reference[i:i + 1], candidate[i:i + 1])
+
+
+def load_replacement(spec: str) -> Tuple[str, Callable]:
+    """Parses "target=package.module:function" into the target and the function."""
+    target, sep, path = spec.partition("=")
+    module, colon, attr = path.partition(":")
+    if not sep or not colon:
+        raise ValueError(f"Expected target=package.module:function, got {spec!r}")
+    if target.strip() not in TARGETS:
+        raise ValueError(f"Unknown target {target.strip()!r}; expected one of {', '.join(TARGETS)}")
+    return target.strip(), getattr(importlib.import_module(module), attr)
+
+
+def _fixed_overrides(specs: List[str]) -> List[Override]:
+    overrides = []
+    for key, values in parse_grid(specs).items():
+        if len(values) != 1:
+            raise ValueError(f"{key} needs a single value here; wrap list settings in a list of lists")
+        overrides.append((key, values[0]))
+    return overrides
+
+
+def format_timings(rows: List[Tuple[str, float, float]]) -> str:
+    lines = [f"{'':>14}  {'reference':>10}  {'candidate':>10}  {'speedup':>8}"]
+    for what, ref, cand in rows:
+        speedup = f"{ref / cand:.2f}x" if cand > 0 else "-"
+        lines.append(f"{what:>14}  {ref:>9.3f}s  {cand:>9.3f}s  {speedup:>8}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a reference and a candidate implementation side by side and report the first divergence")
+    parser.add_argument("--replace", action="append", default=[], metavar="TARGET=MODULE:FUNCTION",
+                        help=f"candidate implementation of one of: {', '.join(TARGETS)}")
+    parser.add_argument("--set", action="append", default=[], metavar="SECTION.KEY=VALUE",
+                        help="config override for both sides, in TOML syntax")
+    parser.add_argument("--reference-set", action="append", default=[], metavar="SECTION.KEY=VALUE")
+    parser.add_argument("--candidate-set", action="append", default=[], metavar="SECTION.KEY=VALUE")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--tolerance", type=float, default=1e-9, help="relative and absolute float tolerance")
+    parser.add_argument("--config", default="config.toml")
+    args = parser.parse_args()
+
+    shared = _fixed_overrides(args.set)
+    reference = Variant("reference", shared + _fixed_overrides(args.reference_set))
+    candidate = Variant("candidate", shared + _fixed_overrides(args.candidate_set),
+                        dict(load_replacement(spec) for spec in args.replace))
+    test = DiffTest(load_config(args.config), reference, candidate, args.seed, args.turns, args.tolerance)
+    divergence = test.run()
+    print(format_timings(test.timings()))
+    if divergence:
+        print(f"Diverged at {divergence}")
+        sys.exit(1)
+    print(f"No divergence over {test.turns_run} turns")
+
+
+if __name__ == "__main__":
+    main()
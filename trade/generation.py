@@ -3,6 +3,7 @@ from panda3d.core import PerlinNoise2
 from .constants import TileType
 from .models import Tile
 from .map import WorldMap
+from .rng import RNGStreams
 
 class WorldGenerator:
     def __init__(self, size, config):
@@ -10,7 +11,31 @@ class WorldGenerator:
         self.config = config
 
     def generate(self):
+        for _ in self.generate_steps():
+            pass
+        return self.world_map
+
+    def generate_steps(self, columns_per_step=8):
+        """Generates the map a few columns at a time, yielding progress in [0, 1].
+        The finished map is left in `self.world_map`."""
         world_map = WorldMap(self.size)
+        self.world_map = world_map
+        world_map.seed = self.setup_noise()
+        thresholds = self.config["thresholds"]
+        
+        for x in range(self.size):
+            for y in range(self.size):
+                e, m = self.sample(x, y)
+                world_map.tiles[(x, y)] = Tile(x, y, e, m, thresholds, world_map.seed)
+
+            if x % columns_per_step == columns_per_step - 1:
+                yield 0.9 * (x + 1) / self.size
+
+        self._generate_rivers(world_map)
+        yield 1.0
+            
+    def setup_noise(self):
+        """Creates the noise fields for the configured seed, picking one if it is -1. Returns the seed."""
         gen_cfg = self.config["generation"]
         seed = gen_cfg["seed"]
         if seed == -1:
@@ -20,47 +45,44 @@ class WorldGenerator:
         freq = gen_cfg.get("noise_frequency", 8)
         table_size = gen_cfg.get("noise_table_size", 256)
             
-        elev_noise = PerlinNoise2(octaves, freq, table_size, seed)
-        moist_noise = PerlinNoise2(octaves, freq, table_size, seed + 1)
+        self.elev_noise = PerlinNoise2(octaves, freq, table_size, seed)
+        self.moist_noise = PerlinNoise2(octaves, freq, table_size, seed + 1)
+        return seed
+
+    def sample(self, x, y):
+        """Elevation and moisture of tile (x, y), both in [0, 1]. Needs setup_noise first."""
+        gen_cfg = self.config["generation"]
+
+        # Elevation generation
+        blend = gen_cfg["elevation_blend"]
+        e = (self.elev_noise.noise(x * gen_cfg["elevation_scale_1"], y * gen_cfg["elevation_scale_1"]) * blend + 
+             self.elev_noise.noise(x * gen_cfg["elevation_scale_2"], y * gen_cfg["elevation_scale_2"]) * (1.0 - blend))
+        e = (e + 1.0) / 2.0
         
-        thresholds = self.config["thresholds"]
+        bias_strength = gen_cfg.get("ocean_bias_strength", 0.0)
+        bias_direction = gen_cfg.get("ocean_bias_direction", "west").lower()
         
-        for x in range(self.size):
-            for y in range(self.size):
-                # Elevation generation
-                blend = gen_cfg["elevation_blend"]
-                e = (elev_noise.noise(x * gen_cfg["elevation_scale_1"], y * gen_cfg["elevation_scale_1"]) * blend + 
-                     elev_noise.noise(x * gen_cfg["elevation_scale_2"], y * gen_cfg["elevation_scale_2"]) * (1.0 - blend))
-                e = (e + 1.0) / 2.0
-                
-                bias_strength = gen_cfg.get("ocean_bias_strength", 0.0)
-                bias_direction = gen_cfg.get("ocean_bias_direction", "west").lower()
-                
-                bias_factor = 0.0
-                if bias_direction == "west":
-                    bias_factor = (1.0 - (x / self.size)) ** 4
-                elif bias_direction == "east":
-                    bias_factor = (x / self.size) ** 4
-                elif bias_direction == "south":
-                    bias_factor = (1.0 - (y / self.size)) ** 4
-                elif bias_direction == "north":
-                    bias_factor = (y / self.size) ** 4
-                    
-                e -= bias_strength * bias_factor
-                
-                e = (e - gen_cfg["norm_offset"]) / gen_cfg["norm_range"]
-                e = max(0, min(1, e))
-                
-                # Moisture generation
-                m = (moist_noise.noise(x * gen_cfg["moisture_scale"], y * gen_cfg["moisture_scale"]) + 1.0) / 2.0
-                m = (m - gen_cfg["norm_offset"]) / gen_cfg["norm_range"]
-                m = max(0, min(1, m))
-                
-                world_map.tiles[(x, y)] = Tile(x, y, e, m, thresholds)
-
-        self._generate_rivers(world_map)
-        return world_map
+        bias_factor = 0.0
+        if bias_direction == "west":
+            bias_factor = (1.0 - (x / self.size)) ** 4
+        elif bias_direction == "east":
+            bias_factor = (x / self.size) ** 4
+        elif bias_direction == "south":
+            bias_factor = (1.0 - (y / self.size)) ** 4
+        elif bias_direction == "north":
+            bias_factor = (y / self.size) ** 4
             
+        e -= bias_strength * bias_factor
+        
+        e = (e - gen_cfg["norm_offset"]) / gen_cfg["norm_range"]
+        e = max(0, min(1, e))
+        
+        # Moisture generation
+        m = (self.moist_noise.noise(x * gen_cfg["moisture_scale"], y * gen_cfg["moisture_scale"]) + 1.0) / 2.0
+        m = (m - gen_cfg["norm_offset"]) / gen_cfg["norm_range"]
+        m = max(0, min(1, m))
+        return e, m
+
     def _generate_rivers(self, world_map):
         sim_cfg = self.config["simulation"]
         gen_cfg = self.config["generation"]
@@ -68,13 +90,14 @@ class WorldGenerator:
         
         min_ratio = gen_cfg.get("river_count_min_ratio", 0.1)
         max_ratio = gen_cfg.get("river_count_max_ratio", 0.2)
-        num_rivers = random.randint(int(self.size * min_ratio), int(self.size * max_ratio))
+        rng = RNGStreams(world_map.seed).stream("rivers")
+        num_rivers = rng.randint(int(self.size * min_ratio), int(self.size * max_ratio))
         
         if not sources:
             return
 
         for _ in range(min(num_rivers, len(sources))):
-            current = random.choice(sources)
+            current = rng.choice(sources)
             sources.remove(current)
             
             path = []
@@ -100,7 +123,7 @@ class WorldGenerator:
                 next_tile = neighbors[0]
                 
                 if next_tile.elevation >= current.elevation:
-                    if random.random() > sim_cfg["river_stop_chance"]:
+                    if rng.random() > sim_cfg["river_stop_chance"]:
                         break
                 
                 current = next_tile
@@ -0,0 +1,54 @@
+import numpy as np
+from typing import Union, Sequence
+
+from .map import WorldMap
+
+ArrayLike = Union[np.ndarray, Sequence[float]]
+
+
+class HeightField:
+    """Bilinear sampler over the terrain's corner heights.
+
+    Corner (x, y) of the terrain mesh takes the elevation of tile (x, y), clamped to the
+    map, so the sampled surface matches the rendered one exactly. Queries take whole arrays
+    of positions and are answered with a handful of numpy operations."""
+
+    def __init__(self, elevations: np.ndarray, scale: float = 1.0):
+        self.size = elevations.shape[0]
+        self.corners = np.pad(elevations * scale, ((0, 1), (0, 1)), mode="edge")
+
+    @classmethod
+    def from_world(cls, world_map: WorldMap, scale: float = 1.0) -> "HeightField":
+        elevations = np.zeros((world_map.size, world_map.size))
+        for (x, y), tile in world_map.tiles.items():
+            elevations[x, y] = tile.elevation
+        return cls(elevations, scale)
+
+    def sample(self, xs: ArrayLike, ys: ArrayLike) -> np.ndarray:
+        """Heights at world positions (xs[i], ys[i]); positions outside the map are clamped."""
+        xs = np.clip(np.asarray(xs, dtype=float), 0, self.size)
+        ys = np.clip(np.asarray(ys, dtype=float), 0, self.size)
+        x0 = np.minimum(xs.astype(int), self.size - 1)
+        y0 = np.minimum(ys.astype(int), self.size - 1)
+        lx = xs - x0
+        ly = ys - y0
+
+        c = self.corners
+        h_bottom = c[x0, y0] * (1 - lx) + c[x0 + 1, y0] * lx
+        h_top = c[x0, y0 + 1] * (1 - lx) + c[x0 + 1, y0 + 1] * lx
+        return h_bottom * (1 - ly) + h_top * ly
+
+    def height_at(self, x: float, y: float) -> float:
+        return float(self.sample([x], [y])[0])
+
+    def normals(self) -> np.ndarray:
+        """Flat normal of every tile's quad, shaped (size, size, 3)."""
+        return quad_normals(self.corners)
+
+
+def quad_normals(corners: np.ndarray) -> np.ndarray:
+    """Unit normals of the quads between a grid of corner heights: (v1 - v0) x (v3 - v0)
+    for corners v0 = (x, y), v1 = (x + 1, y) and v3 = (x, y + 1)."""
+    h00, h10, h01 = corners[:-1, :-1], corners[1:, :-1], corners[:-1, 1:]
+    normals = np.stack([h00 - h10, h00 - h01, np.ones_like(h00)], axis=-1)
+    return normals / np.linalg.norm(normals, axis=-1, keepdims=True)
@@ -0,0 +1,246 @@
+from array import array
+from typing import Dict, List, Tuple, Optional, Any, Callable
+
+from .constants import BuildingType, ResourceType
+from .models import Building, Settlement
+
+RESOURCES = list(ResourceType)
+BUILDING_TYPES = list(BuildingType)
+
+# (type, tile x, tile y, local x, local y, settlement id or -1, primary resource or -1)
+BuildingRecord = Tuple[int, int, int, float, float, int, int]
+# (name, tile x, tile y)
+SettlementRecord = Tuple[str, int, int]
+
+
+class TurnDelta:
+    def __init__(self, turn: int, first_building: int = 0, first_settlement: int = 0):
+        self.turn = turn
+        self.first_building = first_building # Id of the first building founded this turn
+        self.first_settlement = first_settlement
+        self.buildings: List[BuildingRecord] = []
+        self.settlements: List[SettlementRecord] = []
+        # Changed inventory slots, keyed by building id * len(RESOURCES) + resource index
+        self.slots = array('q')
+        self.amounts = array('q')
+        self.buffers = array('d')
+
+
+class Keyframe:
+    def __init__(self, turn: int, building_count: int, settlement_count: int,
+                 amounts: array, buffers: array, prices: Any, resources: Any = None):
+        self.turn = turn
+        self.building_count = building_count
+        self.settlement_count = settlement_count
+        self.amounts = amounts
+        self.buffers = buffers
+        self.prices = prices
+        self.resources = resources # ResourceField snapshot, if tile stocks are simulated
+
+
+class TurnHistory:
+    """Per-turn delta log of the world with periodic keyframes for seeking.
+
+    Buildings and settlements get ids in creation order. Objects are kept around when
+    rewinding, so seeking back and forth re-attaches the same instances."""
+
+    def __init__(self, simulation, keyframe_interval: int = 25):
+        self.simulation = simulation
+        self.world_map = simulation.world_map
+        self.keyframe_interval = keyframe_interval
+        self.turn = 0
+        self.deltas: Dict[int, TurnDelta] = {}
+        self.keyframes: Dict[int, Keyframe] = {}
+
+        self._buildings: List[Building] = []
+        self._building_records: List[BuildingRecord] = []
+        self._building_ids: Dict[Building, int] = {}
+        self._settlements: List[Settlement] = []
+        self._settlement_records: List[SettlementRecord] = []
+        self._settlement_ids: Dict[Settlement, int] = {}
+        self._amounts = array('q') # Last recorded inventory, one slot per building and resource
+        self._buffers = array('d')
+
+        for s in self.world_map.settlements:
+            self._add_settlement(s)
+        for tile in self.world_map.tiles.values():
+            for b in tile.buildings:
+                self._add_building(b)
+        self._capture_inventory(TurnDelta(0))
+        self._add_keyframe(0)
+
+    @property
+    def last_turn(self) -> int:
+        return max(self.deltas) if self.deltas else 0
+
+    def record(self, turn: int) -> TurnDelta:
+        """Records the changes made during `turn`. Call once the turn has fully run."""
+        delta = TurnDelta(turn, len(self._buildings), len(self._settlements))
+        for s in self.world_map.settlements[len(self._settlements):]:
+            delta.settlements.append(self._add_settlement(s))
+        for b in self.simulation.new_buildings:
+            if b not in self._building_ids:
+                delta.buildings.append(self._add_building(b))
+        self._capture_inventory(delta)
+
+        self.deltas[turn] = delta
+        self.turn = turn
+        if turn % self.keyframe_interval == 0:
+            self._add_keyframe(turn)
+        return delta
+
+    def seek(self, turn: int) -> None:
+        """Restores the world to the end of `turn` from the nearest earlier keyframe."""
+        if turn < 0 or turn > self.last_turn:
+            raise ValueError(f"Turn {turn} is not in the history (0-{self.last_turn})")
+        base = max(t for t in self.keyframes if t <= turn)
+        self._restore(self.keyframes[base])
+        for t in range(base + 1, turn + 1):
+            self._apply(self.deltas[t])
+        # Random streams are keyed by turn, so this is all it takes to re-roll the same future
+        self.simulation.turn = turn
+        self.turn = turn
+
+    def truncate(self) -> None:
+        """Forgets every turn after the current one, so the simulation can continue from it."""
+        for t in [t for t in self.deltas if t > self.turn]:
+            del self.deltas[t]
+        for t in [t for t in self.keyframes if t > self.turn]:
+            del self.keyframes[t]
+        building_count = len(self.simulation_buildings())
+        for b in self._buildings[building_count:]:
+            del self._building_ids[b]
+        del self._buildings[building_count:]
+        del self._building_records[building_count:]
+        settlement_count = len(self.world_map.settlements)
+        for s in self._settlements[settlement_count:]:
+            del self._settlement_ids[s]
+        del self._settlements[settlement_count:]
+        del self._settlement_records[settlement_count:]
+        del self._amounts[building_count * len(RESOURCES):]
+        del self._buffers[building_count * len(RESOURCES):]
+
+    def replay(self, start: int, end: int, on_turn: Optional[Callable[[int], None]] = None) -> None:
+        """Replays recorded turns start+1..end from the recorded deltas, without re-rolling anything."""
+        self.seek(start)
+        for t in range(start + 1, end + 1):
+            self._apply(self.deltas[t])
+            self.simulation.turn = t
+            self.turn = t
+            if on_turn:
+                on_turn(t)
+
+    def snapshot(self) -> TurnDelta:
+        """The current world as a single delta from an empty map: every attached settlement
+        and building, and every inventory slot."""
+        building_count = len(self.simulation_buildings())
+        n = len(RESOURCES)
+        delta = TurnDelta(self.turn)
+        delta.settlements = self._settlement_records[:len(self.world_map.settlements)]
+        delta.buildings = self._building_records[:building_count]
+        delta.slots = array('q', range(building_count * n))
+        delta.amounts = self._amounts[:building_count * n]
+        delta.buffers = self._buffers[:building_count * n]
+        return delta
+
+    def simulation_buildings(self) -> List[Building]:
+        """Recorded buildings currently attached to the world, in id order."""
+        return [b for b in self._buildings if b in b.tile.buildings]
+
+    def _add_settlement(self, s: Settlement) -> SettlementRecord:
+        record = (s.name, s.tile.x, s.tile.y)
+        self._settlement_ids[s] = len(self._settlements)
+        self._settlements.append(s)
+        self._settlement_records.append(record)
+        return record
+
+    def _add_building(self, b: Building) -> BuildingRecord:
+        record = (
+            BUILDING_TYPES.index(b.type), b.tile.x, b.tile.y, b.local_pos[0], b.local_pos[1],
+            self._settlement_ids[b.settlement] if b.settlement else -1,
+            RESOURCES.index(b.primary_resource) if b.primary_resource else -1,
+        )
+        self._building_ids[b] = len(self._buildings)
+        self._buildings.append(b)
+        self._building_records.append(record)
+        self._amounts.extend([0] * len(RESOURCES))
+        self._buffers.extend([0.0] * len(RESOURCES))
+        return record
+
+    def _capture_inventory(self, delta: TurnDelta) -> None:
+        n = len(RESOURCES)
+        amounts = self._amounts
+        buffers = self._buffers
+        for bid, b in enumerate(self._buildings):
+            base = bid * n
+            for ridx, res in enumerate(RESOURCES):
+                amount = b.inventory[res]
+                buf = b._resource_buffers[res]
+                if amount != amounts[base + ridx] or buf != buffers[base + ridx]:
+                    amounts[base + ridx] = amount
+                    buffers[base + ridx] = buf
+                    delta.slots.append(base + ridx)
+                    delta.amounts.append(amount)
+                    delta.buffers.append(buf)
+
+    def _add_keyframe(self, turn: int) -> None:
+        market = self.simulation.market
+        resources = self.simulation.resources
+        self.keyframes[turn] = Keyframe(
+            turn, len(self._buildings), len(self._settlements),
+            array('q', self._amounts), array('d', self._buffers),
+            market.prices.copy(), resources.snapshot() if resources else None,
+        )
+
+    def _restore(self, keyframe: Keyframe) -> None:
+        for tile in {b.tile for b in self._buildings}:
+            tile.buildings = []
+        for s in self._settlements:
+            s.buildings = []
+        self.world_map.settlements = self._settlements[:keyframe.settlement_count]
+        for bid in range(keyframe.building_count):
+            self._attach(bid)
+
+        self._amounts = array('q', keyframe.amounts)
+        self._buffers = array('d', keyframe.buffers)
+        n = len(RESOURCES)
+        for bid in range(keyframe.building_count):
+            b = self._buildings[bid]
+            for ridx, res in enumerate(RESOURCES):
+                b.inventory[res] = self._amounts[bid * n + ridx]
+                b._resource_buffers[res] = self._buffers[bid * n + ridx]
+        # Pad slots of buildings created after the keyframe, they are re-filled as deltas apply
+        padding = len(self._buildings) * n - len(self._amounts)
+        self._amounts.extend([0] * padding)
+        self._buffers.extend([0.0] * padding)
+
+        self.simulation.market.prices = keyframe.prices.copy()
+        if keyframe.resources is not None:
+            self.simulation.resources.restore(keyframe.resources)
+        self.simulation.rebuild_caches()
+
+    def _apply(self, delta: TurnDelta) -> None:
+        for sid in range(delta.first_settlement, delta.first_settlement + len(delta.settlements)):
+            self.world_map.settlements.append(self._settlements[sid])
+        for bid in range(delta.first_building, delta.first_building + len(delta.buildings)):
+            self._attach(bid)
+            self.simulation.register_building(self._buildings[bid])
+
+        n = len(RESOURCES)
+        for slot, amount, buf in zip(delta.slots, delta.amounts, delta.buffers):
+            b = self._buildings[slot // n]
+            res = RESOURCES[slot % n]
+            b.inventory[res] = amount
+            b._resource_buffers[res] = buf
+            self._amounts[slot] = amount
+            self._buffers[slot] = buf
+        # Tile stocks aren't logged; they follow from the buildings, like prices
+        if self.simulation.resources:
+            self.simulation.resources.step()
+        self.simulation.market.clear()
+
+    def _attach(self, bid: int) -> None:
+        b = self._buildings[bid]
+        b.tile.buildings.append(b)
+        if b.settlement:
+            b.settlement.buildings.append(b)
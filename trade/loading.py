@@ -0,0 +1,105 @@
+import time
+from direct.gui.DirectGui import DirectFrame, DirectLabel, DirectWaitBar
+from direct.task import Task
+from panda3d.core import TextNode
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
+
+
+class LoadingScreen:
+    """Progress bar along the bottom of the screen, so the scene stays visible behind it."""
+
+    def __init__(self, parent):
+        self.frame = DirectFrame(
+            frameColor=(0, 0, 0, 0.6),
+            frameSize=(-0.8, 0.8, -0.1, 0.1),
+            pos=(0, 0, -0.8),
+            parent=parent
+        )
+        self.label = DirectLabel(
+            text="Loading...",
+            scale=0.05,
+            pos=(0, 0, 0.03),
+            parent=self.frame,
+            frameColor=(0, 0, 0, 0),
+            text_fg=(1, 1, 1, 1),
+            text_align=TextNode.ACenter
+        )
+        self.bar = DirectWaitBar(
+            range=100,
+            value=0,
+            scale=(0.7, 1, 0.3),
+            pos=(0, 0, -0.04),
+            barColor=(0.2, 0.9, 0.2, 1),
+            parent=self.frame
+        )
+
+    def update(self, stage: str, progress: float):
+        self.label["text"] = f"{stage}..."
+        self.bar["value"] = progress * 100
+
+    def destroy(self):
+        self.frame.destroy()
+
+
+class StartupPipeline:
+    """Runs startup stages spread over frames instead of blocking before the first one.
+
+    Each stage is a generator that does a slice of work per `next()` and yields its
+    progress in [0, 1]. Every frame the pipeline advances stages until `frame_budget`
+    seconds are used up, and it records the time spent in each stage."""
+
+    def __init__(self, task_mgr, frame_budget: float = 0.03,
+                 on_progress: Optional[Callable[[str, float], None]] = None,
+                 on_done: Optional[Callable[[], None]] = None):
+        self.task_mgr = task_mgr
+        self.frame_budget = frame_budget
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.timings: Dict[str, float] = {}
+        self.first_frame: Optional[float] = None # Seconds from the start of startup to the first frame
+        self._stages: List[Tuple[str, Callable[[], Iterator[float]]]] = []
+        self._index = 0
+        self._current: Optional[Iterator[float]] = None
+        self._started = 0.0
+
+    def add_stage(self, name: str, stage: Callable[[], Iterator[float]]) -> None:
+        self._stages.append((name, stage))
+
+    def start(self, started: Optional[float] = None) -> None:
+        """Begins running stages from the next frame. `started` is when startup began, if earlier."""
+        self._started = started if started is not None else time.perf_counter()
+        self.task_mgr.add(self._run, "StartupPipeline")
+
+    def report(self) -> str:
+        stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.timings.items())
+        total = time.perf_counter() - self._started
+        return f"Startup: first frame {self.first_frame:.2f}s, {stages} (total {total:.2f}s)"
+
+    def _run(self, task):
+        if self.first_frame is None:
+            self.first_frame = time.perf_counter() - self._started
+        deadline = time.perf_counter() + self.frame_budget
+        while True:
+            if self._index >= len(self._stages):
+                if self.on_done:
+                    self.on_done()
+                return Task.done
+
+            name, stage = self._stages[self._index]
+            start = time.perf_counter()
+            if self._current is None:
+                self._current = iter(stage())
+            progress = next(self._current, None)
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+            if progress is None:
+                self._current = None
+                self._index += 1
+                overall = self._index / len(self._stages)
+            else:
+                overall = (self._index + min(progress, 1.0)) / len(self._stages)
+            if self.on_progress:
+                self.on_progress(name, overall)
+            # At least one slice per frame, however small the budget
+            if time.perf_counter() >= deadline:
+                return Task.cont
@@ -0,0 +1,131 @@
+from panda3d.core import NodePath, CardMaker, Point3
+from typing import Dict, Any, Tuple, Set, Optional, Hashable
+
+from .models import Building
+
+
+class BuildingGroup:
+    def __init__(self, key: Hashable, parent: NodePath, color: Tuple[float, float, float]):
+        self.key = key
+        self.color = color
+        self.detail = parent.attachNewNode("detail")
+        self.impostor: Optional[NodePath] = None
+        self.members: Dict[Building, Point3] = {}
+        self.center = Point3(0, 0, 0)
+        self.showing_detail = True
+
+
+class BuildingLOD:
+    """Groups building nodes per settlement and per grid cell of resource buildings.
+
+    Each group is drawn either as its individual buildings or as a single flat impostor
+    quad over the group's footprint, coloured by building density. Groups switch to the
+    impostor once the camera zooms out past `zoom_threshold`, or when they are further
+    than `detail_radius` from the camera."""
+
+    def __init__(self, parent: NodePath, config: Dict[str, Any]):
+        cfg = config.get("lod", {})
+        self.config = config
+        self.cell_size = cfg.get("cluster_cell_size", 16)
+
+        self.root = parent.attachNewNode("BuildingLOD")
+        self.groups: Dict[Hashable, BuildingGroup] = {}
+        self._group_of: Dict[Building, BuildingGroup] = {}
+        self._dirty: Set[Hashable] = set()
+        self._last_view: Optional[Tuple[float, float, float, float]] = None
+        self.configure()
+
+    def configure(self) -> None:
+        """Reads thresholds and colours from the config and redraws every impostor with them.
+        The cell size only applies at startup, since it decides which group a building is in."""
+        cfg = self.config.get("lod", {})
+        self.zoom_threshold = cfg.get("zoom_threshold", 150.0)
+        self.detail_radius = cfg.get("detail_radius", 120.0)
+        self.density_full = cfg.get("density_full", 0.5) # Buildings per tile for full colour
+        self.settlement_color = tuple(cfg.get("settlement_color", [0.8, 0.3, 0.2]))
+        self.resource_color = tuple(cfg.get("resource_color", [0.3, 0.25, 0.2]))
+        for key, group in self.groups.items():
+            group.color = self.settlement_color if key[0] == "settlement" else self.resource_color
+            self._dirty.add(key)
+        self._last_view = None
+
+    def group_for(self, building: Building, pos: Point3) -> NodePath:
+        """Registers a building and returns the node its geometry should be parented to."""
+        if building.settlement:
+            key = ("settlement", building.settlement.name)
+            color = self.settlement_color
+        else:
+            key = ("cell", building.tile.x // self.cell_size, building.tile.y // self.cell_size)
+            color = self.resource_color
+
+        group = self.groups.get(key)
+        if group is None:
+            group = BuildingGroup(key, self.root, color)
+            self.groups[key] = group
+        group.members[building] = Point3(pos)
+        self._group_of[building] = group
+        self._dirty.add(key)
+        return group.detail
+
+    def remove(self, building: Building) -> None:
+        group = self._group_of.pop(building, None)
+        if group:
+            del group.members[building]
+            self._dirty.add(group.key)
+
+    def refresh(self) -> None:
+        """Rebuilds the impostors of groups whose buildings changed."""
+        for key in self._dirty:
+            group = self.groups[key]
+            if group.impostor:
+                group.impostor.removeNode()
+                group.impostor = None
+            if group.members:
+                group.impostor = self._make_impostor(group)
+                if group.showing_detail:
+                    group.impostor.stash()
+        self._dirty.clear()
+        self._last_view = None
+
+    def update(self, camera_pos: Point3, zoom_level: float) -> None:
+        view = (round(camera_pos.x), round(camera_pos.y), round(camera_pos.z), zoom_level)
+        if view == self._last_view:
+            return
+        self._last_view = view
+
+        far = zoom_level > self.zoom_threshold
+        radius_sq = self.detail_radius ** 2
+        for group in self.groups.values():
+            detail = not far and (group.center - camera_pos).lengthSquared() < radius_sq
+            if detail == group.showing_detail:
+                continue
+            group.showing_detail = detail
+            if detail:
+                group.detail.unstash()
+                if group.impostor:
+                    group.impostor.stash()
+            else:
+                group.detail.stash()
+                if group.impostor:
+                    group.impostor.unstash()
+
+    def _make_impostor(self, group: BuildingGroup) -> NodePath:
+        xs = [p.x for p in group.members.values()]
+        ys = [p.y for p in group.members.values()]
+        top = max(p.z for p in group.members.values())
+        x0, x1 = min(xs) - 0.5, max(xs) + 0.5
+        y0, y1 = min(ys) - 0.5, max(ys) + 0.5
+        group.center = Point3((x0 + x1) / 2, (y0 + y1) / 2, top)
+
+        density = len(group.members) / ((x1 - x0) * (y1 - y0))
+        shade = 0.4 + 0.6 * min(1.0, density / self.density_full)
+
+        cm = CardMaker(f"impostor-{group.key}")
+        cm.setFrame(x0, x1, y0, y1)
+        card = self.root.attachNewNode(cm.generate())
+        # Cards are generated in the XZ plane; tip it over so it lies on the ground facing up
+        card.setP(-90)
+        card.setZ(top + 0.2)
+        r, g, b = group.color
+        card.setColor(r * shade, g * shade, b * shade, 1.0)
+        return card
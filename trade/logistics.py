@@ -0,0 +1,384 @@
+import heapq
+import math
+from typing import Dict, List, Tuple, Optional, Any, Set
+
+from .constants import TileType, ResourceType
+from .models import Building, Settlement
+from .map import WorldMap
+
+Pos = Tuple[int, int]
+Cluster = Tuple[int, int]
+
+_NEIGHBOURS = [(dx, dy, 1.0 if dx == 0 or dy == 0 else math.sqrt(2))
+               for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+
+class Route:
+    def __init__(self, cost: float, waypoints: List[Pos], clusters: Set[Cluster]):
+        self.cost = cost
+        self.waypoints = waypoints # start, cluster entrances crossed, goal
+        self.clusters = clusters
+
+
+class PathFinder:
+    """Hierarchical pathfinder: the map is split into square clusters connected through
+    entrance tiles on their borders. Cluster graphs and routes are cached and only the
+    clusters around a changed tile are invalidated."""
+
+    def __init__(self, world_map: WorldMap, config: Dict[str, Any]):
+        self.world_map = world_map
+        self.configure(config)
+
+        self._borders: Dict[Tuple[Cluster, Cluster], List[Tuple[Pos, Pos]]] = {}
+        self._partners: Dict[Pos, Dict[Pos, float]] = {} # edges across cluster borders
+        self._graphs: Dict[Cluster, Dict[Pos, Dict[Pos, float]]] = {} # edges inside a cluster
+        self._costs: Dict[Cluster, Dict[Pos, Tuple[float, float]]] = {} # passable tile -> (cost, elevation)
+        self._routes: Dict[Tuple[Pos, Pos], Optional[Route]] = {}
+        self._routes_by_cluster: Dict[Cluster, Set[Tuple[Pos, Pos]]] = {}
+
+    def configure(self, config: Dict[str, Any]) -> None:
+        """Reads movement costs from the config. Call reset() afterwards if routes were cached."""
+        cfg = config.get("logistics", {})
+        self.cluster_size: int = cfg.get("cluster_size", 16)
+        self.slope_cost: float = cfg.get("slope_cost", 20.0)
+        self.building_cost: float = cfg.get("building_cost", 0.5)
+        self.terrain_cost = {TileType[name]: cost for name, cost in cfg.get("terrain_cost", {}).items()}
+
+        passable = [c for c in self.terrain_cost.values() if c > 0] or [1.0]
+        self._min_step = min(passable) * min(1.0, self.building_cost)
+
+    def reset(self) -> None:
+        self._borders.clear()
+        self._partners.clear()
+        self._graphs.clear()
+        self._costs.clear()
+        self._routes.clear()
+        self._routes_by_cluster.clear()
+
+    def find_route(self, start: Pos, goal: Pos) -> Optional[Route]:
+        """Returns the cheapest known route between two tiles, or None if unreachable."""
+        key = (start, goal)
+        if key in self._routes:
+            return self._routes[key]
+
+        route = self._plan(start, goal)
+        self._routes[key] = route
+        clusters = route.clusters if route else {self._cluster_of(start), self._cluster_of(goal)}
+        for c in clusters:
+            self._routes_by_cluster.setdefault(c, set()).add(key)
+        return route
+
+    def invalidate_tile(self, x: int, y: int) -> None:
+        """Drops cached data that depends on the cost of the given tile."""
+        c = self._cluster_of((x, y))
+        self._costs.pop(c, None)
+        affected = {c}
+        lx = x - c[0] * self.cluster_size
+        ly = y - c[1] * self.cluster_size
+        if lx == 0:
+            affected.add((c[0] - 1, c[1]))
+        elif lx == self.cluster_size - 1:
+            affected.add((c[0] + 1, c[1]))
+        if ly == 0:
+            affected.add((c[0], c[1] - 1))
+        elif ly == self.cluster_size - 1:
+            affected.add((c[0], c[1] + 1))
+
+        for n in affected:
+            if n != c:
+                self._drop_border(c, n)
+        for n in affected:
+            self._graphs.pop(n, None)
+            for key in self._routes_by_cluster.pop(n, ()):
+                self._routes.pop(key, None)
+
+    def invalidate_area(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """Drops cached data for every cluster overlapping the area (x1, y1 exclusive),
+        e.g. after its tiles were paged in or out."""
+        cs = self.cluster_size
+        clusters = {(cx, cy) for cx in range(x0 // cs, (x1 - 1) // cs + 1)
+                    for cy in range(y0 // cs, (y1 - 1) // cs + 1)}
+        affected = set(clusters)
+        for c in clusters:
+            self._costs.pop(c, None)
+            for n in [(c[0] - 1, c[1]), (c[0] + 1, c[1]), (c[0], c[1] - 1), (c[0], c[1] + 1)]:
+                self._drop_border(c, n)
+                affected.add(n)
+        for n in affected:
+            self._graphs.pop(n, None)
+            for key in self._routes_by_cluster.pop(n, ()):
+                self._routes.pop(key, None)
+
+    def _cluster_of(self, pos: Pos) -> Cluster:
+        return (pos[0] // self.cluster_size, pos[1] // self.cluster_size)
+
+    def _bounds(self, cluster: Cluster) -> Tuple[int, int, int, int]:
+        size = self.world_map.size
+        x0 = cluster[0] * self.cluster_size
+        y0 = cluster[1] * self.cluster_size
+        return x0, y0, min(size, x0 + self.cluster_size), min(size, y0 + self.cluster_size)
+
+    def _tile_cost(self, pos: Pos) -> Optional[float]:
+        tile = self.world_map.get_tile(*pos)
+        if tile is None:
+            return None
+        cost = self.terrain_cost.get(tile.type, 1.0)
+        if cost <= 0:
+            return None
+        if tile.buildings:
+            cost *= self.building_cost
+        return cost
+
+    def _cluster_costs(self, cluster: Cluster) -> Dict[Pos, Tuple[float, float]]:
+        table = self._costs.get(cluster)
+        if table is None:
+            table = {}
+            x0, y0, x1, y1 = self._bounds(cluster)
+            for x in range(x0, x1):
+                for y in range(y0, y1):
+                    cost = self._tile_cost((x, y))
+                    if cost is not None:
+                        table[(x, y)] = (cost, self.world_map.get_tile(x, y).elevation)
+            self._costs[cluster] = table
+        return table
+
+    def _step_cost(self, a: Pos, b: Pos, dist: float) -> Optional[float]:
+        ca = self._tile_cost(a)
+        cb = self._tile_cost(b)
+        if ca is None or cb is None:
+            return None
+        dh = self.world_map.get_tile(*a).elevation - self.world_map.get_tile(*b).elevation
+        return (ca + cb) * 0.5 * dist + self.slope_cost * abs(dh)
+
+    def _heuristic(self, a: Pos, b: Pos) -> float:
+        dx = abs(a[0] - b[0])
+        dy = abs(a[1] - b[1])
+        return (max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)) * self._min_step
+
+    def _search_cluster(self, cluster: Cluster, start: Pos, targets: Set[Pos]) -> Dict[Pos, float]:
+        """Dijkstra restricted to one cluster, returning costs to the reachable targets."""
+        table = self._cluster_costs(cluster)
+        if start not in table:
+            return {}
+        slope_cost = self.slope_cost
+        dist = {start: 0.0}
+        found: Dict[Pos, float] = {}
+        heap = [(0.0, start)]
+        while heap:
+            d, pos = heapq.heappop(heap)
+            if d > dist[pos]:
+                continue
+            if pos in targets:
+                found[pos] = d
+                if len(found) == len(targets):
+                    break
+            cost, elev = table[pos]
+            for dx, dy, step in _NEIGHBOURS:
+                nxt = (pos[0] + dx, pos[1] + dy)
+                other = table.get(nxt)
+                if other is None:
+                    continue
+                nd = d + (cost + other[0]) * 0.5 * step + slope_cost * abs(elev - other[1])
+                if nd < dist.get(nxt, math.inf):
+                    dist[nxt] = nd
+                    heapq.heappush(heap, (nd, nxt))
+        return found
+
+    def _border(self, a: Cluster, b: Cluster) -> List[Tuple[Pos, Pos]]:
+        key = (a, b) if a < b else (b, a)
+        if key in self._borders:
+            return self._borders[key]
+
+        lo, hi = key
+        pairs = []
+        if lo[0] != hi[0]:
+            _, y0, _, y1 = self._bounds(lo)
+            x = hi[0] * self.cluster_size
+            pairs = [((x - 1, y), (x, y)) for y in range(y0, y1)]
+        else:
+            x0, _, x1, _ = self._bounds(lo)
+            y = hi[1] * self.cluster_size
+            pairs = [((x, y - 1), (x, y)) for x in range(x0, x1)]
+
+        # One entrance per open stretch of border, two for long stretches
+        entrances = []
+        run: List[Tuple[Pos, Pos]] = []
+        for pair in pairs + [None]:
+            if pair is not None and self._step_cost(pair[0], pair[1], 1.0) is not None:
+                run.append(pair)
+                continue
+            if len(run) >= 6:
+                entrances.extend([run[0], run[-1]])
+            elif run:
+                entrances.append(run[len(run) // 2])
+            run = []
+
+        for p, q in entrances:
+            cost = self._step_cost(p, q, 1.0)
+            self._partners.setdefault(p, {})[q] = cost
+            self._partners.setdefault(q, {})[p] = cost
+        self._borders[key] = entrances
+        return entrances
+
+    def _drop_border(self, a: Cluster, b: Cluster) -> None:
+        key = (a, b) if a < b else (b, a)
+        for p, q in self._borders.pop(key, ()):
+            self._partners.get(p, {}).pop(q, None)
+            self._partners.get(q, {}).pop(p, None)
+
+    def _entrances(self, cluster: Cluster) -> Set[Pos]:
+        nodes = set()
+        x0, y0, x1, y1 = self._bounds(cluster)
+        cx, cy = cluster
+        for n in [(cx - 1, cy), (cx + 1, cy), (cx, cy - 1), (cx, cy + 1)]:
+            if n[0] < 0 or n[1] < 0 or n[0] * self.cluster_size >= self.world_map.size or n[1] * self.cluster_size >= self.world_map.size:
+                continue
+            for p, q in self._border(cluster, n):
+                nodes.add(p if x0 <= p[0] < x1 and y0 <= p[1] < y1 else q)
+        return nodes
+
+    def _graph(self, cluster: Cluster) -> Dict[Pos, Dict[Pos, float]]:
+        graph = self._graphs.get(cluster)
+        if graph is None:
+            nodes = self._entrances(cluster)
+            graph = {node: self._search_cluster(cluster, node, nodes - {node}) for node in nodes}
+            self._graphs[cluster] = graph
+        return graph
+
+    def _plan(self, start: Pos, goal: Pos) -> Optional[Route]:
+        sc = self._cluster_of(start)
+        gc = self._cluster_of(goal)
+        if sc == gc:
+            local = self._search_cluster(sc, start, {goal})
+            if goal in local:
+                return Route(local[goal], [start, goal], {sc})
+
+        start_edges = self._search_cluster(sc, start, self._entrances(sc))
+        goal_edges = self._search_cluster(gc, goal, self._entrances(gc))
+
+        # A* over the abstract graph of entrances
+        best = {start: 0.0}
+        came_from: Dict[Pos, Pos] = {}
+        heap = [(self._heuristic(start, goal), 0.0, start)]
+        while heap:
+            _, g, node = heapq.heappop(heap)
+            if node == goal:
+                path = [goal]
+                while path[-1] in came_from:
+                    path.append(came_from[path[-1]])
+                path.reverse()
+                return Route(g, path, {self._cluster_of(p) for p in path})
+            if g > best[node]:
+                continue
+
+            edges = list(start_edges.items()) if node == start else list(self._graph(self._cluster_of(node)).get(node, {}).items())
+            edges.extend(self._partners.get(node, {}).items())
+            if node in goal_edges:
+                edges.append((goal, goal_edges[node]))
+
+            for nxt, cost in edges:
+                ng = g + cost
+                if ng < best.get(nxt, math.inf):
+                    best[nxt] = ng
+                    came_from[nxt] = node
+                    heapq.heappush(heap, (ng + self._heuristic(nxt, goal), ng, nxt))
+        return None
+
+
+class Shipment:
+    def __init__(self, source: Building, destination: Settlement, resource: ResourceType, amount: int, cost: float):
+        self.source = source
+        self.destination = destination
+        self.resource = resource
+        self.amount = amount
+        self.cost = cost
+
+
+class LogisticsNetwork:
+    """Moves surplus goods from producing buildings to the settlements that consume them."""
+
+    def __init__(self, world_map: WorldMap, config: Dict[str, Any]):
+        self.world_map = world_map
+        self.config = config
+        self.pathfinder = PathFinder(world_map, config)
+        self.producers: List[Building] = []
+        self.shipments: List[Shipment] = []
+
+    def reset(self) -> None:
+        """Rebuilds producer lists and drops cached routes after the world was replaced wholesale."""
+        self.pathfinder.reset()
+        self.find_producers()
+        self.shipments = []
+
+    def find_producers(self) -> None:
+        self.producers = [b for tile in self.world_map.tiles.values() for b in tile.buildings
+                          if b.get_production_rates(self.config)]
+
+    def on_building_added(self, building: Building) -> None:
+        self.pathfinder.invalidate_tile(building.tile.x, building.tile.y)
+        if building.get_production_rates(self.config):
+            self.producers.append(building)
+
+    def update(self) -> None:
+        cfg = self.config.get("logistics", {})
+        stock_turns = cfg.get("stock_turns", 5.0)
+        max_cost = cfg.get("max_route_cost", 200.0)
+        candidates = cfg.get("candidates", 4)
+
+        self.shipments = []
+        needs = self._settlement_needs(stock_turns)
+        if not needs:
+            return
+
+        for producer in self.producers:
+            wanted = [res for res, amount in producer.inventory.items()
+                      if amount > 0 and any(need.get(res, 0) > 0 for need in needs.values())]
+            if not wanted:
+                continue
+
+            src = (producer.tile.x, producer.tile.y)
+            nearest = heapq.nsmallest(candidates, needs.keys(),
+                                      key=lambda s: (s.tile.x - src[0])**2 + (s.tile.y - src[1])**2)
+            routes = []
+            for s in nearest:
+                route = self.pathfinder.find_route(src, (s.tile.x, s.tile.y))
+                if route and route.cost <= max_cost:
+                    routes.append((route.cost, s))
+            routes.sort(key=lambda r: r[0])
+
+            for res in wanted:
+                for cost, settlement in routes:
+                    qty = min(producer.inventory[res], needs[settlement].get(res, 0))
+                    if qty <= 0:
+                        continue
+                    producer.add_resource(res, -qty)
+                    self._deliver(settlement, res, qty, stock_turns)
+                    needs[settlement][res] -= qty
+                    self.shipments.append(Shipment(producer, settlement, res, qty, cost))
+
+    def _building_need(self, building: Building, res: ResourceType, rate: float, stock_turns: float) -> int:
+        return max(0, math.ceil(rate * stock_turns) - building.inventory[res])
+
+    def _settlement_needs(self, stock_turns: float) -> Dict[Settlement, Dict[ResourceType, int]]:
+        needs = {}
+        for s in self.world_map.settlements:
+            need: Dict[ResourceType, int] = {}
+            for b in s.buildings:
+                for res, rate in b.get_consumption_rates(self.config).items():
+                    need[res] = need.get(res, 0) + self._building_need(b, res, rate, stock_turns)
+            need = {res: n for res, n in need.items() if n > 0}
+            if need:
+                needs[s] = need
+        return needs
+
+    def _deliver(self, settlement: Settlement, res: ResourceType, qty: int, stock_turns: float) -> None:
+        for b in settlement.buildings:
+            rate = b.get_consumption_rates(self.config).get(res)
+            if not rate:
+                continue
+            give = min(qty, self._building_need(b, res, rate, stock_turns))
+            if give > 0:
+                b.add_resource(res, give)
+                qty -= give
+            if qty == 0:
+                return
@@ -1,9 +1,11 @@
-import tomllib
+import argparse
+import time
 from direct.showbase.ShowBase import ShowBase
 from panda3d.core import WindowProperties, CollisionTraverser, CollisionNode, CollisionHandlerQueue, CollisionRay, NodePath, GeomNode
 from direct.gui.DirectGui import DirectButton
+from direct.task import Task
 
-from .simulation import WorldSimulation, TurnManager
+from .simulation import WorldSimulation, TurnManager, RELOADABLE_SECTIONS
 from .constants import ResourceType
 from .generation import WorldGenerator
 from .input import InputHandler
@@ -11,16 +13,28 @@ from .camera import CameraController
 from .render import MapRenderer
 from .assets import AssetManager
 from .ui import HUD, BuildingInfoUI
+from .loading import LoadingScreen, StartupPipeline
+from .memory import MemoryTracker
+from .timeseries import TimeSeries
+from .minimap import Minimap
+from .paging import PagedWorld, ChunkTerrain
+from .server import SimulationServer, ViewerClient
+from .protocol import DELTA, SNAPSHOT, BYE
+from .config import load_config, ConfigWatcher
 
 
-def load_config():
-    with open("config.toml", "rb") as f:
-        return tomllib.load(f)
-
 class Game(ShowBase):
-    def __init__(self):
+    def __init__(self, connect=False):
+        started = time.perf_counter()
         ShowBase.__init__(self)
         self.game_config = load_config()
+
+        # As a viewer, the world comes from a simulation server: same terrain from its size and seed
+        self.client = None
+        if connect:
+            self.client = ViewerClient(self.game_config)
+            self.game_config["map"]["size"] = self.client.info["size"]
+            self.game_config["generation"]["seed"] = self.client.info["seed"]
         
         self._setup_window()
         self.disableMouse()
@@ -28,25 +42,102 @@ class Game(ShowBase):
         
         self.input_handler = InputHandler(self)
         self.camera_controller = CameraController(self, self.input_handler, self.game_config)
-        self.asset_mgr = AssetManager(self.loader)
-        
+        self.asset_mgr = AssetManager(self.loader, self.game_config)
+        self.asset_mgr.preload(self.game_config.get("assets", {}).get("preload", []))
+
+        # The world is built by the startup pipeline over the first frames
+        startup_cfg = self.game_config.get("startup", {})
+        self.paging = self.game_config.get("paging", {}).get("enabled", False) and not connect
+        self.loading_screen = LoadingScreen(self.aspect2d)
+        self.startup = StartupPipeline(
+            self.taskMgr,
+            startup_cfg.get("frame_budget_ms", 30) / 1000.0,
+            on_progress=self.loading_screen.update,
+            on_done=self._finish_startup,
+        )
+        self.startup.add_stage("Generating world", self._generate_world)
+        self.startup.add_stage("Building terrain", self._build_terrain)
+        self.startup.add_stage("Growing settlements", self._grow_initial)
+        self.startup.add_stage("Placing buildings", self._place_initial_buildings)
+        self.startup.start(started)
+
+    def _generate_world(self):
         map_size = self.game_config["map"]["size"]
         self.generator = WorldGenerator(map_size, self.game_config)
-        self.world_map = self.generator.generate()
-        self.simulation = WorldSimulation(self.world_map, self.game_config)
+        if self.paging:
+            # Only the chunks around the camera are generated and loaded
+            self.paged_world = PagedWorld(self.generator, self.game_config)
+            self.world_map = self.paged_world.world_map
+            x, y = self._view_center()
+            total = len(self.paged_world.chunks_around(x, y, self.paged_world.focus_radius))
+            while (missing := self.paged_world.focus(x, y, 1)):
+                yield 1.0 - missing / total
+            return
+        yield from self.generator.generate_steps()
+        self.world_map = self.generator.world_map
 
-        self.renderer = MapRenderer(self.world_map, self.game_config)
-        self.renderer.render(self.render, self.asset_mgr)
-        
-        self.turn_mgr = TurnManager(self.simulation)
+    def _build_terrain(self):
+        if self.paging:
+            self.renderer = MapRenderer(self.world_map, self.game_config, self.paged_world.heightfield)
+            self.renderer.attach(self.render, self.asset_mgr)
+            self.terrain = ChunkTerrain(self.paged_world, self.renderer.root, self.game_config)
+            x, y = self._view_center()
+            total = len(self.paged_world.chunks_around(x, y, self.terrain.view_radius))
+            while (missing := self.terrain.update(x, y, 1)):
+                yield 1.0 - missing / total
+        else:
+            self.renderer = MapRenderer(self.world_map, self.game_config)
+            yield from self.renderer.render_steps(self.render, self.asset_mgr)
+        self.camera_controller.set_ground(self.renderer.heightfield)
+
+    def _grow_initial(self):
+        if self.client:
+            self.client.attach(self.world_map)
+            while SNAPSHOT not in self.client.poll():
+                yield 0.5
+            return
+        self.simulation = WorldSimulation(self.world_map, self.game_config, initial_growth=False)
+        yield from self.simulation.initial_growth_steps()
+
+    def _place_initial_buildings(self):
+        batch = self.game_config.get("startup", {}).get("buildings_per_step", 200)
+        buildings = self.client.replica.new_buildings if self.client else self.simulation.new_buildings
+        for start in range(0, len(buildings), batch):
+            self.renderer.update_buildings(self.asset_mgr, buildings[start:start + batch])
+            yield (start + batch) / len(buildings)
+
+    def _finish_startup(self):
+        self.loading_screen.destroy()
+        print(self.startup.report())
+
+        if self.client:
+            self.exitFunc = self.client.close
+            self.taskMgr.add(self._poll_server, "PollServer")
+        else:
+            self.turn_mgr = TurnManager(self.simulation)
+            self.exitFunc = self.turn_mgr.close
+        self.memory = MemoryTracker(self.game_config)
+        self.series = TimeSeries(self.game_config)
+        self._record_series()
 
         self._setup_ui()
         self._setup_picking()
+        self._setup_hot_reload()
+        self.taskMgr.add(self._update_lod, "UpdateLOD")
+        if self.paging:
+            self.paged_world.listeners.append(self.simulation.logistics.pathfinder.invalidate_area)
+            self.paged_world.listeners.append(self._on_chunk_paged)
+            self._chunks_paged = False
+            self.taskMgr.add(self._update_paging, "UpdatePaging")
 
         self.accept("space", self.next_turn)
+        self.accept("backspace", self.rewind_turn)
         self.accept("tab", self.hud.toggle_visibility)
+        if self.minimap:
+            self.accept("n", self.minimap.toggle_visibility)
         self.accept("t", self.renderer.set_view_mode, ["TERRAIN"])
         self.accept("mouse1", self.handle_click)
+        self.accept("m", self.report_memory)
         
         res_keys = ["1", "2", "3", "4", "5", "6", "7", "8", "9", "0"]
         resources = list(ResourceType)
@@ -62,9 +153,16 @@ class Game(ShowBase):
         self.win.requestProperties(props)
 
     def _setup_ui(self):
-        self.hud = HUD(self.aspect2d)
-        self.hud.update(self.turn_mgr.turn_count, self.simulation.get_stats())
-        self.building_info_ui = BuildingInfoUI(self.aspect2d)
+        self.hud = HUD(self.aspect2d, self.series)
+        self._update_hud()
+        self.building_info_ui = BuildingInfoUI(self.aspect2d, self.series)
+
+        # Paged maps don't hold every tile, so there is nothing to draw an overview from
+        self.minimap = None
+        if self.game_config.get("minimap", {}).get("enabled", True) and not self.paging:
+            self.minimap = Minimap(self.a2dBottomCenter, self.world_map, self.game_config)
+            self._update_minimap()
+            self.taskMgr.add(self._update_minimap_view, "UpdateMinimapView")
         
         self.end_turn_btn = DirectButton(
             text="End Turn",
@@ -75,6 +173,42 @@ class Game(ShowBase):
             command=self.next_turn
         )
 
+    def _setup_hot_reload(self):
+        cfg = self.game_config.get("hot_reload", {})
+        if not cfg.get("enabled", True):
+            return
+        self.config_watcher = ConfigWatcher(self.game_config)
+        if not self.client:
+            self.config_watcher.on_change(RELOADABLE_SECTIONS, self.simulation.reconfigure)
+        self.config_watcher.on_change({"colors", "lighting", "camera", "lod", "production", "consumption"},
+                                      self._apply_config)
+        self.taskMgr.doMethodLater(cfg.get("interval", 1.0), self._watch_config, "WatchConfig")
+
+    def _watch_config(self, task):
+        self.config_watcher.poll()
+        return Task.again
+
+    def _apply_config(self, changed):
+        """Redraws what was derived from reloaded config sections; the world itself is kept."""
+        if "colors" in changed:
+            if self.paging:
+                self.terrain.set_colors(self.game_config["colors"])
+            else:
+                self.renderer.update_colors()
+            if self.minimap:
+                self.minimap.set_colors(self.game_config["colors"])
+        if "lighting" in changed:
+            self.renderer.update_lighting()
+        if "camera" in changed:
+            self.camera_controller.configure()
+        if "lod" in changed:
+            self.renderer.lod.configure()
+            self.renderer.lod.refresh()
+        if "production" in changed:
+            self.series.configure()
+        if changed & {"production", "consumption"}:
+            self.building_info_ui.refresh(self.game_config)
+
     def _setup_picking(self):
         self.picker = CollisionTraverser()
         self.pq = CollisionHandlerQueue()
@@ -85,11 +219,45 @@ class Game(ShowBase):
         self.picker_node.addSolid(self.picker_ray)
         self.picker.addCollider(self.picker_np, self.pq)
 
+    def _update_lod(self, task):
+        self.renderer.lod.update(self.camera.getPos(self.render), self.camera_controller.zoom_level)
+        return Task.cont
+
+    def _view_center(self):
+        """Where the camera's view meets the ground plane, or the point below it when looking up."""
+        pos = self.camera.getPos(self.render)
+        forward = self.render.getRelativeVector(self.camera, (0, 1, 0))
+        if forward.z < -0.1:
+            pos += forward * (pos.z / -forward.z)
+        return pos.x, pos.y
+
+    def _update_paging(self, task):
+        x, y = self._view_center()
+        self.paged_world.focus(x, y)
+        if self._chunks_paged:
+            # Evicted buildings left the map and restored ones came back as new objects
+            self._chunks_paged = False
+            restored, self.paged_world.restored = self.paged_world.restored, []
+            self.simulation.logistics.find_producers()
+            self.renderer.prune_buildings()
+            self.renderer.update_buildings(self.asset_mgr, restored)
+            self.series.add(restored)
+        self.terrain.update(x, y)
+        return Task.cont
+
+    def _on_chunk_paged(self, x0, y0, x1, y1):
+        self._chunks_paged = True
+
     def handle_click(self):
         if not self.mouseWatcherNode.hasMouse():
             return
 
         mpos = self.mouseWatcherNode.getMouse()
+        if self.minimap and not self.minimap.root.is_hidden():
+            target = self.minimap.map_point(mpos, self.render2d)
+            if target:
+                self.camera_controller.focus_on(*target)
+                return
         self.picker_ray.setFromLens(self.camNode, mpos.getX(), mpos.getY())
         self.picker.traverse(self.render)
 
@@ -112,12 +280,125 @@ class Game(ShowBase):
         self.renderer.selected_building = None
         self.building_info_ui.hide()
 
+    def _update_minimap(self, new_buildings=None, new_settlements=()):
+        """Marks a turn's new buildings and settlements, or without them resyncs with the whole map."""
+        if not self.minimap:
+            return
+        if new_buildings is None:
+            self.minimap.sync(self.renderer.building_nodes, self.world_map.settlements)
+        else:
+            self.minimap.add(new_buildings, new_settlements)
+
+    def _update_minimap_view(self, task):
+        self.minimap.update_view(self.cam, self.camLens, self.render)
+        return Task.cont
+
+    def _update_hud(self):
+        if self.client:
+            self.hud.update(self.client.turn_count, self.client.get_stats())
+        else:
+            self.hud.update(self.turn_mgr.turn_count, self.simulation.get_stats())
+
+    def _record_series(self):
+        if self.client:
+            # Several deltas may arrive at once; only the latest turn is recorded
+            turn, buildings, yields = self.client.turn_count, self.client.replica.buildings, None
+        else:
+            turn, buildings, yields = self.turn_mgr.turn_count, self.simulation.new_buildings, self.simulation.yields
+        self.series.truncate(turn)
+        self.series.add(buildings)
+        self.series.record(turn, yields)
+
+    def _poll_server(self, task):
+        kinds = self.client.poll()
+        if DELTA in kinds or SNAPSHOT in kinds:
+            self._record_series()
+            self.renderer.prune_buildings()
+            self.renderer.update_buildings(self.asset_mgr)
+            self._update_hud()
+            self._update_minimap()
+            if self.renderer.selected_building is None:
+                self.building_info_ui.hide()
+            self.building_info_ui.refresh(self.game_config)
+            if DELTA in kinds and self.memory.due(self.client.turn_count):
+                self.report_memory()
+        if BYE in kinds:
+            print("Simulation server closed the connection")
+            return Task.done
+        return Task.cont
+
     def next_turn(self):
+        if self.client:
+            self.client.request_turns(1)
+            return
         self.turn_mgr.next_turn()
+        self._record_series()
         self.renderer.update_buildings(self.asset_mgr)
-        self.hud.update(self.turn_mgr.turn_count, self.simulation.get_stats())
+        if self.renderer.view_mode != "TERRAIN":
+            self.renderer.update_colors() # Resource views show this turn's stocks
+        self._update_hud()
+        self._update_minimap(self.simulation.new_buildings, self.simulation.new_settlements)
         self.building_info_ui.refresh(self.game_config)
+        if self.memory.due(self.turn_mgr.turn_count):
+            self.report_memory()
 
-if __name__ == "__main__":
-    game = Game()
+    def report_memory(self):
+        world_map = self.world_map
+        subsystems = {
+            "buildings": [b for tile in world_map.tiles.values() for b in tile.buildings],
+            "settlements": [world_map.settlements] + world_map.settlements,
+            "tiles": [world_map.tiles] + list(world_map.tiles.values()),
+            "renderer": [self.renderer.building_nodes, self.renderer._index_to_building, self.renderer.lod],
+        }
+        if self.client:
+            subsystems["replica"] = [self.client.replica]
+        else:
+            subsystems.update({
+                "history": [self.turn_mgr.history] if self.turn_mgr.history else [],
+                "logistics": [self.simulation.logistics],
+                "market": [self.simulation.market],
+                "resources": [self.simulation.resources] if self.simulation.resources else [],
+                "scheduler": [self.turn_mgr.scheduler],
+            })
+        subsystems["timeseries"] = [self.series]
+        subsystems["assets"] = [self.asset_mgr]
+        # Everything else the game holds: UI, camera, config, ...
+        subsystems["other"] = [self]
+        turn = self.client.turn_count if self.client else self.turn_mgr.turn_count
+        report = self.memory.report(turn, subsystems, self.render)
+        print(report.format(self.memory.top))
+
+    def rewind_turn(self):
+        if self.client:
+            if self.client.turn_count > 0:
+                self.client.request_rewind(self.client.turn_count - 1)
+            return
+        if not self.turn_mgr.history or self.turn_mgr.turn_count == 0:
+            return
+        self.turn_mgr.rewind(self.turn_mgr.turn_count - 1)
+        self.series.truncate(self.turn_mgr.turn_count)
+        self.renderer.prune_buildings()
+        self.renderer.update_buildings(self.asset_mgr)
+        if self.renderer.view_mode != "TERRAIN":
+            self.renderer.update_colors()
+        self._update_hud()
+        self._update_minimap()
+        if self.renderer.selected_building is None:
+            self.building_info_ui.hide()
+        self.building_info_ui.refresh(self.game_config)
+
+def main():
+    parser = argparse.ArgumentParser(description="Trade")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--server", action="store_true", help="run the simulation headless and serve it to viewers")
+    mode.add_argument("--connect", action="store_true", help="view the world of a running --server")
+    args = parser.parse_args()
+
+    if args.server:
+        SimulationServer(load_config()).serve_forever()
+        return
+    game = Game(connect=args.connect)
     game.run()
+
+if __name__ == "__main__":
+    main()
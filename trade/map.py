@@ -6,6 +6,12 @@ class WorldMap:
         self.size = size
         self.tiles: Dict[Tuple[int, int], Tile] = {}
         self.settlements: List[Settlement] = []
+        self.seed = 0 # World seed, the root of every random stream
+        self.complete = True # False when `tiles` only holds part of the map (paged worlds)
 
     def get_tile(self, x: int, y: int) -> Optional[Tile]:
         return self.tiles.get((x, y))
+
+    def on_building_added(self, building) -> None:
+        """Hook for maps that need to know where buildings are."""
+        pass
@@ -0,0 +1,102 @@
+import numpy as np
+from typing import Dict, Any, List, Optional
+
+from .constants import ResourceType, BuildingType
+from .models import Settlement
+from .map import WorldMap
+from .logistics import LogisticsNetwork
+
+RESOURCES = list(ResourceType)
+RESOURCE_INDEX = {res: i for i, res in enumerate(RESOURCES)}
+BUILDING_TYPES = list(BuildingType)
+BUILDING_INDEX = {b_type: i for i, b_type in enumerate(BUILDING_TYPES)}
+
+
+class Market:
+    """Settlement markets, cleared together as (settlements x resources) arrays each turn.
+
+    A settlement's supply is the stock held by its own buildings, which includes what
+    logistics delivered to them, plus the stock of producers outside any settlement
+    that are nearer to it than to any other settlement."""
+
+    def __init__(self, world_map: WorldMap, config: Dict[str, Any], logistics: Optional[LogisticsNetwork] = None):
+        self.world_map = world_map
+        self.config = config
+        self.logistics = logistics # Keeps the list of producers
+        self._rows: Dict[Settlement, int] = {}
+        n = len(RESOURCES)
+        self.prices = np.zeros((0, n))
+        self.supply = np.zeros((0, n))
+        self.demand = np.zeros((0, n))
+        self.traded = np.zeros((0, n))
+        self.configure()
+
+    def configure(self) -> None:
+        """(Re)builds the price and consumption tables from the config."""
+        cfg = self.config.get("market", {})
+        base = cfg.get("base_price", {})
+        self.base_prices = np.array([base.get(res.name, 1.0) for res in RESOURCES])
+
+        cons_cfg = self.config.get("consumption", {})
+        self.consumption = np.zeros((len(BUILDING_TYPES), len(RESOURCES)))
+        for b_name, rates in cons_cfg.items():
+            for r_name, rate in rates.items():
+                self.consumption[BUILDING_INDEX[BuildingType[b_name]], RESOURCE_INDEX[ResourceType[r_name]]] = rate
+
+    def price(self, settlement: Settlement, res: ResourceType) -> float:
+        idx = self._rows.get(settlement)
+        if idx is None or idx >= len(self.prices):
+            return float(self.base_prices[RESOURCE_INDEX[res]])
+        return float(self.prices[idx, RESOURCE_INDEX[res]])
+
+    def clear(self) -> None:
+        cfg = self.config.get("market", {})
+        settlements = self.world_map.settlements
+        count = len(settlements)
+        self._rows = {s: i for i, s in enumerate(settlements)}
+
+        # Newly founded settlements open at the base price
+        if count > len(self.prices):
+            fresh = np.tile(self.base_prices, (count - len(self.prices), 1))
+            self.prices = np.vstack([self.prices, fresh])
+
+        s_idx = []
+        t_idx = []
+        stock = []
+        for i, s in enumerate(settlements):
+            for b in s.buildings:
+                s_idx.append(i)
+                t_idx.append(BUILDING_INDEX[b.type])
+                stock.extend(b.inventory[res] for res in RESOURCES)
+        supplier_rows, supplier_stock = self._unsettled_supply(settlements)
+
+        n = len(RESOURCES)
+        counts = np.zeros((count, len(BUILDING_TYPES)))
+        np.add.at(counts, (s_idx, t_idx), 1)
+        self.supply = np.zeros((count, n))
+        if s_idx:
+            np.add.at(self.supply, s_idx, np.array(stock, dtype=float).reshape(-1, n))
+        if len(supplier_rows):
+            np.add.at(self.supply, supplier_rows, supplier_stock)
+        self.demand = counts @ self.consumption * cfg.get("demand_turns", 5.0)
+
+        # Prices move towards the side of the market that is short
+        excess = (self.demand - self.supply) / (self.demand + self.supply + 1e-9)
+        self.prices *= np.exp(cfg.get("adjust_rate", 0.5) * excess)
+        np.clip(self.prices,
+                self.base_prices * cfg.get("min_price_factor", 0.1),
+                self.base_prices * cfg.get("max_price_factor", 10.0),
+                out=self.prices)
+        self.traded = np.minimum(self.supply, self.demand)
+
+    def _unsettled_supply(self, settlements: List[Settlement]):
+        """Row of the nearest settlement and stock of each producer that belongs to none."""
+        producers = self.logistics.producers if self.logistics else []
+        unsettled = [b for b in producers if b.settlement is None]
+        if not unsettled or not settlements:
+            return np.zeros(0, dtype=int), np.zeros((0, len(RESOURCES)))
+        positions = np.array([(b.tile.x, b.tile.y) for b in unsettled], dtype=float)
+        centres = np.array([(s.tile.x, s.tile.y) for s in settlements], dtype=float)
+        dist_sq = ((positions[:, None, :] - centres[None, :, :]) ** 2).sum(axis=-1)
+        stock = np.array([[b.inventory[res] for res in RESOURCES] for b in unsettled], dtype=float)
+        return dist_sq.argmin(axis=1), stock
@@ -0,0 +1,136 @@
+import gc
+import sys
+import tracemalloc
+import types
+from typing import Dict, Any, List, Tuple, Optional, Iterable
+
+from panda3d.core import NodePath
+
+# Objects the walk never descends into: they are shared program state, not game data
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+           types.MethodType, types.FrameType, types.CodeType)
+
+
+class MemoryReport:
+    def __init__(self, turn: int):
+        self.turn = turn
+        self.subsystems: Dict[str, int] = {} # Bytes of Python objects reached from each subsystem
+        self.object_types: Dict[str, Tuple[int, int]] = {} # Type name -> (count, bytes)
+        self.scene: Dict[str, int] = {} # Panda3D node and geometry totals
+        self.changes: Dict[str, int] = {} # Subsystem growth since the previous report
+        self.allocations: List[Tuple[str, int, int]] = [] # (source line, size diff, count diff)
+        self.traced: Optional[Tuple[int, int]] = None # tracemalloc (current, peak)
+
+    def format(self, top: int = 10) -> str:
+        lines = [f"Memory at turn {self.turn}"]
+        for name, size in self.subsystems.items():
+            change = f" ({_mb(self.changes[name], signed=True)})" if name in self.changes else ""
+            lines.append(f"  {name:<12} {_mb(size)}{change}")
+        if self.scene:
+            lines.append("  scene        " + ", ".join(
+                f"{name} {_mb(v) if name.endswith('bytes') else v}" for name, v in self.scene.items()))
+        by_size = sorted(self.object_types.items(), key=lambda item: -item[1][1])[:top]
+        lines.append("  largest types: " + ", ".join(f"{name} x{count} {_mb(size)}" for name, (count, size) in by_size))
+        if self.traced:
+            lines.append(f"  traced {_mb(self.traced[0])}, peak {_mb(self.traced[1])}")
+        for where, size_diff, count_diff in self.allocations[:top]:
+            lines.append(f"    {_mb(size_diff, signed=True)} ({count_diff:+d} blocks) {where}")
+        return "\n".join(lines)
+
+
+def _mb(size: int, signed: bool = False) -> str:
+    return f"{size / 2**20:{'+' if signed else ''}.2f}MB"
+
+
+class MemoryTracker:
+    """Breaks memory down by subsystem and object type, and tracks growth between reports.
+
+    Subsystems are walked in order through `gc.get_referents`, each object counted once with
+    `sys.getsizeof`. The anchor objects of every subsystem stop the walks of the others, so a
+    building's tile is counted under tiles, not buildings. Panda3D memory isn't visible to
+    Python and is taken from the scene graph's vertex and index arrays instead. Allocation
+    growth per source line comes from tracemalloc snapshots, once tracing is on."""
+
+    def __init__(self, config: Dict[str, Any]):
+        cfg = config.get("memory", {})
+        self.report_every = cfg.get("report_every", 0)
+        self.top = cfg.get("top", 10)
+        self._last_sizes: Dict[str, int] = {}
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        if cfg.get("tracemalloc", False):
+            tracemalloc.start()
+
+    def due(self, turn: int) -> bool:
+        return self.report_every > 0 and turn % self.report_every == 0
+
+    def report(self, turn: int, subsystems: Dict[str, Iterable[Any]], scene: Optional[NodePath] = None) -> MemoryReport:
+        """Measures the given subsystems, each a list of the objects it owns."""
+        report = MemoryReport(turn)
+        anchors = {name: list(objs) for name, objs in subsystems.items()}
+        owner = {id(obj): name for name, objs in anchors.items() for obj in objs}
+        seen = set()
+        types_seen: Dict[str, List[int]] = {}
+        for name, objs in anchors.items():
+            report.subsystems[name] = self._walk(name, objs, owner, seen, types_seen)
+        report.object_types = {t: (count, size) for t, (count, size) in types_seen.items()}
+        report.changes = {name: size - self._last_sizes[name]
+                          for name, size in report.subsystems.items() if name in self._last_sizes}
+        self._last_sizes = dict(report.subsystems)
+
+        if scene is not None:
+            report.scene = self._scene_usage(scene)
+        self._trace(report)
+        return report
+
+    def _walk(self, name: str, objs: List[Any], owner: Dict[int, str], seen: set,
+              types_seen: Dict[str, List[int]]) -> int:
+        total = 0
+        stack = list(objs)
+        while stack:
+            obj = stack.pop()
+            oid = id(obj)
+            if oid in seen or owner.get(oid, name) != name or isinstance(obj, _OPAQUE):
+                continue
+            seen.add(oid)
+            size = sys.getsizeof(obj)
+            total += size
+            entry = types_seen.setdefault(type(obj).__name__, [0, 0])
+            entry[0] += 1
+            entry[1] += size
+            stack.extend(gc.get_referents(obj))
+        return total
+
+    def _scene_usage(self, scene: NodePath) -> Dict[str, int]:
+        vertex_data = set()
+        index_bytes = 0
+        geom_nodes = {path.node() for path in scene.findAllMatches("**/+GeomNode")}
+        for node in geom_nodes:
+            for geom in node.getGeoms():
+                vertex_data.add(geom.getVertexData())
+                for prim in geom.getPrimitives():
+                    if prim.isIndexed():
+                        index_bytes += prim.getVertices().getDataSizeBytes()
+        vertex_bytes = sum(vdata.getArray(i).getDataSizeBytes()
+                           for vdata in vertex_data for i in range(vdata.getNumArrays()))
+        return {
+            "nodes": scene.findAllMatches("**").getNumPaths(),
+            "geom nodes": len(geom_nodes),
+            "vertex bytes": vertex_bytes,
+            "index bytes": index_bytes,
+        }
+
+    def _trace(self, report: MemoryReport) -> None:
+        if not tracemalloc.is_tracing():
+            # Start now, so the next report can show what grew in between
+            tracemalloc.start()
+            return
+        snapshot = tracemalloc.take_snapshot()
+        report.traced = tracemalloc.get_traced_memory()
+        if self._snapshot is not None:
+            # Filtering the stats rather than the snapshot: Snapshot.filter_traces is slow on big heaps
+            ignored = {tracemalloc.__file__, __file__}
+            stats = [stat for stat in snapshot.compare_to(self._snapshot, "lineno")
+                     if stat.traceback[0].filename not in ignored]
+            report.allocations = [(str(stat.traceback), stat.size_diff, stat.count_diff)
+                                  for stat in stats[:self.top]]
+        self._snapshot = snapshot
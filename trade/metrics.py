@@ -0,0 +1,71 @@
+import json
+from typing import Dict, List, Tuple, Any
+
+
+class TurnRecord:
+    def __init__(self, turn: int):
+        self.turn = turn
+        self.settlements = 0
+        self.new_settlements: List[Tuple[str, int, int]] = []
+        self.buildings: Dict[str, int] = {}
+        self.resources: Dict[str, float] = {}
+        self.timings: Dict[str, float] = {} # Phase name -> seconds
+        self.shipments = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "turn": self.turn,
+            "settlements": self.settlements,
+            "new_settlements": self.new_settlements,
+            "buildings": self.buildings,
+            "resources": self.resources,
+            "timings": self.timings,
+            "shipments": self.shipments,
+        }
+
+
+class MetricsSink:
+    """Append-only JSON Lines writer that buffers records and writes them in batches."""
+
+    enabled = True
+
+    def __init__(self, path: str, flush_every: int = 50):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self._file = open(path, "a", encoding="utf-8")
+        self._pending: List[str] = []
+
+    def write(self, record: TurnRecord) -> None:
+        self._pending.append(json.dumps(record.to_dict(), separators=(",", ":")))
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            self._file.write("\n".join(self._pending) + "\n")
+            self._file.flush()
+            self._pending = []
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+
+class NullSink:
+    enabled = False
+
+    def write(self, record: TurnRecord) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def create_sink(config: Dict[str, Any]):
+    cfg = config.get("metrics", {})
+    if not cfg.get("enabled", False):
+        return NullSink()
+    return MetricsSink(cfg.get("path", "metrics.jsonl"), cfg.get("flush_every", 50))
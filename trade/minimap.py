@@ -0,0 +1,170 @@
+from typing import Dict, Any, Iterable, Optional, Set, Tuple
+
+import numpy as np
+from panda3d.core import CardMaker, LineSegs, NodePath, Point2, Point3, Texture, SamplerState
+
+from .constants import TileType
+from .map import WorldMap
+from .models import Building, Settlement
+
+TILE_TYPES = list(TileType)
+
+
+class Minimap:
+    """An overview of the whole map as one small texture on a card in the 2D scene.
+
+    Each texel covers `scale` x `scale` tiles and is coloured by the tile type at its
+    corner, blended towards the building colour by how many buildings stand on it;
+    settlement centres are marked. The image is built once as a numpy array and
+    written in bulk. After that only the texels whose buildings or settlements
+    changed are rewritten, straight into the texture's RAM image. A frame of lines
+    shows where the camera's view meets the ground."""
+
+    def __init__(self, parent: NodePath, world_map: WorldMap, config: Dict[str, Any]):
+        cfg = config.get("minimap", {})
+        self.world_map = world_map
+        size = world_map.size
+        self.scale = -(-size // cfg.get("max_texels", 256)) # Tiles per texel side
+        # Power-of-two side, which every renderer accepts; the card shows only the part the map covers
+        self.texels = 1 << (-(-size // self.scale) - 1).bit_length()
+        self.coverage = size / (self.scale * self.texels)
+        self.extent = cfg.get("size", 0.45) # Side of the card in screen units
+        self.density_full = cfg.get("density_full", 0.5) # Buildings per tile for the full building colour
+
+        self.set_colors(config["colors"])
+        self.building_color = np.array(cfg.get("building_color", [0.9, 0.85, 0.7]), dtype=np.float32)
+        self.settlement_color = np.array(cfg.get("settlement_color", [0.9, 0.15, 0.1]), dtype=np.float32)
+
+        # Tile type at the corner of each texel; [y, x] so rows run up the texture like the map
+        corners = np.minimum(np.arange(self.texels) * self.scale, size - 1)
+        type_index = {t: i for i, t in enumerate(TILE_TYPES)}
+        self.types = np.array([[type_index[world_map.tiles[(x, y)].type] for x in corners] for y in corners])
+        self.counts = np.zeros((self.texels, self.texels), dtype=np.int32)
+        self.settled = np.zeros((self.texels, self.texels), dtype=np.int32) # Settlement centres per texel
+        self._buildings: Set[Building] = set()
+        self._settlements: Set[Settlement] = set()
+
+        self.texture = Texture("minimap")
+        self.texture.setup2dTexture(self.texels, self.texels, Texture.T_unsigned_byte, Texture.F_rgba8)
+        self.texture.setMagfilter(SamplerState.FT_nearest)
+        self.texture.setMinfilter(SamplerState.FT_linear)
+        self._write_all()
+
+        self.root = parent.attachNewNode("Minimap")
+        self.root.setPos(-self.extent / 2, 0, 0.03)
+        border = CardMaker("minimap-border")
+        border.setFrame(-0.01, self.extent + 0.01, -0.01, self.extent + 0.01)
+        self.root.attachNewNode(border.generate()).setColor(0, 0, 0, 0.8)
+        card = CardMaker("minimap-card")
+        card.setFrame(0, self.extent, 0, self.extent)
+        card.setUvRange(Point2(0, 0), Point2(self.coverage, self.coverage))
+        self.card = self.root.attachNewNode(card.generate())
+        self.card.setTexture(self.texture)
+        self.view_lines: Optional[NodePath] = None
+        self._last_view = None
+
+    def set_colors(self, colors: Dict[str, Any]) -> None:
+        """Takes new tile type colours, redrawing the whole image once it exists."""
+        self.type_colors = np.array([colors.get(t.name, [1, 1, 1, 1]) for t in TILE_TYPES], dtype=np.float32)[:, :3]
+        if hasattr(self, "texture"):
+            self._write_all()
+
+    def add(self, buildings: Iterable[Building], settlements: Iterable[Settlement] = ()) -> int:
+        """Marks buildings and settlements that are new since the last update, e.g. a turn's
+        `new_buildings` and `new_settlements`, rewriting only their texels. Returns their number."""
+        touched: Set[Tuple[int, int]] = set()
+        self._change(self.counts, self._buildings, [b for b in buildings if b not in self._buildings], 1, touched)
+        self._change(self.settled, self._settlements, [s for s in settlements if s not in self._settlements],
+                     1, touched)
+        return self._write(touched)
+
+    def sync(self, buildings: Iterable[Building], settlements: Iterable[Settlement]) -> int:
+        """Brings the minimap in line with everything now on the map, e.g. after a rewind,
+        rewriting only the texels where something was added or removed. Returns their number.
+        This compares against every tracked object; turns that only add things use `add`."""
+        buildings = set(buildings)
+        settlements = set(settlements)
+        touched: Set[Tuple[int, int]] = set()
+        self._change(self.counts, self._buildings, buildings - self._buildings, 1, touched)
+        self._change(self.counts, self._buildings, self._buildings - buildings, -1, touched)
+        self._change(self.settled, self._settlements, settlements - self._settlements, 1, touched)
+        self._change(self.settled, self._settlements, self._settlements - settlements, -1, touched)
+        return self._write(touched)
+
+    def map_point(self, mouse: Point2, render2d: NodePath) -> Optional[Tuple[float, float]]:
+        """The map position under a mouse position, or None when the mouse is off the minimap."""
+        local = self.root.getRelativePoint(render2d, Point3(mouse.getX(), 0, mouse.getY()))
+        if not (0 <= local.getX() <= self.extent and 0 <= local.getZ() <= self.extent):
+            return None
+        size = self.world_map.size
+        return local.getX() / self.extent * size, local.getZ() / self.extent * size
+
+    def update_view(self, camera: NodePath, lens, render: NodePath) -> None:
+        """Redraws the frame of the ground area in view, if the camera moved."""
+        view = (tuple(round(v, 1) for v in camera.getPos(render)), tuple(round(v, 1) for v in camera.getHpr(render)))
+        if view == self._last_view:
+            return
+        self._last_view = view
+
+        size = self.world_map.size
+        segs = LineSegs("minimap-view")
+        segs.setColor(1, 1, 1, 1)
+        segs.setThickness(1.5)
+        points = [self._ground_point(camera, lens, render, corner) for corner in [(-1, -1), (1, -1), (1, 1), (-1, 1)]]
+        for i, (x, y) in enumerate(points + points[:1]):
+            point = (min(max(x / size, 0.0), 1.0) * self.extent, 0, min(max(y / size, 0.0), 1.0) * self.extent)
+            if i == 0:
+                segs.moveTo(*point)
+            else:
+                segs.drawTo(*point)
+        if self.view_lines:
+            self.view_lines.removeNode()
+        self.view_lines = self.root.attachNewNode(segs.create())
+
+    def toggle_visibility(self):
+        if self.root.is_hidden():
+            self.root.show()
+        else:
+            self.root.hide()
+
+    def _ground_point(self, camera: NodePath, lens, render: NodePath, corner: Tuple[int, int]) -> Tuple[float, float]:
+        """Where the ray through a screen corner meets the ground plane, or a point far
+        along it when it points above the horizon."""
+        near, far = Point3(), Point3()
+        lens.extrude(Point2(*corner), near, far)
+        near = render.getRelativePoint(camera, near)
+        far = render.getRelativePoint(camera, far)
+        direction = far - near
+        limit = 2 * self.world_map.size / max(direction.length(), 1e-6)
+        t = -near.getZ() / direction.getZ() if direction.getZ() < 0 else limit
+        point = near + direction * min(t, limit)
+        return point.getX(), point.getY()
+
+    def _change(self, grid: np.ndarray, tracked: Set, items: Iterable, change: int,
+                touched: Set[Tuple[int, int]]) -> None:
+        for item in list(items):
+            ty, tx = item.tile.y // self.scale, item.tile.x // self.scale
+            grid[ty, tx] += change
+            touched.add((ty, tx))
+            if change > 0:
+                tracked.add(item)
+            else:
+                tracked.discard(item)
+
+    def _write(self, touched: Set[Tuple[int, int]]) -> int:
+        if touched:
+            ty, tx = (np.array(a) for a in zip(*touched))
+            image = np.asarray(memoryview(self.texture.modifyRamImage())).reshape(self.texels, self.texels, 4)
+            image[ty, tx] = self._colors((ty, tx))[..., [2, 1, 0, 3]] # The RAM image is BGRA
+        return len(touched)
+
+    def _write_all(self) -> None:
+        self.texture.setRamImageAs(self._colors(np.s_[:, :]).tobytes(), "RGBA")
+
+    def _colors(self, index) -> np.ndarray:
+        """RGBA bytes of the texels at `index`, from their tile type, building count and settlement mark."""
+        density = np.minimum(1.0, self.counts[index] / (self.scale * self.scale * self.density_full))[..., None]
+        rgb = self.type_colors[self.types[index]] * (1.0 - density) + self.building_color * density
+        rgb = np.where(self.settled[index][..., None] > 0, self.settlement_color, rgb)
+        alpha = np.ones(rgb.shape[:-1] + (1,), dtype=np.float32)
+        return (np.concatenate([rgb, alpha], axis=-1) * 255).astype(np.uint8)
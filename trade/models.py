@@ -2,6 +2,7 @@ import random
 import math
 from typing import List, Dict, Tuple, Optional, Any
 from .constants import TileType, ResourceType, BuildingType
+from .rng import derive_seed
 
 class Building:
     def __init__(self, b_type: BuildingType, tile: 'Tile', local_pos: Tuple[float, float], settlement: Optional['Settlement'] = None):
@@ -100,7 +101,8 @@ class Building:
         self.primary_resource = best_res
 
 class Tile:
-    def __init__(self, x: int, y: int, elevation: float, moisture: float, thresholds: Dict[str, float]):
+    def __init__(self, x: int, y: int, elevation: float, moisture: float, thresholds: Dict[str, float],
+                 seed: int = 0):
         self.x = x
         self.y = y
         self.elevation = elevation
@@ -110,9 +112,9 @@ class Tile:
         self.buildings: List[Building] = []
         self.thresholds = thresholds
         self.type: TileType = self._determine_type()
-        self._init_potentials()
+        self._init_potentials(seed)
         
-    def _init_potentials(self) -> None:
+    def _init_potentials(self, seed: int) -> None:
         if self.type == TileType.FOREST:
             self.potentials[ResourceType.WOOD] = 1.0
         elif self.type == TileType.GRASSLAND:
@@ -127,8 +129,7 @@ class Tile:
             
         # Metals
         if self.type == TileType.ROCKY:
-            seed = (self.x * 1337 + self.y * 42) # TODO: configurable seed
-            rng = random.Random(seed)
+            rng = random.Random(derive_seed(seed, "potentials", self.x, self.y))
             if rng.random() < 0.4:
                 self.potentials[ResourceType.IRON] = rng.uniform(0.5, 1.0)
             if rng.random() < 0.3:
@@ -0,0 +1,365 @@
+import json
+import math
+import os
+import shutil
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple, Callable, Iterable, Union, Sequence
+
+import numpy as np
+from panda3d.core import NodePath, GeomNode, Geom, GeomTriangles, GeomVertexData
+from panda3d.core import GeomVertexFormat, GeomVertexArrayFormat, InternalName
+
+from .constants import TileType, BuildingType, ResourceType
+from .models import Building, Tile
+from .map import WorldMap
+from .heightfield import quad_normals
+
+ChunkKey = Tuple[int, int]
+ArrayLike = Union[np.ndarray, Sequence[float]]
+# (type name, x, y, local x, local y, settlement index or -1, primary resource name or None,
+#  inventory, resource buffers), the last two in ResourceType order
+BuildingRecord = List[Any]
+
+ELEVATION = 0
+MOISTURE = 1
+
+
+class ChunkStore:
+    """Elevation and moisture of every tile in a memory-mapped file on disk.
+
+    The file is laid out chunk by chunk, so reading a chunk touches one contiguous block.
+    Chunks are generated the first time they are read and kept in the file, which is
+    reused as long as the map size, chunk size and seed stay the same. The buildings of
+    evicted chunks are kept beside it, one small file per chunk, for this session only."""
+
+    def __init__(self, directory: str, generator, size: int, chunk_size: int, seed: int):
+        self.generator = generator
+        self.size = size
+        self.chunk_size = chunk_size
+        self.chunks_per_side = math.ceil(size / chunk_size)
+        n = self.chunks_per_side
+
+        os.makedirs(directory, exist_ok=True)
+        # Buildings belong to the running simulation, not to the terrain a later run reuses
+        self.buildings_dir = os.path.join(directory, "buildings")
+        shutil.rmtree(self.buildings_dir, ignore_errors=True)
+        os.makedirs(self.buildings_dir)
+        meta = {"size": size, "chunk_size": chunk_size, "seed": seed}
+        meta_path = os.path.join(directory, "meta.json")
+        reuse = False
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                reuse = json.load(f) == meta
+        mode = "r+" if reuse else "w+"
+
+        self.data = np.lib.format.open_memmap(os.path.join(directory, "tiles.npy"), mode=mode,
+                                              dtype=np.float32, shape=(n, n, chunk_size, chunk_size, 2))
+        self.generated = np.lib.format.open_memmap(os.path.join(directory, "generated.npy"), mode=mode,
+                                                   dtype=bool, shape=(n, n))
+        if not reuse:
+            with open(meta_path, "w") as f:
+                json.dump(meta, f)
+
+    def chunk(self, cx: int, cy: int) -> np.ndarray:
+        """The (chunk_size, chunk_size, 2) block of chunk (cx, cy), indexed [local x, local y, field]."""
+        if not self.generated[cx, cy]:
+            self._generate(cx, cy)
+        return self.data[cx, cy]
+
+    def ensure(self, keys: Iterable[ChunkKey]) -> None:
+        for cx, cy in keys:
+            if not self.generated[cx, cy]:
+                self._generate(cx, cy)
+
+    def save_buildings(self, cx: int, cy: int, records: List[BuildingRecord]) -> None:
+        with open(self._buildings_path(cx, cy), "w") as f:
+            json.dump(records, f)
+
+    def take_buildings(self, cx: int, cy: int) -> List[BuildingRecord]:
+        """The saved buildings of a chunk, removing them from the store; empty if it had none."""
+        path = self._buildings_path(cx, cy)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            records = json.load(f)
+        os.remove(path)
+        return records
+
+    def flush(self) -> None:
+        self.data.flush()
+        self.generated.flush()
+
+    def _generate(self, cx: int, cy: int) -> None:
+        cs = self.chunk_size
+        block = np.zeros((cs, cs, 2), dtype=np.float32)
+        for lx in range(min(cs, self.size - cx * cs)):
+            for ly in range(min(cs, self.size - cy * cs)):
+                block[lx, ly] = self.generator.sample(cx * cs + lx, cy * cs + ly)
+        self.data[cx, cy] = block
+        self.generated[cx, cy] = True
+
+    def _buildings_path(self, cx: int, cy: int) -> str:
+        return os.path.join(self.buildings_dir, f"{cx}_{cy}.json")
+
+
+class PagedHeightField:
+    """HeightField over a ChunkStore: same corner convention and bilinear sampling, but
+    heights are read from the memory-mapped chunks instead of a full in-memory grid."""
+
+    def __init__(self, store: ChunkStore, scale: float = 1.0):
+        self.store = store
+        self.size = store.size
+        self.scale = scale
+
+    def corners(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        """Corner heights for tiles x0..x1-1, y0..y1-1, shaped (x1 - x0 + 1, y1 - y0 + 1)."""
+        xs, ys = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1), indexing="ij")
+        return self._corner(xs, ys)
+
+    def sample(self, xs: ArrayLike, ys: ArrayLike) -> np.ndarray:
+        """Heights at world positions (xs[i], ys[i]); positions outside the map are clamped."""
+        xs = np.clip(np.asarray(xs, dtype=float), 0, self.size)
+        ys = np.clip(np.asarray(ys, dtype=float), 0, self.size)
+        x0 = np.minimum(xs.astype(int), self.size - 1)
+        y0 = np.minimum(ys.astype(int), self.size - 1)
+        lx = xs - x0
+        ly = ys - y0
+
+        h_bottom = self._corner(x0, y0) * (1 - lx) + self._corner(x0 + 1, y0) * lx
+        h_top = self._corner(x0, y0 + 1) * (1 - lx) + self._corner(x0 + 1, y0 + 1) * lx
+        return h_bottom * (1 - ly) + h_top * ly
+
+    def height_at(self, x: float, y: float) -> float:
+        return float(self.sample([x], [y])[0])
+
+    def _corner(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        # Corner (x, y) takes the elevation of tile (x, y), clamped to the map
+        xs = np.minimum(xs, self.size - 1)
+        ys = np.minimum(ys, self.size - 1)
+        cs = self.store.chunk_size
+        cx, cy = xs // cs, ys // cs
+        self.store.ensure(set(zip(cx.ravel().tolist(), cy.ravel().tolist())))
+        return self.store.data[cx, cy, xs % cs, ys % cs, ELEVATION].astype(float) * self.scale
+
+
+class PagedWorldMap(WorldMap):
+    """A WorldMap whose `tiles` only holds the chunks that are currently resident."""
+
+    def __init__(self, size: int, chunk_size: int):
+        super().__init__(size)
+        self.complete = False
+        self.chunk_size = chunk_size
+
+
+class PagedWorld:
+    """Keeps full Tile objects only for chunks near a focus point, backed by a ChunkStore.
+
+    Chunks within `focus_radius` chunks of the focus are loaded, a few per update, and the
+    least recently used ones beyond `resident_chunks` are evicted. An evicted chunk's
+    buildings, with their inventories, are written to the store and rebuilt when it is
+    loaded again; they stand still while paged out. Listeners are told the tile area of
+    every chunk paged in or out, and restored buildings collect in `restored`."""
+
+    def __init__(self, generator, config: Dict[str, Any]):
+        cfg = config.get("paging", {})
+        self.chunk_size = cfg.get("chunk_size", 64)
+        self.max_resident = cfg.get("resident_chunks", 64)
+        self.focus_radius = cfg.get("focus_radius", 3)
+        self.loads_per_update = cfg.get("loads_per_frame", 2)
+        self.thresholds = config["thresholds"]
+
+        self.size = generator.size
+        seed = generator.setup_noise()
+        self.world_map = PagedWorldMap(self.size, self.chunk_size)
+        self.world_map.seed = seed
+        self.store = ChunkStore(cfg.get("path", "world_chunks"), generator, self.size, self.chunk_size, seed)
+        self.heightfield = PagedHeightField(self.store, config["visuals"]["height_scale"])
+        self.resident: "OrderedDict[ChunkKey, List[Tuple[int, int]]]" = OrderedDict()
+        self.listeners: List[Callable[[int, int, int, int], None]] = []
+        self.restored: List[Building] = [] # Buildings rebuilt by loads, until the caller takes them
+
+    def chunk_of(self, x: float, y: float) -> ChunkKey:
+        return (int(x) // self.chunk_size, int(y) // self.chunk_size)
+
+    def bounds(self, key: ChunkKey) -> Tuple[int, int, int, int]:
+        x0, y0 = key[0] * self.chunk_size, key[1] * self.chunk_size
+        return x0, y0, min(self.size, x0 + self.chunk_size), min(self.size, y0 + self.chunk_size)
+
+    def chunks_around(self, x: float, y: float, radius: int) -> List[ChunkKey]:
+        """Chunks within `radius` chunks of a position, nearest first."""
+        n = self.store.chunks_per_side
+        fx, fy = x / self.chunk_size - 0.5, y / self.chunk_size - 0.5
+        cx, cy = self.chunk_of(max(0, x), max(0, y))
+        keys = [(i, j) for i in range(max(0, cx - radius), min(n, cx + radius + 1))
+                for j in range(max(0, cy - radius), min(n, cy + radius + 1))]
+        keys.sort(key=lambda k: (k[0] - fx) ** 2 + (k[1] - fy) ** 2)
+        return keys
+
+    def focus(self, x: float, y: float, max_loads: int = None) -> int:
+        """Pages in chunks around (x, y), at most `max_loads` of them. Returns how many are still missing."""
+        max_loads = self.loads_per_update if max_loads is None else max_loads
+        wanted = self.chunks_around(x, y, self.focus_radius)
+        missing = 0
+        for key in wanted:
+            if key in self.resident:
+                self.resident.move_to_end(key)
+            elif max_loads > 0:
+                self.load(key)
+                max_loads -= 1
+            else:
+                missing += 1
+        self._evict(set(wanted))
+        return missing
+
+    def load(self, key: ChunkKey) -> None:
+        if key in self.resident:
+            self.resident.move_to_end(key)
+            return
+        block = self.store.chunk(*key)
+        x0, y0, x1, y1 = self.bounds(key)
+        values = block.tolist()
+        tiles = self.world_map.tiles
+        positions = []
+        for x in range(x0, x1):
+            for y in range(y0, y1):
+                e, m = values[x - x0][y - y0]
+                tiles[(x, y)] = Tile(x, y, e, m, self.thresholds, self.world_map.seed)
+                positions.append((x, y))
+        self.resident[key] = positions
+
+        x_range, y_range = range(x0, x1), range(y0, y1)
+        for s in self.world_map.settlements:
+            if s.tile.x in x_range and s.tile.y in y_range:
+                s.tile = tiles[(s.tile.x, s.tile.y)]
+        for record in self.store.take_buildings(*key):
+            self.restored.append(self._restore_building(record))
+        self._notify(key)
+
+    def _evict(self, keep: set) -> None:
+        excess = len(self.resident) - self.max_resident
+        if excess <= 0:
+            return
+        tiles = self.world_map.tiles
+        for key in [k for k in self.resident if k not in keep][:excess]:
+            chunk_tiles = [tiles.pop(pos) for pos in self.resident.pop(key)]
+            buildings = [b for tile in chunk_tiles for b in tile.buildings]
+            if buildings:
+                index = {s: i for i, s in enumerate(self.world_map.settlements)}
+                self.store.save_buildings(*key, [self._building_record(b, index) for b in buildings])
+                gone = set(buildings)
+                for s in {b.settlement for b in buildings if b.settlement}:
+                    s.buildings[:] = [b for b in s.buildings if b not in gone]
+                # Off the map now, which is how everything else holding them can tell
+                for tile in chunk_tiles:
+                    tile.buildings.clear()
+            self._notify(key)
+
+    def _building_record(self, building: Building, settlement_index: Dict[Any, int]) -> BuildingRecord:
+        return [building.type.name, building.tile.x, building.tile.y,
+                building.local_pos[0], building.local_pos[1],
+                settlement_index[building.settlement] if building.settlement else -1,
+                building.primary_resource.name if building.primary_resource else None,
+                [building.inventory[res] for res in ResourceType],
+                [building._resource_buffers[res] for res in ResourceType]]
+
+    def _restore_building(self, record: BuildingRecord) -> Building:
+        b_type, x, y, lx, ly, settlement, primary, inventory, buffers = record
+        settlement = self.world_map.settlements[settlement] if settlement >= 0 else None
+        building = Building(BuildingType[b_type], self.world_map.tiles[(x, y)], (lx, ly), settlement)
+        building.primary_resource = ResourceType[primary] if primary else None
+        building.inventory = dict(zip(ResourceType, inventory))
+        building._resource_buffers = dict(zip(ResourceType, buffers))
+        return building
+
+    def _notify(self, key: ChunkKey) -> None:
+        for listener in self.listeners:
+            listener(*self.bounds(key))
+
+
+def _terrain_format() -> GeomVertexFormat:
+    array = GeomVertexArrayFormat()
+    array.addColumn(InternalName.getVertex(), 3, Geom.NT_float32, Geom.C_point)
+    array.addColumn(InternalName.getNormal(), 3, Geom.NT_float32, Geom.C_normal)
+    array.addColumn(InternalName.getColor(), 4, Geom.NT_float32, Geom.C_color)
+    return GeomVertexFormat.registerFormat(GeomVertexFormat(array))
+
+
+class ChunkTerrain:
+    """Terrain geometry for the resident chunks within `view_radius` chunks of the camera.
+
+    Each chunk is its own GeomNode, built from numpy arrays written straight into the
+    vertex and index buffers, with the same flat-shaded quads as MapRenderer. Chunks
+    leaving the radius have their geometry removed."""
+
+    def __init__(self, paged: PagedWorld, parent: NodePath, config: Dict[str, Any]):
+        cfg = config.get("paging", {})
+        self.paged = paged
+        self.view_radius = min(cfg.get("view_radius", 2), paged.focus_radius)
+        self.builds_per_update = cfg.get("builds_per_frame", 1)
+        self.root = parent.attachNewNode("ChunkTerrain")
+        self.nodes: Dict[ChunkKey, NodePath] = {}
+        self.format = _terrain_format()
+
+        self.type_index = {t: i for i, t in enumerate(TileType)}
+        self.set_colors(config["colors"])
+
+    def set_colors(self, colors: Dict[str, Any]) -> None:
+        """Uses new tile colours; built chunks are dropped and rebuilt by the next updates."""
+        self.type_colors = np.array([colors.get(t.name, [1, 1, 1, 1]) for t in TileType], dtype=np.float32)
+        for node in self.nodes.values():
+            node.removeNode()
+        self.nodes.clear()
+
+    def update(self, x: float, y: float, max_builds: int = None) -> int:
+        """Builds missing chunk geometry around (x, y), at most `max_builds`. Returns how many are still missing."""
+        max_builds = self.builds_per_update if max_builds is None else max_builds
+        wanted = self.paged.chunks_around(x, y, self.view_radius)
+        for key in [k for k in self.nodes if k not in wanted]:
+            self.nodes.pop(key).removeNode()
+
+        missing = 0
+        for key in wanted:
+            if key in self.nodes:
+                continue
+            if max_builds > 0 and key in self.paged.resident:
+                self.nodes[key] = self._build(key)
+                max_builds -= 1
+            else:
+                missing += 1
+        return missing
+
+    def _build(self, key: ChunkKey) -> NodePath:
+        x0, y0, x1, y1 = self.paged.bounds(key)
+        w, h = x1 - x0, y1 - y0
+        c = self.paged.heightfield.corners(x0, y0, x1, y1)
+        h00, h10, h11, h01 = c[:-1, :-1], c[1:, :-1], c[1:, 1:], c[:-1, 1:]
+        xs, ys = np.meshgrid(np.arange(x0, x1, dtype=np.float32), np.arange(y0, y1, dtype=np.float32), indexing="ij")
+
+        rows = np.zeros((w, h, 4, 10), dtype=np.float32)
+        rows[:, :, :, 0] = xs[:, :, None] + np.array([0, 1, 1, 0], dtype=np.float32)
+        rows[:, :, :, 1] = ys[:, :, None] + np.array([0, 0, 1, 1], dtype=np.float32)
+        rows[:, :, :, 2] = np.stack([h00, h10, h11, h01], axis=-1)
+
+        rows[:, :, :, 3:6] = quad_normals(c)[:, :, None, :]
+
+        tiles = self.paged.world_map.tiles
+        types = np.array([[self.type_index[tiles[(x, y)].type] for y in range(y0, y1)] for x in range(x0, x1)])
+        rows[:, :, :, 6:10] = self.type_colors[types][:, :, None, :]
+
+        vdata = GeomVertexData(f"chunk-{key[0]}-{key[1]}", self.format, Geom.UHStatic)
+        vdata.uncleanSetNumRows(w * h * 4)
+        np.asarray(memoryview(vdata.modifyArray(0))).view(np.float32)[:] = rows.ravel()
+
+        quads = np.arange(w * h, dtype=np.uint32)[:, None] * 4
+        indices = (quads + np.array([0, 1, 2, 0, 2, 3], dtype=np.uint32)).ravel()
+        prim = GeomTriangles(Geom.UHStatic)
+        prim.setIndexType(Geom.NT_uint32)
+        handle = prim.modifyVertices()
+        handle.uncleanSetNumRows(len(indices))
+        np.asarray(memoryview(handle)).view(np.uint32)[:] = indices
+
+        geom = Geom(vdata)
+        geom.addPrimitive(prim)
+        node = GeomNode(f"chunk-{key[0]}-{key[1]}")
+        node.addGeom(geom)
+        return self.root.attachNewNode(node)
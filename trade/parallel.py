@@ -0,0 +1,205 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple, Optional
+
+import numpy as np
+
+from .constants import TileType, BuildingType, ResourceType
+
+# Tiles of neighbouring regions a worker needs to see: the 7x7 resource building exclusion zone
+HALO = 3
+
+Region = Tuple[int, int, int, int] # x0, y0, x1, y1 (exclusive)
+# (x, y, building type name, settlement index or -1, local x, local y)
+Proposal = Tuple[int, int, str, int, float, float]
+
+_METALS = [ResourceType.IRON, ResourceType.COAL, ResourceType.COPPER,
+           ResourceType.TIN, ResourceType.GOLD, ResourceType.SILVER]
+
+_static: Dict[str, np.ndarray] = {}
+
+
+def _init_worker(static: Dict[str, np.ndarray]) -> None:
+    global _static
+    _static = static
+
+
+def _nearest_settlement(settlements: List[Tuple[int, int]], x: int, y: int) -> Tuple[int, float]:
+    best = -1
+    min_dist_sq = float('inf')
+    for i, (sx, sy) in enumerate(settlements):
+        ds = (sx - x)**2 + (sy - y)**2
+        if ds < min_dist_sq:
+            min_dist_sq = ds
+            best = i
+    return best, min_dist_sq**0.5
+
+
+def _try_resource(rng: random.Random, occupied: np.ndarray, x: int, y: int, lx: int, ly: int) -> Optional[str]:
+    # Mirrors WorldSimulation._try_place_resource_building, including the order of random draws
+    if occupied[max(0, lx - HALO):lx + HALO + 1, max(0, ly - HALO):ly + HALO + 1].any():
+        return None
+    st = _static
+    if st["forest"][x, y] and rng.random() < 0.001:
+        return BuildingType.LUMBER_YARD.name
+    if st["grassland"][x, y] and rng.random() < 0.001:
+        return BuildingType.FARM.name
+    if st["water_edge"][x, y] and rng.random() < 0.003:
+        return BuildingType.DOCK.name
+    if st["mountain"][x, y]:
+        if st["mine"][x, y] and rng.random() < 0.04:
+            return BuildingType.MINE.name
+        if st["quarry"][x, y] and rng.random() < 0.04:
+            return BuildingType.QUARRY.name
+    return None
+
+
+def _grow_region(task) -> List[Proposal]:
+    (x0, y0, x1, y1), (hx, hy), occupied, settlements, growth_modifier, seed = task
+    rng = random.Random(seed)
+    water = _static["water"]
+    occupied = occupied.copy()
+    proposals = []
+    for x in range(x0, x1):
+        for y in range(y0, y1):
+            lx, ly = x - hx, y - hy
+            if water[x, y] or occupied[lx, ly]:
+                continue
+            if rng.random() > growth_modifier:
+                continue
+
+            settlement = -1
+            b_name = _try_resource(rng, occupied, x, y, lx, ly)
+            if b_name is None:
+                settlement, dist = _nearest_settlement(settlements, x, y)
+                if settlement < 0:
+                    continue
+                if dist < 5.0:
+                    if rng.random() < 0.1:
+                        b_name = BuildingType.RESIDENTIAL_HIGH.name
+                elif dist < 10.0:
+                    if rng.random() < 0.1:
+                        b_name = BuildingType.RESIDENTIAL_LOW.name
+                if b_name is None:
+                    continue
+
+            occupied[lx, ly] = True
+            proposals.append((x, y, b_name, settlement, rng.random(), rng.random()))
+    return proposals
+
+
+def _spawn_candidates(task) -> List[Tuple[int, int]]:
+    (x0, y0, x1, y1), occupied, settlements, min_distance = task
+    candidates = []
+    for x in range(x0, x1):
+        for y in range(y0, y1):
+            if occupied[x - x0, y - y0]:
+                continue
+            nearest, dist = _nearest_settlement(settlements, x, y)
+            if nearest < 0 or dist > min_distance:
+                candidates.append((x, y))
+    return candidates
+
+
+class RegionalSimulation:
+    """Runs growth and the settlement site search per map region on a process pool.
+
+    Workers hold the static tile data (sent once when the pool starts). Each turn they
+    receive only their region's occupancy plus a halo of neighbouring tiles and the
+    settlement positions, and return proposed placements. Proposals are applied in region
+    order; a resource building that now clashes with one placed just across a region
+    border is dropped. Each region rolls its own random stream keyed by turn and region, so
+    results depend on the region size but not on the number of workers."""
+
+    def __init__(self, simulation, workers: int, region_size: int = 64):
+        self.simulation = simulation
+        self.world_map = simulation.world_map
+        self.workers = workers
+        size = self.world_map.size
+        self.regions: List[Region] = [
+            (x0, y0, min(size, x0 + region_size), min(size, y0 + region_size))
+            for x0 in range(0, size, region_size) for y0 in range(0, size, region_size)
+        ]
+        self.occupied = np.zeros((size, size), dtype=bool)
+        self._static = self._static_grids()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        self.occupied[:] = False
+        for (x, y), tile in self.world_map.tiles.items():
+            if tile.buildings:
+                self.occupied[x, y] = True
+
+    def mark(self, tile) -> None:
+        self.occupied[tile.x, tile.y] = True
+
+    def close(self) -> None:
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+
+    def grow(self, growth_modifier: float, key: Tuple) -> None:
+        """One growth pass; region i rolls the simulation's ("growth", *key, i) stream."""
+        size = self.world_map.size
+        settlements = [(s.tile.x, s.tile.y) for s in self.world_map.settlements]
+        tasks = []
+        for i, (x0, y0, x1, y1) in enumerate(self.regions):
+            hx0, hy0 = max(0, x0 - HALO), max(0, y0 - HALO)
+            hx1, hy1 = min(size, x1 + HALO), min(size, y1 + HALO)
+            tasks.append(((x0, y0, x1, y1), (hx0, hy0), self.occupied[hx0:hx1, hy0:hy1],
+                          settlements, growth_modifier,
+                          self.simulation.streams.seed_for("growth", *key, i)))
+
+        for proposals in self._map(_grow_region, tasks):
+            for x, y, b_name, s_idx, lx, ly in proposals:
+                tile = self.world_map.get_tile(x, y)
+                if s_idx < 0 and self._blocked(x, y):
+                    continue
+                settlement = self.world_map.settlements[s_idx] if s_idx >= 0 else None
+                self.simulation.place_building(BuildingType[b_name], tile, (lx, ly), settlement)
+
+    def spawn_candidates(self, min_distance: float) -> List:
+        """Tiles where a settlement may be founded, in the same order as a full map scan."""
+        settlements = [(s.tile.x, s.tile.y) for s in self.world_map.settlements]
+        tasks = [((x0, y0, x1, y1), self.occupied[x0:x1, y0:y1], settlements, min_distance)
+                 for x0, y0, x1, y1 in self.regions]
+        candidates = [pos for chunk in self._map(_spawn_candidates, tasks) for pos in chunk]
+        candidates.sort()
+        return [self.world_map.get_tile(x, y) for x, y in candidates]
+
+    def _blocked(self, x: int, y: int) -> bool:
+        return self.occupied[max(0, x - HALO):x + HALO + 1, max(0, y - HALO):y + HALO + 1].any()
+
+    def _map(self, func, tasks):
+        if self.workers <= 1:
+            _init_worker(self._static)
+            return list(map(func, tasks))
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self._static,))
+        return list(self._pool.map(func, tasks))
+
+    def _static_grids(self) -> Dict[str, np.ndarray]:
+        size = self.world_map.size
+        grids = {name: np.zeros((size, size), dtype=bool)
+                 for name in ["water", "forest", "grassland", "water_edge", "mountain", "mine", "quarry"]}
+        for (x, y), tile in self.world_map.tiles.items():
+            grids["water"][x, y] = tile.has_water
+            grids["forest"][x, y] = tile.type == TileType.FOREST
+            grids["grassland"][x, y] = tile.type == TileType.GRASSLAND
+            mountain = tile.type == TileType.ROCKY or tile.type == TileType.TUNDRA
+            grids["mountain"][x, y] = mountain
+            if mountain:
+                has_metals = any(tile.potentials.get(m, 0) > 0 for m in _METALS)
+                grids["mine"][x, y] = has_metals or tile.type == TileType.ROCKY
+                grids["quarry"][x, y] = tile.potentials.get(ResourceType.STONE, 0) > 0.4
+
+        # A tile is on a water edge if any of its 8 neighbours is water
+        water = np.pad(grids["water"], 1)
+        edge = np.zeros((size, size), dtype=bool)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                if dx or dy:
+                    edge |= water[1 + dx:size + 1 + dx, 1 + dy:size + 1 + dy]
+        grids["water_edge"] = edge
+        return grids
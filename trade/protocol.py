@@ -0,0 +1,131 @@
+import json
+import struct
+from array import array
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from .history import TurnDelta, RESOURCES, BUILDING_TYPES
+from .models import Building, Settlement
+from .map import WorldMap
+
+# Message kinds, the first byte of every message
+HELLO = 1 # Server -> client: JSON with the world size and seed
+DELTA = 2 # Server -> client: one turn's changes
+SNAPSHOT = 3 # Server -> client: the whole world, replacing whatever the client had
+STEP = 4 # Client -> server: run this many turns
+REWIND = 5 # Client -> server: go back to this turn
+ACK = 6 # Client -> server: every message up to this turn has been applied
+BYE = 7 # Either way: closing the connection
+
+_COMMAND = struct.Struct("<Bi")
+# kind, turn, first building, first settlement, buildings, settlements, inventory slots, name bytes
+_STATE = struct.Struct("<BiIIIIII")
+
+BUILDING_DTYPE = np.dtype([
+    ("type", "u1"), ("x", "<i4"), ("y", "<i4"), ("lx", "<f8"), ("ly", "<f8"),
+    ("settlement", "<i4"), ("primary", "i1"),
+])
+SETTLEMENT_DTYPE = np.dtype([("x", "<i4"), ("y", "<i4")])
+
+
+def encode_hello(info: Dict[str, Any]) -> bytes:
+    return bytes([HELLO]) + json.dumps(info).encode()
+
+
+def encode_command(kind: int, value: int = 0) -> bytes:
+    return _COMMAND.pack(kind, value)
+
+
+def encode_state(kind: int, delta: TurnDelta) -> bytes:
+    """Packs a TurnDelta (DELTA) or a TurnHistory snapshot (SNAPSHOT) as one binary message.
+    Records become fixed-size numpy rows, so thousands of buildings encode in one call."""
+    buildings = np.array(delta.buildings, dtype=BUILDING_DTYPE) if delta.buildings else np.zeros(0, BUILDING_DTYPE)
+    positions = np.array([(x, y) for _, x, y in delta.settlements], dtype=SETTLEMENT_DTYPE)
+    names = "\n".join(name for name, _, _ in delta.settlements).encode()
+    header = _STATE.pack(kind, delta.turn, delta.first_building, delta.first_settlement,
+                         len(buildings), len(positions), len(delta.slots), len(names))
+    return b"".join([header, buildings.tobytes(), positions.tobytes(), names,
+                     delta.slots.tobytes(), delta.amounts.tobytes(), delta.buffers.tobytes()])
+
+
+def decode(message: bytes) -> Tuple[int, Any]:
+    """Returns (kind, payload): a dict for HELLO, a TurnDelta for DELTA and SNAPSHOT, else an int."""
+    kind = message[0]
+    if kind == HELLO:
+        return kind, json.loads(message[1:].decode())
+    if kind not in (DELTA, SNAPSHOT):
+        return kind, _COMMAND.unpack(message)[1]
+
+    _, turn, first_building, first_settlement, n_buildings, n_settlements, n_slots, n_names = \
+        _STATE.unpack_from(message)
+    offset = _STATE.size
+    buildings = np.frombuffer(message, BUILDING_DTYPE, n_buildings, offset)
+    offset += buildings.nbytes
+    positions = np.frombuffer(message, SETTLEMENT_DTYPE, n_settlements, offset)
+    offset += positions.nbytes
+    names = message[offset:offset + n_names].decode().split("\n") if n_settlements else []
+    offset += n_names
+
+    delta = TurnDelta(turn, first_building, first_settlement)
+    delta.buildings = buildings.tolist()
+    delta.settlements = [(name, x, y) for name, (x, y) in zip(names, positions.tolist())]
+    for field, code in [("slots", "q"), ("amounts", "q"), ("buffers", "d")]:
+        values = array(code)
+        values.frombytes(message[offset:offset + n_slots * values.itemsize])
+        offset += n_slots * values.itemsize
+        setattr(delta, field, values)
+    return kind, delta
+
+
+class WorldReplica:
+    """A client's copy of the server's world, kept up to date from DELTA and SNAPSHOT messages.
+
+    Buildings and settlements are numbered in creation order, like TurnHistory ids.
+    A snapshot drops everything past its own counts, since after a rewind the server
+    reuses those ids for new objects."""
+
+    def __init__(self, world_map: WorldMap):
+        self.world_map = world_map
+        self.turn = 0
+        self.buildings: List[Building] = []
+        self.settlements: List[Settlement] = []
+        self.new_buildings: List[Building] = []
+
+    def apply(self, kind: int, delta: TurnDelta) -> None:
+        self.new_buildings = []
+        if kind == SNAPSHOT:
+            for b in self.buildings:
+                b.tile.buildings = []
+            for s in self.settlements:
+                s.buildings = []
+            del self.buildings[len(delta.buildings):]
+            del self.settlements[len(delta.settlements):]
+            self.world_map.settlements = []
+
+        for sid, (name, x, y) in enumerate(delta.settlements, delta.first_settlement):
+            if sid == len(self.settlements):
+                self.settlements.append(Settlement(name, self.world_map.get_tile(x, y)))
+            self.world_map.settlements.append(self.settlements[sid])
+
+        for bid, (b_type, x, y, lx, ly, sid, primary) in enumerate(delta.buildings, delta.first_building):
+            settlement = self.settlements[sid] if sid >= 0 else None
+            if bid == len(self.buildings):
+                b = Building(BUILDING_TYPES[b_type], self.world_map.get_tile(x, y), (lx, ly), settlement)
+                b.primary_resource = RESOURCES[primary] if primary >= 0 else None
+                self.buildings.append(b)
+                self.new_buildings.append(b)
+            else:
+                # Re-attaching a building kept from before a rewind
+                b = self.buildings[bid]
+                b.tile.buildings.append(b)
+                if settlement:
+                    settlement.buildings.append(b)
+
+        n = len(RESOURCES)
+        for slot, amount, buf in zip(delta.slots, delta.amounts, delta.buffers):
+            b = self.buildings[slot // n]
+            res = RESOURCES[slot % n]
+            b.inventory[res] = amount
+            b._resource_buffers[res] = buf
+        self.turn = delta.turn
@@ -6,6 +6,8 @@ from typing import Dict, Any, Optional, List
 
 from .constants import TileType, BuildingType
 from .assets import AssetManager
+from .lod import BuildingLOD
+from .heightfield import HeightField
 from .models import Building
 from .map import WorldMap
 
@@ -13,14 +15,17 @@ from .map import WorldMap
 # TODO: SLOW AT HIGH BUILDING COUNTS
 
 class MapRenderer:
-    def __init__(self, world_map: WorldMap, config: Dict[str, Any]):
+    def __init__(self, world_map: WorldMap, config: Dict[str, Any], heightfield: Optional[HeightField] = None):
         self.world_map = world_map
         self.config = config
         self.root = NodePath("MapRoot")
+        self.lod = BuildingLOD(self.root, config)
         self.building_nodes: Dict[Building, NodePath] = {}
         self.vdata: Optional[GeomVertexData] = None
+        self.heightfield = heightfield or HeightField.from_world(world_map, config["visuals"]["height_scale"])
         self.view_mode: str = "TERRAIN" # "TERRAIN" or ResourceType
         self.selected_building: Optional[Building] = None
+        self.asset_mgr: Optional[AssetManager] = None
         
         # Mapping from index to building for picking
         self._index_to_building: Dict[int, Building] = {}
@@ -36,23 +41,6 @@ class MapRenderer:
             BuildingType.QUARRY: {"color": (0.6, 0.6, 0.6, 1.0), "scale": (0.5, 0.5, 0.2)},
         }
 
-    def _get_elev(self, x: int, y: int) -> float:
-        size = self.world_map.size
-        # Map corners to tile elevations
-        tx = max(0, min(size - 1, x))
-        ty = max(0, min(size - 1, y))
-        return self.world_map.get_tile(tx, ty).elevation
-
-    def _get_interpolated_elev(self, x: int, y: int, lx: float, ly: float) -> float:
-        h00 = self._get_elev(x, y)
-        h10 = self._get_elev(x + 1, y)
-        h11 = self._get_elev(x + 1, y + 1)
-        h01 = self._get_elev(x, y + 1)
-        
-        h_bottom = h00 * (1 - lx) + h10 * lx
-        h_top = h01 * (1 - lx) + h11 * lx
-        return h_bottom * (1 - ly) + h_top * ly
-
     def set_view_mode(self, mode: str):
         """mode can be 'TERRAIN' or a ResourceType"""
         self.view_mode = mode
@@ -94,10 +82,14 @@ class MapRenderer:
                     color_writer.addData4(c)
 
     def render(self, parent: NodePath, asset_mgr: AssetManager):
-        self.root.reparentTo(parent)
-        
-        vis_cfg = self.config["visuals"]
-        height_scale = vis_cfg["height_scale"]
+        for _ in self.render_steps(parent, asset_mgr):
+            pass
+        self.update_buildings(asset_mgr)
+
+    def render_steps(self, parent: NodePath, asset_mgr: AssetManager, rows_per_step: int = 16):
+        """Builds the terrain mesh a few rows at a time, yielding progress in [0, 1].
+        The terrain is attached to the scene once the last row is done; buildings are not placed."""
+        self.attach(parent, asset_mgr)
         
         format = GeomVertexFormat.getV3n3c4()
         self.vdata = GeomVertexData('map_data', format, Geom.UHDynamic)
@@ -107,14 +99,16 @@ class MapRenderer:
         
         prim = GeomTriangles(Geom.UHStatic)
         
+        corners = self.heightfield.corners.tolist()
+        normals = self.heightfield.normals().tolist()
         v_idx = 0
         for y in range(self.world_map.size):
             for x in range(self.world_map.size):
                 # Corner heights
-                h00 = self._get_elev(x, y) * height_scale
-                h10 = self._get_elev(x + 1, y) * height_scale
-                h11 = self._get_elev(x + 1, y + 1) * height_scale
-                h01 = self._get_elev(x, y + 1) * height_scale
+                h00 = corners[x][y]
+                h10 = corners[x + 1][y]
+                h11 = corners[x + 1][y + 1]
+                h01 = corners[x][y + 1]
                 
                 # Vertices
                 v0 = Vec3(x, y, h00)
@@ -127,18 +121,16 @@ class MapRenderer:
                 vertex.addData3(v2)
                 vertex.addData3(v3)
                 
-                # Calculate normal
-                side1 = v1 - v0
-                side2 = v3 - v0
-                n = side1.cross(side2)
-                n.normalize()
-                
+                n = Vec3(*normals[x][y])
                 for _ in range(4):
                     normal.addData3(n)
                     
                 prim.addVertices(v_idx, v_idx + 1, v_idx + 2)
                 prim.addVertices(v_idx, v_idx + 2, v_idx + 3)
                 v_idx += 4
+
+            if y % rows_per_step == rows_per_step - 1:
+                yield 0.9 * (y + 1) / self.world_map.size
             
         self.update_colors() # Initial color set
         
@@ -148,54 +140,73 @@ class MapRenderer:
         node = GeomNode('map_geom')
         node.addGeom(geom)
         self.root.attachNewNode(node)
-        
+        yield 1.0
+
+    def attach(self, parent: NodePath, asset_mgr: AssetManager):
+        """Puts the renderer's root and lighting into the scene, without building any terrain."""
+        self.root.reparentTo(parent)
+        self.asset_mgr = asset_mgr
         self._setup_lighting(parent)
-        
-        self.update_buildings(asset_mgr)
 
     def _setup_lighting(self, parent: NodePath):
+        self.sun = parent.attachNewNode(DirectionalLight('sun'))
+        parent.setLight(self.sun)
+        self.ambient = parent.attachNewNode(AmbientLight('ambient'))
+        parent.setLight(self.ambient)
+        self.update_lighting()
+
+    def update_lighting(self):
         light_cfg = self.config["lighting"]
-        
-        dlight = DirectionalLight('sun')
-        dlight.setColor(Vec4(*light_cfg["sun_color"]))
-        dlnp = parent.attachNewNode(dlight)
-        dlnp.setHpr(0, light_cfg.get("sun_tilt", -60.0), 0) # Tilt it down
 
+        self.sun.node().setColor(Vec4(*light_cfg["sun_color"]))
+        self.sun.setHpr(0, light_cfg.get("sun_tilt", -60.0), 0) # Tilt it down
         direction = Vec3(*light_cfg["sun_direction"])
-        dlnp.lookAt(direction)
-        parent.setLight(dlnp)
-        
-        alight = AmbientLight('ambient')
-        alight.setColor(Vec4(*light_cfg["ambient_color"]))
-        alnp = parent.attachNewNode(alight)
-        parent.setLight(alnp)
-
-    def update_buildings(self, asset_mgr: AssetManager):
-        vis_cfg = self.config["visuals"]
-        height_scale = vis_cfg["height_scale"]
-        
-        for (x, y), tile in self.world_map.tiles.items():
-            for building in tile.buildings:
-                if building not in self.building_nodes:
-                    # Use AssetManager to get a copy instead of loading from disk every time
-                    node = asset_mgr.get_instance("models/box", self.root)
-                    
-                    # Tag for picking
-                    idx = self._next_building_idx
-                    self._next_building_idx += 1
-                    self._index_to_building[idx] = building
-                    node.setTag("building_idx", str(idx))
-
-                    # Position: tile origin + local offset
-                    h = self._get_interpolated_elev(tile.x, tile.y, building.local_pos[0], building.local_pos[1]) * height_scale
-                    node.setPos(tile.x + building.local_pos[0],
-                                tile.y + building.local_pos[1],
-                                h)
-                    
-                    style = self.type_styles.get(building.type, {"color": (1, 1, 1, 1), "scale": (0.3, 0.3, 0.3)})
-                    
-                    node.setColor(*style["color"])
-                    node.setScale(*style["scale"])
-                    node.setTextureOff(1) # Ensure color is visible even if model has texture
-                    
-                    self.building_nodes[building] = node
+        self.sun.lookAt(direction)
+
+        self.ambient.node().setColor(Vec4(*light_cfg["ambient_color"]))
+
+    def prune_buildings(self):
+        """Removes nodes of buildings that are no longer on the map, e.g. after a rewind."""
+        stale = [b for b in self.building_nodes if b not in b.tile.buildings]
+        for building in stale:
+            node = self.building_nodes.pop(building)
+            self._index_to_building.pop(int(node.getTag("building_idx")), None)
+            self.asset_mgr.release(node)
+            self.lod.remove(building)
+        self.lod.refresh()
+        if self.selected_building in stale:
+            self.selected_building = None
+
+    def update_buildings(self, asset_mgr: AssetManager, buildings: Optional[List[Building]] = None):
+        """Creates nodes for buildings that don't have one yet, either the given ones or any on the map."""
+        if buildings is None:
+            buildings = [b for tile in self.world_map.tiles.values() for b in tile.buildings]
+        new_buildings = [b for b in buildings if b not in self.building_nodes]
+        if new_buildings:
+            # Position: tile origin + local offset, heights sampled in one batch
+            xs = [b.tile.x + b.local_pos[0] for b in new_buildings]
+            ys = [b.tile.y + b.local_pos[1] for b in new_buildings]
+            heights = self.heightfield.sample(xs, ys).tolist()
+
+            for building, x, y, h in zip(new_buildings, xs, ys, heights):
+                pos = Point3(x, y, h)
+
+                # Holder node instancing the shared box model, grouped for level of detail
+                node = asset_mgr.get_instance("models/box", self.lod.group_for(building, pos))
+                
+                # Tag for picking
+                idx = self._next_building_idx
+                self._next_building_idx += 1
+                self._index_to_building[idx] = building
+                node.setTag("building_idx", str(idx))
+                node.setPos(pos)
+                
+                style = self.type_styles.get(building.type, {"color": (1, 1, 1, 1), "scale": (0.3, 0.3, 0.3)})
+                
+                node.setColor(*style["color"])
+                node.setScale(*style["scale"])
+                node.setTextureOff(1) # Ensure color is visible even if model has texture
+                
+                self.building_nodes[building] = node
+
+        self.lod.refresh()
@@ -0,0 +1,171 @@
+from collections.abc import Mapping
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from .constants import ResourceType
+from .models import Building
+from .map import WorldMap
+
+RESOURCES = list(ResourceType)
+RESOURCE_INDEX = {res: i for i, res in enumerate(RESOURCES)}
+
+# A building draws from the 3x3 tiles around it, so docks reach the water beside them
+_DX, _DY = (a.ravel() for a in np.meshgrid([-1, 0, 1], [-1, 0, 1], indexing="ij"))
+
+
+class TileResources(Mapping):
+    """A tile's row of the ResourceField, readable like the dict it replaces."""
+    __slots__ = ("field", "x", "y")
+
+    def __init__(self, field: "ResourceField", x: int, y: int):
+        self.field = field
+        self.x = x
+        self.y = y
+
+    def __getitem__(self, res: ResourceType) -> float:
+        return float(self.field.stock[RESOURCE_INDEX[res], self.x, self.y])
+
+    def __iter__(self):
+        return iter(RESOURCES)
+
+    def __len__(self) -> int:
+        return len(RESOURCES)
+
+
+class ResourceField:
+    """Stocks of every resource on every tile, as (resources x size x size) float32 arrays.
+
+    A tile holds up to `capacity` times its potential of each resource, starting full.
+    Producing buildings extract from the tiles around them, and their output scales with
+    how full those tiles are. Each turn the resources with a regrowth rate grow back
+    logistically towards capacity and each tile is pulled towards the fullness of its
+    neighbours that can hold them, which evens out depletion without conserving stock;
+    the rest are finite. Both passes are whole-array numpy operations."""
+
+    def __init__(self, world_map: WorldMap, config: Dict[str, Any]):
+        cfg = config.get("resources", {})
+        self.world_map = world_map
+        self.config = config
+        n = world_map.size
+
+        coords = np.array(list(world_map.tiles.keys()), dtype=np.int64).reshape(-1, 2)
+        potentials = np.array([list(t.potentials.values()) for t in world_map.tiles.values()],
+                              dtype=np.float32).reshape(-1, len(RESOURCES))
+        self.capacity = np.zeros((len(RESOURCES), n, n), dtype=np.float32)
+        self.capacity[:, coords[:, 0], coords[:, 1]] = potentials.T * cfg.get("capacity", 100.0)
+        self.stock = self.capacity.copy()
+        self.configure()
+
+        for (x, y), tile in world_map.tiles.items():
+            tile.resources = TileResources(self, x, y)
+
+        # One entry per (building, resource) drawn from the tiles: (building, resource index, x, y, rate)
+        self._extractors: List[Tuple[Building, int, int, int, float]] = []
+        self._arrays = None
+
+    def configure(self) -> None:
+        """Reads regrowth rates and the neighbour pull; capacities are fixed when the field is created."""
+        cfg = self.config.get("resources", {})
+        self.diffusion = cfg.get("diffusion", 0.05)
+        regrowth = cfg.get("regrowth", {})
+        self.renewable = [(RESOURCE_INDEX[ResourceType[name]], rate) for name, rate in regrowth.items() if rate > 0]
+        # Per renewable resource: 1 / capacity (0 where it can't grow) and neighbours where it can
+        self._habitat = {}
+        for i, _ in self.renewable:
+            capacity = self.capacity[i]
+            inv_capacity = np.divide(1.0, capacity, out=np.zeros_like(capacity), where=capacity > 0)
+            self._habitat[i] = (inv_capacity, _neighbour_sum((capacity > 0).astype(np.float32)))
+
+    def on_building_added(self, building: Building) -> None:
+        for res, rate in building.get_production_rates(self.config).items():
+            self._extractors.append((building, RESOURCE_INDEX[res], building.tile.x, building.tile.y, rate))
+        self._arrays = None
+
+    def rebuild(self) -> None:
+        """Re-reads the extracting buildings, after buildings were swapped out or rates changed."""
+        self._extractors = []
+        self._arrays = None
+        for tile in self.world_map.tiles.values():
+            for b in tile.buildings:
+                self.on_building_added(b)
+
+    def step(self) -> Dict[Building, Dict[ResourceType, float]]:
+        """Runs one turn: extraction, then regrowth. Returns what each building got out."""
+        yields = self.extract()
+        self.regrow()
+        return yields
+
+    def extract(self) -> Dict[Building, Dict[ResourceType, float]]:
+        if not self._extractors:
+            return {}
+        if self._arrays is None:
+            _, res, xs, ys, rates = zip(*self._extractors)
+            self._arrays = (np.array(res), np.array(xs), np.array(ys), np.array(rates, dtype=np.float32))
+        res, xs, ys, rates = self._arrays
+        n = self.world_map.size
+        wx, wy = xs[:, None] + _DX, ys[:, None] + _DY
+        inside = (wx >= 0) & (wx < n) & (wy >= 0) & (wy < n)
+        wx, wy, ri = np.clip(wx, 0, n - 1), np.clip(wy, 0, n - 1), np.broadcast_to(res[:, None], wx.shape)
+
+        window = self.stock[ri, wx, wy] * inside
+        total = window.sum(axis=1)
+        total_capacity = (self.capacity[ri, wx, wy] * inside).sum(axis=1)
+        fullness = np.divide(total, total_capacity, out=np.zeros_like(total), where=total_capacity > 0)
+        amounts = np.minimum(rates * fullness, total)
+
+        # Each tile gives in proportion to what it holds. Where windows overlap a tile may be
+        # asked for more than it has; then every building gets the same part of its request
+        share = np.divide(window, total[:, None], out=np.zeros_like(window), where=total[:, None] > 0)
+        taken = share * amounts[:, None]
+        flat = self.stock.reshape(-1)
+        tiles, inverse = np.unique(np.ravel_multi_index((ri, wx, wy), self.stock.shape), return_inverse=True)
+        requested = np.bincount(inverse.ravel(), weights=taken.ravel())
+        removed = np.minimum(requested, flat[tiles])
+        scale = np.divide(removed, requested, out=np.ones_like(requested), where=requested > 0)
+        taken *= scale[inverse].reshape(taken.shape)
+        amounts = taken.sum(axis=1)
+        flat[tiles] = np.maximum(flat[tiles] - removed, 0.0)
+
+        yields: Dict[Building, Dict[ResourceType, float]] = {}
+        for (building, r, _, _, _), amount in zip(self._extractors, amounts.tolist()):
+            yields.setdefault(building, {})[RESOURCES[r]] = amount
+        return yields
+
+    def regrow(self) -> None:
+        for i, rate in self.renewable:
+            stock = self.stock[i]
+            capacity = self.capacity[i]
+            inv_capacity, habitat_neighbours = self._habitat[i]
+            if self.diffusion > 0:
+                # Pulled towards the mean fullness of the neighbouring tiles that can hold it;
+                # not a conserving diffusion, so the total can rise or fall
+                fullness = stock * inv_capacity
+                mean = np.divide(_neighbour_sum(fullness), habitat_neighbours, out=fullness.copy(),
+                                 where=habitat_neighbours > 0)
+                stock += self.diffusion * (mean - fullness) * capacity
+            stock += rate * stock * (1.0 - stock * inv_capacity)
+            # Within rounding of full counts as full, so untouched tiles stay exactly at capacity
+            np.copyto(stock, capacity, where=stock > capacity * 0.999)
+            np.maximum(stock, 0.0, out=stock)
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The stocks as (flat indices, values) of the tiles that aren't full, for history keyframes."""
+        flat = self.stock.reshape(-1)
+        changed = np.flatnonzero(flat != self.capacity.reshape(-1))
+        return changed, flat[changed]
+
+    def restore(self, snapshot: Tuple[np.ndarray, np.ndarray]) -> None:
+        changed, values = snapshot
+        self.stock[:] = self.capacity
+        self.stock.reshape(-1)[changed] = values
+
+
+def _neighbour_sum(grid: np.ndarray) -> np.ndarray:
+    """Sum of the four edge neighbours of every cell, counting nothing beyond the map."""
+    total = np.zeros_like(grid)
+    total[1:] += grid[:-1]
+    total[:-1] += grid[1:]
+    total[:, 1:] += grid[:, :-1]
+    total[:, :-1] += grid[:, 1:]
+    return total
@@ -0,0 +1,28 @@
+import hashlib
+import random
+from typing import Hashable
+
+
+def derive_seed(seed: int, *keys: Hashable) -> int:
+    """A 64-bit seed derived from `seed` and a path of keys, stable across runs and processes.
+    Unlike hash(), this does not change with PYTHONHASHSEED."""
+    text = ":".join(str(k) for k in (seed,) + keys)
+    return int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+
+
+class RNGStreams:
+    """Independent random streams derived from one world seed.
+
+    A stream is named by a subsystem and any further keys, e.g. `stream("growth", turn)`
+    or `stream("growth", turn, region)`. The same names always give the same sequence,
+    and streams with different names don't affect each other, so adding draws to one
+    subsystem leaves the others unchanged."""
+
+    def __init__(self, seed: int):
+        self.seed = seed
+
+    def seed_for(self, name: str, *keys: Hashable) -> int:
+        return derive_seed(self.seed, name, *keys)
+
+    def stream(self, name: str, *keys: Hashable) -> random.Random:
+        return random.Random(self.seed_for(name, *keys))
@@ -0,0 +1,70 @@
+import heapq
+import itertools
+from typing import Callable, List, Tuple, Optional, Any, Dict
+
+
+class ScheduledEvent:
+    def __init__(self, turn: int, func: Callable, args: Tuple, kwargs: Dict[str, Any], interval: Optional[int] = None):
+        self.turn = turn
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.interval = interval # Repeat every `interval` turns if set
+        self.pending = False
+
+
+class EventScheduler:
+    """Priority queue of actions keyed by the turn they are due on."""
+
+    def __init__(self):
+        self._queue: List[Tuple[int, int, ScheduledEvent]] = []
+        self._counter = itertools.count() # Keeps insertion order for events due on the same turn
+        self._live = 0
+
+    def __len__(self) -> int:
+        return self._live
+
+    def schedule(self, turn: int, func: Callable, args: Tuple = (), kwargs: Optional[Dict[str, Any]] = None,
+                 interval: Optional[int] = None) -> ScheduledEvent:
+        if interval is not None and interval < 1:
+            raise ValueError("interval must be at least 1 turn")
+        event = ScheduledEvent(turn, func, args, kwargs or {}, interval)
+        self._push(event)
+        return event
+
+    def cancel(self, event: ScheduledEvent) -> None:
+        """Cancels an event. It stays in the queue and is discarded when it comes due."""
+        if event.pending:
+            event.pending = False
+            self._live -= 1
+
+    def run_due(self, turn: int) -> int:
+        """Runs every event due on or before `turn`, returning how many ran. Events
+        scheduled by the actions themselves wait for the next call, even if already due."""
+        ran = 0
+        started = next(self._counter)
+        deferred = []
+        while self._queue and self._queue[0][0] <= turn:
+            entry = heapq.heappop(self._queue)
+            event = entry[2]
+            if entry[1] > started:
+                deferred.append(entry)
+                continue
+            if not event.pending:
+                continue
+            event.pending = False
+            self._live -= 1
+            # Re-queue repeating events first so the action can cancel its own repetition
+            if event.interval is not None:
+                event.turn += event.interval
+                self._push(event)
+            event.func(*event.args, **event.kwargs)
+            ran += 1
+        for entry in deferred:
+            heapq.heappush(self._queue, entry)
+        return ran
+
+    def _push(self, event: ScheduledEvent) -> None:
+        heapq.heappush(self._queue, (event.turn, next(self._counter), event))
+        event.pending = True
+        self._live += 1
@@ -0,0 +1,266 @@
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Listener, Client, Connection, wait
+from queue import Queue, Empty
+from typing import Dict, Any, List, Optional, Tuple
+
+from .generation import WorldGenerator
+from .simulation import WorldSimulation, TurnManager, RELOADABLE_SECTIONS, world_stats
+from .config import ConfigWatcher
+from .protocol import (HELLO, DELTA, SNAPSHOT, STEP, REWIND, ACK, BYE,
+                       encode_hello, encode_command, encode_state, decode, WorldReplica)
+
+
+def server_address(config: Dict[str, Any]) -> Tuple[Tuple[str, int], bytes]:
+    cfg = config.get("server", {})
+    return (cfg.get("host", "localhost"), cfg.get("port", 47300)), cfg.get("authkey", "trade").encode()
+
+
+class ViewerLink:
+    """The server's end of one viewer's connection.
+
+    Messages are queued and written by a thread of the link's own, so a viewer that
+    stops reading only ever blocks that thread. The queue holds at most `max_bytes`
+    (or one message of any size); `send` refuses more and the server treats the
+    viewer as stale."""
+
+    def __init__(self, conn: Connection, max_bytes: int = 4_000_000):
+        self.conn = conn
+        self.sent = 0 # Last turn sent
+        self.acked = 0 # Last turn the viewer has applied
+        self.stale = False # Skipped deltas while too far behind; needs a snapshot
+        self.closed = False # The connection failed or was closed; the server drops the viewer
+        self.max_bytes = max_bytes
+        self._queue: "deque[Optional[bytes]]" = deque()
+        self._queued_bytes = 0
+        self._ready = threading.Condition()
+        self._thread = threading.Thread(target=self._send_loop, daemon=True)
+        self._thread.start()
+
+    def send(self, message: bytes) -> bool:
+        """Queues a message, returning False if the viewer is too far behind to take it."""
+        with self._ready:
+            if self.closed or (self._queue and self._queued_bytes + len(message) > self.max_bytes):
+                return False
+            self._queue.append(message)
+            self._queued_bytes += len(message)
+            self._ready.notify()
+        return True
+
+    def close(self, message: Optional[bytes] = None) -> None:
+        """Sends `message` if the queue drains within a moment, then closes the connection."""
+        with self._ready:
+            if message is not None:
+                self._queue.append(message)
+            self._queue.append(None)
+            self._ready.notify()
+        self._thread.join(1.0)
+        self.closed = True
+        self.conn.close()
+
+    def _send_loop(self) -> None:
+        while True:
+            with self._ready:
+                while not self._queue:
+                    self._ready.wait()
+                message = self._queue.popleft()
+            if message is None:
+                return
+            try:
+                self.conn.send_bytes(message)
+            except (OSError, EOFError, ValueError):
+                self.closed = True
+                return
+            with self._ready:
+                self._queued_bytes -= len(message)
+
+
+class SimulationServer:
+    """Runs the simulation headless and publishes each turn to connected viewers.
+
+    Viewers get a HELLO and a SNAPSHOT when they connect, then one DELTA per turn. A viewer
+    with more than `window` unacknowledged turns is skipped instead of queued up, and gets
+    a single snapshot once it has caught up, so a slow viewer never holds up the
+    simulation or the other viewers. Writes go through each viewer's own sender
+    thread, and a viewer whose queue is full is skipped the same way. Turns run on
+    STEP requests, or continuously at `turns_per_second` when that is set."""
+
+    def __init__(self, config: Dict[str, Any]):
+        cfg = config.get("server", {})
+        self.config = config
+        self.window = cfg.get("window", 8)
+        self.max_queued_bytes = cfg.get("max_queued_bytes", 4_000_000)
+        self.turns_per_second = cfg.get("turns_per_second", 0.0)
+
+        generator = WorldGenerator(config["map"]["size"], config)
+        self.world_map = generator.generate()
+        self.simulation = WorldSimulation(self.world_map, config)
+        config.setdefault("history", {})["enabled"] = True # Deltas and snapshots come from the history
+        self.turn_mgr = TurnManager(self.simulation)
+        self.history = self.turn_mgr.history
+
+        self.config_watcher = None
+        if config.get("hot_reload", {}).get("enabled", True):
+            self.config_watcher = ConfigWatcher(config)
+            self.config_watcher.on_change(RELOADABLE_SECTIONS, self.simulation.reconfigure)
+
+        address, authkey = server_address(config)
+        self.listener = Listener(address, authkey=authkey)
+        self.viewers: List[ViewerLink] = []
+        self._accepted: "Queue[Connection]" = Queue()
+        self._pending_turns = 0
+        self._running = False
+
+    def serve_forever(self) -> None:
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"Serving a {self.world_map.size}x{self.world_map.size} world on {self.listener.address}")
+        self._running = True
+        next_auto = time.perf_counter()
+        try:
+            while self._running:
+                self._add_viewers()
+                self._drop_closed()
+                if self.config_watcher:
+                    self.config_watcher.poll()
+                timeout = 0.05
+                if self.turns_per_second > 0:
+                    timeout = max(0.0, min(timeout, next_auto - time.perf_counter()))
+                for conn in wait([v.conn for v in self.viewers], timeout):
+                    self._receive(self._viewer_for(conn))
+
+                if self.turns_per_second > 0 and time.perf_counter() >= next_auto:
+                    next_auto += 1.0 / self.turns_per_second
+                    self._pending_turns = max(self._pending_turns, 1)
+                if self._pending_turns > 0:
+                    self._pending_turns -= 1
+                    self._run_turn()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._running = False
+        for viewer in self.viewers:
+            viewer.close(encode_command(BYE))
+        self.viewers = []
+        self.listener.close()
+        self.turn_mgr.close()
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                self._accepted.put(self.listener.accept())
+            except (OSError, EOFError):
+                return
+
+    def _add_viewers(self) -> None:
+        while True:
+            try:
+                conn = self._accepted.get_nowait()
+            except Empty:
+                return
+            viewer = ViewerLink(conn, self.max_queued_bytes)
+            self.viewers.append(viewer)
+            viewer.send(encode_hello({"size": self.world_map.size, "seed": self.world_map.seed}))
+            self._send_snapshot(viewer)
+
+    def _drop_closed(self) -> None:
+        for viewer in [v for v in self.viewers if v.closed]:
+            self.viewers.remove(viewer)
+            viewer.close()
+
+    def _viewer_for(self, conn: Connection) -> ViewerLink:
+        return next(v for v in self.viewers if v.conn is conn)
+
+    def _receive(self, viewer: ViewerLink) -> None:
+        try:
+            kind, value = decode(viewer.conn.recv_bytes())
+        except (EOFError, OSError):
+            kind, value = BYE, 0
+        if kind == ACK:
+            viewer.acked = value
+            if viewer.stale and viewer.acked == viewer.sent:
+                self._send_snapshot(viewer)
+        elif kind == STEP:
+            self._pending_turns += max(1, value)
+        elif kind == REWIND:
+            self._rewind(value)
+        elif kind == BYE:
+            self.viewers.remove(viewer)
+            viewer.close()
+
+    def _run_turn(self) -> None:
+        self.turn_mgr.next_turn()
+        turn = self.turn_mgr.turn_count
+        message = encode_state(DELTA, self.history.deltas[turn])
+        for viewer in list(self.viewers):
+            if viewer.stale or viewer.sent - viewer.acked >= self.window or not viewer.send(message):
+                viewer.stale = True
+                continue
+            viewer.sent = turn
+
+    def _rewind(self, turn: int) -> None:
+        if 0 <= turn < self.turn_mgr.turn_count:
+            self.turn_mgr.rewind(turn)
+            self._pending_turns = 0
+            for viewer in list(self.viewers):
+                self._send_snapshot(viewer)
+
+    def _send_snapshot(self, viewer: ViewerLink) -> None:
+        # A viewer whose queue is full gets it once it acknowledges what it was sent
+        if viewer.send(encode_state(SNAPSHOT, self.history.snapshot())):
+            viewer.sent = self.turn_mgr.turn_count
+            viewer.stale = False
+        else:
+            viewer.stale = True
+
+
+class ViewerClient:
+    """A viewer's end of the connection: applies what the server publishes to a local
+    WorldReplica and acknowledges each message once applied."""
+
+    def __init__(self, config: Dict[str, Any]):
+        address, authkey = server_address(config)
+        self.conn = Client(address, authkey=authkey)
+        kind, self.info = decode(self.conn.recv_bytes())
+        if kind != HELLO:
+            raise ConnectionError("Expected a HELLO from the simulation server")
+        self.replica: Optional[WorldReplica] = None
+
+    def attach(self, world_map) -> None:
+        """Starts applying messages to a map generated from the server's size and seed."""
+        self.replica = WorldReplica(world_map)
+
+    @property
+    def turn_count(self) -> int:
+        return self.replica.turn
+
+    def get_stats(self):
+        return world_stats(self.replica.world_map)
+
+    def poll(self, timeout: float = 0.0) -> List[int]:
+        """Applies every message that has arrived, returning their kinds."""
+        kinds = []
+        while self.conn.poll(timeout):
+            kind, payload = decode(self.conn.recv_bytes())
+            timeout = 0.0
+            if kind in (DELTA, SNAPSHOT):
+                self.replica.apply(kind, payload)
+                self.conn.send_bytes(encode_command(ACK, payload.turn))
+            kinds.append(kind)
+            if kind == BYE:
+                break
+        return kinds
+
+    def request_turns(self, count: int = 1) -> None:
+        self.conn.send_bytes(encode_command(STEP, count))
+
+    def request_rewind(self, turn: int) -> None:
+        self.conn.send_bytes(encode_command(REWIND, turn))
+
+    def close(self) -> None:
+        try:
+            self.conn.send_bytes(encode_command(BYE))
+        except OSError:
+            pass
+        self.conn.close()
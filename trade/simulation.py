@@ -1,24 +1,130 @@
-import random
 from .constants import TileType, BuildingType, ResourceType
 from .models import Building, Settlement
+from .logistics import LogisticsNetwork
+from .market import Market
+from .scheduler import EventScheduler
+from .history import TurnHistory
+from .metrics import TurnRecord, create_sink
+from .parallel import RegionalSimulation
+from .rng import RNGStreams
+from .pipeline import TurnPipeline, ALL
+from .resources import ResourceField
+
+# Config sections the simulation takes up after a reload, through WorldSimulation.reconfigure
+RELOADABLE_SECTIONS = {"simulation", "logistics", "production", "consumption", "market", "pipeline", "resources"}
 
 class WorldSimulation:
-    def __init__(self, world_map, config):
+    def __init__(self, world_map, config, initial_growth=True):
         self.world_map = world_map
         self.config = config
-        self._simulate_growth(0.5)
+        self.logistics = LogisticsNetwork(world_map, config)
+        self.market = Market(world_map, config, self.logistics)
+        self.new_buildings = []
+        self.new_settlements = []
+        self.phase_times = {}
+        self.turn = 0
+        self.streams = RNGStreams(world_map.seed)
+        self.yields = {} # What each extracting building got out of its tiles this turn
+
+        # Paged maps only hold the tiles around the camera, so their stocks aren't simulated
+        self.resources = None
+        if config.get("resources", {}).get("enabled", True) and world_map.complete:
+            self.resources = ResourceField(world_map, config)
+
+        sim_cfg = config["simulation"]
+        self.regional = None
+        if sim_cfg.get("parallel_workers", 0) > 0 and world_map.complete:
+            self.regional = RegionalSimulation(self, sim_cfg["parallel_workers"], sim_cfg.get("region_size", 64))
+        if initial_growth:
+            self._simulate_growth(0.5, ("initial",))
+
+        # The phases of a turn; other systems register their own stages on the pipeline
+        self.pipeline = TurnPipeline(config.get("pipeline", {}).get("workers", 0))
+        self.pipeline.add_stage("growth", self._grow,
+                                reads=("tiles", "settlements", "buildings"), writes=("buildings", "logistics"))
+        self.pipeline.add_stage("settlements", self._spawn_new_settlements,
+                                reads=("tiles", "settlements", "buildings"),
+                                writes=("settlements", "buildings", "logistics"))
+        self.pipeline.add_stage("production", self._process_production_and_consumption,
+                                reads=("buildings",), writes=("inventory", "resources"))
+        self.pipeline.add_stage("logistics", self.logistics.update,
+                                reads=("buildings", "settlements", "inventory"), writes=("inventory", "logistics"))
+        self.pipeline.add_stage("market", self.market.clear,
+                                reads=("buildings", "settlements", "inventory"), writes=("market",))
+
+    def initial_growth_steps(self, tiles_per_step=2000):
+        """Runs the initial growth pass in slices, yielding progress in [0, 1].
+        Produces the same world as passing initial_growth=True."""
+        if self.regional:
+            self._simulate_growth(0.5, ("initial",))
+            yield 1.0
+            return
+        rng = self.streams.stream("growth", "initial")
+        tiles = list(self.world_map.tiles.items())
+        for start in range(0, len(tiles), tiles_per_step):
+            self._simulate_growth(0.5, ("initial",), tiles[start:start + tiles_per_step], rng)
+            yield min(1.0, (start + tiles_per_step) / len(tiles))
 
     def simulate_turn(self):
+        self.turn += 1
+        self.new_buildings = []
+        self.new_settlements = []
+        self.phase_times = self.pipeline.run()
+
+    def _grow(self):
         base_growth = self.config["simulation"].get("growth_chance", 0.0001)
-        self._simulate_growth(base_growth)
-        self._spawn_new_settlements()
-        self._process_production_and_consumption()
+        self._simulate_growth(base_growth, (self.turn,))
+
+    def rebuild_caches(self):
+        """Called after buildings or settlements were swapped out underneath the simulation."""
+        self.logistics.reset()
+        if self.regional:
+            self.regional.rebuild()
+        if self.resources:
+            self.resources.rebuild()
+
+    def reconfigure(self, changed):
+        """Rebuilds what was derived from the given config sections after a reload.
+        Rates and chances are read from the config every turn and need nothing."""
+        if "logistics" in changed:
+            self.logistics.pathfinder.configure(self.config)
+            self.logistics.pathfinder.reset()
+        if "production" in changed:
+            self.logistics.find_producers()
+            if self.resources:
+                self.resources.rebuild()
+        if "resources" in changed and self.resources:
+            self.resources.configure()
+        if changed & {"market", "consumption"}:
+            self.market.configure()
+        if "pipeline" in changed:
+            self.pipeline.close()
+            self.pipeline.workers = self.config.get("pipeline", {}).get("workers", 0)
+
+    def register_building(self, building):
+        """Tells the caches about a building that was just put on the map."""
+        self.logistics.on_building_added(building)
+        self.world_map.on_building_added(building)
+        if self.regional:
+            self.regional.mark(building.tile)
+        if self.resources:
+            self.resources.on_building_added(building)
+
+    def close(self):
+        self.pipeline.close()
+        if self.regional:
+            self.regional.close()
 
     def _process_production_and_consumption(self):
+        # Output drawn from the tiles' stocks, which scales with how depleted they are
+        self.yields = self.resources.step() if self.resources else {}
         for tile in self.world_map.tiles.values():
             for building in tile.buildings:
                 # Production
-                prod_rates = building.get_production_rates(self.config)
+                if building in self.yields:
+                    prod_rates = self.yields[building]
+                else:
+                    prod_rates = building.get_production_rates(self.config)
                 for res, rate in prod_rates.items():
                     building.add_resource(res, rate)
                 
@@ -46,18 +152,31 @@ class WorldSimulation:
                     return True
         return False
 
-    def _rand_pos(self):
-        return (random.random(), random.random())
+    def _rand_pos(self, rng):
+        return (rng.random(), rng.random())
+
+    def place_building(self, b_type, tile, local_pos, settlement=None):
+        """Builds on a tile and registers the building with everything that tracks buildings."""
+        building = Building(b_type, tile, local_pos, settlement)
+        self.new_buildings.append(building)
+        self.register_building(building)
+        return building
+
+    def _simulate_growth(self, growth_modifier, key, tiles=None, rng=None):
+        """One growth pass drawing from the "growth" stream for `key`, the turn or ("initial",)."""
+        if self.regional and tiles is None:
+            self.regional.grow(growth_modifier, key)
+            return
 
-    def _simulate_growth(self, growth_modifier):
+        rng = rng or self.streams.stream("growth", *key)
         # TODO: optimization - probably don't need to loop the whole map
-        for (x, y), tile in self.world_map.tiles.items():
+        for (x, y), tile in (tiles if tiles is not None else self.world_map.tiles.items()):
             if tile.has_water or tile.buildings:
                 continue
-            if random.random() > growth_modifier:
+            if rng.random() > growth_modifier:
                 continue
 
-            if self._try_place_resource_building(tile):
+            if self._try_place_resource_building(tile, rng):
                 continue
                 
             nearest_s, dist = self._get_nearest_settlement(x, y)
@@ -66,16 +185,16 @@ class WorldSimulation:
                 # Growth rules based on distance to settlement
                 if dist < 5.0:
                     # High density residential core
-                    if random.random() < 0.1:
-                        Building(BuildingType.RESIDENTIAL_HIGH, tile, self._rand_pos(), nearest_s)
+                    if rng.random() < 0.1:
+                        self.place_building(BuildingType.RESIDENTIAL_HIGH, tile, self._rand_pos(rng), nearest_s)
                         continue
                 elif dist < 10.0:
                     # Low density residential outskirts
-                    if random.random() < 0.1:
-                        Building(BuildingType.RESIDENTIAL_LOW, tile, self._rand_pos(), nearest_s)
+                    if rng.random() < 0.1:
+                        self.place_building(BuildingType.RESIDENTIAL_LOW, tile, self._rand_pos(rng), nearest_s)
                         continue
 
-    def _try_place_resource_building(self, tile):
+    def _try_place_resource_building(self, tile, rng):
         # don't place if there are other buildings within 9 tiles
         for dx in range(-3, 4):
             for dy in range(-3, 4):
@@ -85,20 +204,20 @@ class WorldSimulation:
 
         # Lumber Yards on Forest
         if tile.type == TileType.FOREST:
-            if random.random() < 0.001:
-                Building(BuildingType.LUMBER_YARD, tile, self._rand_pos())
+            if rng.random() < 0.001:
+                self.place_building(BuildingType.LUMBER_YARD, tile, self._rand_pos(rng))
                 return True
         
         # Farms on non-arid Grassland
         if tile.type == TileType.GRASSLAND:
-            if random.random() < 0.001:
-                Building(BuildingType.FARM, tile, self._rand_pos())
+            if rng.random() < 0.001:
+                self.place_building(BuildingType.FARM, tile, self._rand_pos(rng))
                 return True
         
         # Docks on water edge
         if self._is_water_edge(tile):
-            if random.random() < 0.003:
-                Building(BuildingType.DOCK, tile, self._rand_pos())
+            if rng.random() < 0.003:
+                self.place_building(BuildingType.DOCK, tile, self._rand_pos(rng))
                 return True
         
         # Mines and Quarries on metal/stone potential
@@ -108,75 +227,149 @@ class WorldSimulation:
             has_metals = any(tile.potentials.get(m, 0) > 0 for m in metals)
             
             if has_metals or tile.type == TileType.ROCKY:
-                if random.random() < 0.04:
-                    Building(BuildingType.MINE, tile, self._rand_pos())
+                if rng.random() < 0.04:
+                    self.place_building(BuildingType.MINE, tile, self._rand_pos(rng))
                     return True
             
             if tile.potentials.get(ResourceType.STONE, 0) > 0.4:
-                if random.random() < 0.04:
-                    Building(BuildingType.QUARRY, tile, self._rand_pos())
+                if rng.random() < 0.04:
+                    self.place_building(BuildingType.QUARRY, tile, self._rand_pos(rng))
                     return True
         
         return False
 
     def _spawn_new_settlements(self):
         sim_cfg = self.config["simulation"]
-        if random.random() < sim_cfg["settlement_spawn_chance"]:
-            potential_tiles = []
-            for (x, y), tile in self.world_map.tiles.items():
-                if tile.buildings:
-                    continue
-                nearest_s, dist = self._get_nearest_settlement(x, y)
-                if nearest_s is None or dist > sim_cfg["settlement_min_distance"]:
-                    potential_tiles.append(tile)
+        rng = self.streams.stream("settlements", self.turn)
+        if rng.random() < sim_cfg["settlement_spawn_chance"]:
+            if self.regional:
+                potential_tiles = self.regional.spawn_candidates(sim_cfg["settlement_min_distance"])
+            else:
+                potential_tiles = self._spawn_candidates(sim_cfg["settlement_min_distance"])
             
             if potential_tiles:
-                tile = random.choice(potential_tiles)
+                tile = rng.choice(potential_tiles)
                 new_s = Settlement(f"City {len(self.world_map.settlements)}", tile)
-                Building(BuildingType.RESIDENTIAL_LOW, tile, self._rand_pos(), new_s)
+                self.place_building(BuildingType.RESIDENTIAL_LOW, tile, self._rand_pos(rng), new_s)
                                     
                 self.world_map.settlements.append(new_s)
-                print(f"New settlement founded at {tile.x}, {tile.y}")
+                self.new_settlements.append(new_s)
+
+    def _spawn_candidates(self, min_distance):
+        potential_tiles = []
+        for (x, y), tile in self.world_map.tiles.items():
+            if tile.buildings:
+                continue
+            nearest_s, dist = self._get_nearest_settlement(x, y)
+            if nearest_s is None or dist > min_distance:
+                potential_tiles.append(tile)
+        return potential_tiles
 
     def get_stats(self):
-        stats = {
-            "settlements": len(self.world_map.settlements),
-            "buildings": {}
-        }
-        for tile in self.world_map.tiles.values():
-            for b in tile.buildings:
-                stats["buildings"][b.type] = stats["buildings"].get(b.type, 0) + 1
-        return stats
+        return world_stats(self.world_map)
+
+def world_stats(world_map):
+    stats = {
+        "settlements": len(world_map.settlements),
+        "buildings": {}
+    }
+    for tile in world_map.tiles.values():
+        for b in tile.buildings:
+            stats["buildings"][b.type] = stats["buildings"].get(b.type, 0) + 1
+    return stats
 
 class TurnManager:
-    def __init__(self, simulation):
+    def __init__(self, simulation, metrics=None):
         self.simulation = simulation
         self.turn_count = 0
-        self.action_queue = [] # List of (function, args, kwargs)
-        
+        self.scheduler = EventScheduler()
+        self.metrics = metrics if metrics is not None else create_sink(simulation.config)
+
+        hist_cfg = simulation.config.get("history", {})
+        self.history = None
+        # Paged maps drop and rebuild buildings as chunks come and go, which history can't follow
+        if hist_cfg.get("enabled", True) and simulation.world_map.complete:
+            self.history = TurnHistory(simulation, hist_cfg.get("keyframe_interval", 25))
+
+        # End-of-turn stages after the world's own; history and stats only read, so they run together
+        pipeline = simulation.pipeline
+        pipeline.add_stage("actions", self._run_actions, writes=(ALL,))
+        if self.history:
+            pipeline.add_stage("history", self._record_history,
+                               reads=("tiles", "settlements", "buildings", "inventory", "resources"),
+                               writes=("history",))
+        self._record = None
+        if self.metrics.enabled:
+            pipeline.add_stage("stats", self._collect_stats,
+                               reads=("tiles", "settlements", "buildings", "inventory", "logistics"),
+                               writes=("metrics",))
+
     def add_action(self, func, *args, **kwargs):
         """Add an action to be processed next turn."""
-        self.action_queue.append((func, args, kwargs))
+        return self.scheduler.schedule(self.turn_count + 1, func, args, kwargs)
+
+    def schedule_at(self, turn, func, *args, **kwargs):
+        """Run an action at the end of the given turn."""
+        return self.scheduler.schedule(max(turn, self.turn_count + 1), func, args, kwargs)
+
+    def schedule_in(self, delay, func, *args, **kwargs):
+        """Run an action `delay` turns from now."""
+        return self.scheduler.schedule(self.turn_count + max(1, delay), func, args, kwargs)
+
+    def schedule_every(self, interval, func, *args, **kwargs):
+        """Run an action every `interval` turns, starting `interval` turns from now."""
+        return self.scheduler.schedule(self.turn_count + interval, func, args, kwargs, interval)
+
+    def cancel(self, event):
+        self.scheduler.cancel(event)
 
     def next_turn(self):
         self.turn_count += 1
-        print(f"--- Turn {self.turn_count} ---")
 
         self.simulation.simulate_turn()
+        if self._record:
+            self._record.timings = dict(self.simulation.phase_times)
+            self.metrics.write(self._record)
+            self._record = None
+
+    def _run_actions(self):
+        self.scheduler.run_due(self.turn_count)
+
+    def _record_history(self):
+        self.history.record(self.turn_count)
+
+    def _collect_stats(self):
+        self._record = self._turn_record()
+
+    def _turn_record(self):
+        record = TurnRecord(self.turn_count)
+        world_map = self.simulation.world_map
 
         # count building types and resources
         btypes = {}
         total_resources = {res: 0.0 for res in ResourceType}
-        for tile in self.simulation.world_map.tiles.values():
+        for tile in world_map.tiles.values():
             for b in tile.buildings:
                 btypes[b.type] = btypes.get(b.type, 0) + 1
                 for res, amount in b.inventory.items():
                     total_resources[res] += amount
 
-        print("Building counts:", {bt.name: count for bt, count in btypes.items()})
-        res_summary = {res.name: amount for res, amount in total_resources.items() if amount != 0}
-        print("World Resources:", res_summary)
-        
-        while self.action_queue:
-            func, args, kwargs = self.action_queue.pop(0)
-            func(*args, **kwargs)
+        record.settlements = len(world_map.settlements)
+        record.new_settlements = [(s.name, s.tile.x, s.tile.y) for s in self.simulation.new_settlements]
+        record.buildings = {bt.name: count for bt, count in btypes.items()}
+        record.resources = {res.name: amount for res, amount in total_resources.items() if amount != 0}
+        record.shipments = len(self.simulation.logistics.shipments)
+        return record
+
+    def close(self):
+        self.metrics.close()
+        self.simulation.close()
+
+    def rewind(self, turn):
+        """Restores the world to the end of an earlier turn and discards the turns after it.
+        Scheduled actions are not rewound. Needs history to be enabled."""
+        if not self.history:
+            raise RuntimeError("Cannot rewind: history is disabled")
+        self.history.seek(turn)
+        self.history.truncate()
+        self.turn_count = turn
@@ -0,0 +1,184 @@
+import argparse
+import copy
+import csv
+import itertools
+import os
+import sys
+import time
+import tomllib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, List, Tuple
+
+from .config import load_config
+from .constants import BuildingType, ResourceType
+from .generation import WorldGenerator
+from .simulation import WorldSimulation, TurnManager
+
+Override = Tuple[str, Any] # ("section.key", value)
+
+
+def parse_grid(specs: List[str]) -> Dict[str, List[Any]]:
+    """Parses "section.key=VALUE" specs, VALUE in TOML syntax. A list is a set of values to
+    sweep over; a single value is fixed. Wrap list-valued settings in a list of lists."""
+    grid = {}
+    for spec in specs:
+        key, sep, value = spec.partition("=")
+        if not sep or "." not in key:
+            raise ValueError(f"Expected section.key=VALUE, got {spec!r}")
+        try:
+            parsed = tomllib.loads(f"v = {value}")["v"]
+        except tomllib.TOMLDecodeError:
+            parsed = value # A bare word such as a direction name
+        grid[key.strip()] = parsed if isinstance(parsed, list) else [parsed]
+    return grid
+
+
+def combinations(grid: Dict[str, List[Any]]) -> List[List[Override]]:
+    keys = list(grid)
+    return [list(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def apply_overrides(config: Dict[str, Any], overrides: List[Override]) -> Dict[str, Any]:
+    """Returns a copy of the config with the overrides applied. Only settings already in
+    the config can be overridden, so a misspelt key fails instead of being ignored."""
+    config = copy.deepcopy(config)
+    for key, value in overrides:
+        *path, last = key.split(".")
+        section = config
+        for name in path:
+            section = section.get(name) if isinstance(section, dict) else None
+        if not isinstance(section, dict) or last not in section:
+            raise ValueError(f"Unknown setting {key!r}; it is not in the loaded config")
+        section[last] = value
+    return config
+
+
+def run_one(config: Dict[str, Any], overrides: List[Override], seed: int, turns: int) -> Dict[str, Any]:
+    """Generates and simulates one world without rendering; returns its final stats as a row."""
+    started = time.perf_counter()
+    config = apply_overrides(config, overrides)
+    config["generation"]["seed"] = seed
+    # One process per run already uses the cores; nothing here needs rewinding or reloading
+    config["simulation"]["parallel_workers"] = 0
+    config.setdefault("pipeline", {})["workers"] = 0
+    config.setdefault("history", {})["enabled"] = False
+    config.setdefault("metrics", {})["enabled"] = False
+
+    world_map = WorldGenerator(config["map"]["size"], config).generate()
+    simulation = WorldSimulation(world_map, config)
+    turn_mgr = TurnManager(simulation)
+    for _ in range(turns):
+        turn_mgr.next_turn()
+    stats = simulation.get_stats()
+    turn_mgr.close()
+
+    row = {key: value for key, value in overrides}
+    row["seed"] = seed
+    row["settlements"] = stats["settlements"]
+    row["buildings"] = sum(stats["buildings"].values())
+    for b_type in BuildingType:
+        row[b_type.name.lower()] = stats["buildings"].get(b_type, 0)
+    totals = {res: 0 for res in ResourceType}
+    for tile in world_map.tiles.values():
+        for b in tile.buildings:
+            for res, amount in b.inventory.items():
+                totals[res] += amount
+    for res in ResourceType:
+        row[res.name.lower()] = totals[res]
+    row["seconds"] = round(time.perf_counter() - started, 2)
+    return row
+
+
+class Sweep:
+    """Runs every combination of a config grid and a list of seeds in worker processes.
+
+    Each run is independent and rendering-free, so runs are spread over a process pool
+    with one run per task; the largest maps are submitted first so that a long run
+    doesn't start last and leave the other cores idle."""
+
+    def __init__(self, config: Dict[str, Any], grid: Dict[str, List[Any]], seeds: List[int],
+                 turns: int, workers: int = 0):
+        # Checked here rather than in every worker process
+        apply_overrides(config, [(key, values[0]) for key, values in grid.items() if values])
+        self.config = config
+        self.grid = grid
+        self.seeds = seeds
+        self.turns = turns
+        self.workers = workers or os.cpu_count() or 1
+        self.rows: List[Dict[str, Any]] = []
+
+    def run(self, progress: bool = True) -> List[Dict[str, Any]]:
+        """Runs every job, returning one row per run in grid order."""
+        jobs = [(overrides, seed) for overrides in combinations(self.grid) for seed in self.seeds]
+        size = lambda i: dict(jobs[i][0]).get("map.size", self.config["map"]["size"])
+        rows: List[Dict[str, Any]] = [{} for _ in jobs]
+        with ProcessPoolExecutor(min(self.workers, len(jobs))) as pool:
+            futures = {pool.submit(run_one, self.config, *jobs[i], self.turns): i
+                       for i in sorted(range(len(jobs)), key=size, reverse=True)}
+            for done, future in enumerate(as_completed(futures), 1):
+                rows[futures[future]] = future.result()
+                if progress:
+                    print(f"\r{done}/{len(jobs)} runs", end="", file=sys.stderr, flush=True)
+        if progress:
+            print(file=sys.stderr)
+        self.rows = rows
+        return rows
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """One row per combination: the mean of every stat over the seeds."""
+        groups: Dict[Tuple, List[Dict[str, Any]]] = {}
+        for row in self.rows:
+            groups.setdefault(tuple(repr(row[k]) for k in self.grid), []).append(row)
+        summary = []
+        for rows in groups.values():
+            mean = {k: rows[0][k] for k in self.grid}
+            mean["seeds"] = len(rows)
+            for column in rows[0]:
+                if column not in self.grid and column != "seed":
+                    mean[column] = round(sum(r[column] for r in rows) / len(rows), 2)
+            summary.append(mean)
+        return summary
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    """Aligned text columns, leaving out columns that are zero in every row."""
+    if not rows:
+        return ""
+    columns = [c for c in rows[0] if any(row[c] != 0 for row in rows) or not isinstance(rows[0][c], (int, float))]
+    cells = [[str(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(line[i]) for line in cells)) for i, c in enumerate(columns)]
+    lines = ["  ".join(c.rjust(w) for c, w in zip(columns, widths))]
+    lines += ["  ".join(v.rjust(w) for v, w in zip(line, widths)) for line in cells]
+    return "\n".join(lines)
+
+
+def write_csv(path: str, rows: List[Dict[str, Any]]) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the simulation over a grid of config overrides and seeds")
+    parser.add_argument("--set", action="append", default=[], metavar="SECTION.KEY=VALUE",
+                        help="config override in TOML syntax; a list such as [0.01, 0.02] is swept over")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1], help="world seeds to run each combination with")
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=0, help="worker processes, 0 = one per core")
+    parser.add_argument("--output", help="write every run to this CSV file")
+    parser.add_argument("--config", default="config.toml")
+    args = parser.parse_args()
+
+    sweep = Sweep(load_config(args.config), parse_grid(args.set), args.seeds, args.turns, args.workers)
+    started = time.perf_counter()
+    sweep.run()
+    print(format_table(sweep.summary() if len(args.seeds) > 1 else sweep.rows))
+    print(f"{len(sweep.rows)} runs of {args.turns} turns on {sweep.workers} workers "
+          f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    if args.output:
+        write_csv(args.output, sweep.rows)
+
+
+if __name__ == "__main__":
+    main()
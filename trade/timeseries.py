@@ -0,0 +1,134 @@
+from typing import Dict, Any, List, Iterable
+
+import numpy as np
+
+from .constants import ResourceType
+from .models import Building, Settlement
+
+RESOURCES = list(ResourceType)
+RESOURCE_INDEX = {res: i for i, res in enumerate(RESOURCES)}
+
+
+class TimeSeries:
+    """Inventory and production of every building over the last `capacity` turns.
+
+    Each series is a numpy ring indexed [turn % capacity, row, resource], with one row per
+    building or settlement plus a world total, so recording a turn writes one slice per
+    array. Memory is capacity * rows * resources * 4 bytes per array, rows growing by
+    doubling as buildings are added. Settlement and world series are sums over buildings.
+    Buildings detached by a rewind record zeros."""
+
+    def __init__(self, config: Dict[str, Any]):
+        cfg = config.get("timeseries", {})
+        self.config = config
+        self.capacity = cfg.get("capacity", 50)
+        self.turns = np.full(self.capacity, -1, dtype=np.int64) # Turn stored in each slot, -1 = empty
+
+        n = len(RESOURCES)
+        self.inventory = np.zeros((self.capacity, 16, n), dtype=np.int32)
+        self.production = np.zeros((self.capacity, 16, n), dtype=np.float32)
+        self.settlement_inventory = np.zeros((self.capacity, 4, n), dtype=np.int32)
+        self.world_inventory = np.zeros((self.capacity, n), dtype=np.int64)
+        self.world_production = np.zeros((self.capacity, n), dtype=np.float32)
+
+        self._buildings: List[Building] = []
+        self._building_rows: Dict[Building, int] = {}
+        self._rates = np.zeros((16, n), dtype=np.float32) # Production per turn of each building
+        self._settlement_of = np.full(16, -1, dtype=np.int64)
+        self._settlement_rows: Dict[Settlement, int] = {}
+
+    def add(self, buildings: Iterable[Building]) -> None:
+        """Starts tracking buildings, e.g. the ones founded this turn."""
+        for b in buildings:
+            if b in self._building_rows:
+                continue
+            row = len(self._buildings)
+            if row == self.inventory.shape[1]:
+                self.inventory = _grow(self.inventory, 1)
+                self.production = _grow(self.production, 1)
+                self._rates = _grow(self._rates, 0)
+                self._settlement_of = np.concatenate([self._settlement_of, np.full(row, -1, dtype=np.int64)])
+            self._buildings.append(b)
+            self._building_rows[b] = row
+            self._set_rates(row, b)
+            if b.settlement:
+                self._settlement_of[row] = self._settlement_row(b.settlement)
+
+    def configure(self) -> None:
+        """Rebuilds the production rate table after the production config changed."""
+        self._rates[:] = 0
+        for row, b in enumerate(self._buildings):
+            self._set_rates(row, b)
+
+    def record(self, turn: int, yields: Dict[Building, Dict[ResourceType, float]] = None) -> None:
+        """Records the current inventories. `yields` is this turn's actual output of buildings
+        drawing on tile stocks; other buildings are recorded at their configured rate."""
+        slot = turn % self.capacity
+        n = len(self._buildings)
+        attached = np.array([b in b.tile.buildings for b in self._buildings], dtype=bool)
+        inventory = np.array([list(b.inventory.values()) for b in self._buildings], dtype=np.int32).reshape(n, len(RESOURCES))
+        inventory[~attached] = 0
+
+        self.inventory[slot] = 0
+        self.inventory[slot, :n] = inventory
+        self.production[slot] = 0
+        self.production[slot, :n] = self._rates[:n] * attached[:, None]
+        for b, amounts in (yields or {}).items():
+            row = self._building_rows.get(b)
+            if row is not None:
+                for res, amount in amounts.items():
+                    self.production[slot, row, RESOURCE_INDEX[res]] = amount
+
+        self.settlement_inventory[slot] = 0
+        rows = self._settlement_of[:n]
+        mask = rows >= 0
+        np.add.at(self.settlement_inventory[slot], rows[mask], inventory[mask])
+        self.world_inventory[slot] = inventory.sum(axis=0)
+        self.world_production[slot] = self.production[slot, :n].sum(axis=0)
+        self.turns[slot] = turn
+
+    def truncate(self, turn: int) -> None:
+        """Forgets turns after `turn`, after a rewind."""
+        self.turns[self.turns > turn] = -1
+
+    def building_series(self, building: Building, res: ResourceType, production: bool = False) -> np.ndarray:
+        """Oldest-first values of one resource for a building; empty if it isn't tracked."""
+        row = self._building_rows.get(building)
+        if row is None:
+            return np.zeros(0)
+        data = self.production if production else self.inventory
+        return data[self._order(), row, RESOURCE_INDEX[res]]
+
+    def settlement_series(self, settlement: Settlement, res: ResourceType = None) -> np.ndarray:
+        """Oldest-first stock of one resource, or of all resources together, across a settlement."""
+        row = self._settlement_rows.get(settlement)
+        if row is None:
+            return np.zeros(0)
+        data = self.settlement_inventory[self._order(), row]
+        return data.sum(axis=1) if res is None else data[:, RESOURCE_INDEX[res]]
+
+    def world_series(self, res: ResourceType = None, production: bool = False) -> np.ndarray:
+        data = (self.world_production if production else self.world_inventory)[self._order()]
+        return data.sum(axis=1) if res is None else data[:, RESOURCE_INDEX[res]]
+
+    def _order(self) -> np.ndarray:
+        slots = np.flatnonzero(self.turns >= 0)
+        return slots[np.argsort(self.turns[slots])]
+
+    def _set_rates(self, row: int, building: Building) -> None:
+        for res, rate in building.get_production_rates(self.config).items():
+            self._rates[row, RESOURCE_INDEX[res]] = rate
+
+    def _settlement_row(self, settlement: Settlement) -> int:
+        row = self._settlement_rows.get(settlement)
+        if row is None:
+            row = len(self._settlement_rows)
+            if row == self.settlement_inventory.shape[1]:
+                self.settlement_inventory = _grow(self.settlement_inventory, 1)
+            self._settlement_rows[settlement] = row
+        return row
+
+
+def _grow(data: np.ndarray, axis: int) -> np.ndarray:
+    """Doubles an array along `axis`, zero-filling the new rows."""
+    return np.concatenate([data, np.zeros_like(data)], axis=axis)
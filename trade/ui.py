@@ -1,13 +1,47 @@
 from direct.gui.DirectGui import DirectFrame, DirectLabel
-from panda3d.core import TextNode
+from panda3d.core import TextNode, LineSegs
 from .constants import BuildingType
 
+class Sparkline:
+    """A small line chart of a series, scaled to fit its box between the series' min and max."""
+    def __init__(self, parent, pos, width, height, color):
+        self.root = parent.attachNewNode("sparkline")
+        self.root.setPos(pos)
+        self.width = width
+        self.height = height
+        self.color = color
+        self.line = None
+
+    def set(self, values):
+        if self.line:
+            self.line.removeNode()
+            self.line = None
+        if len(values) < 2:
+            return
+        low, high = min(values), max(values)
+        span = (high - low) or 1
+        segs = LineSegs("sparkline")
+        segs.setColor(*self.color)
+        segs.setThickness(1.5)
+        step = self.width / (len(values) - 1)
+        for i, value in enumerate(values):
+            point = (i * step, 0, (value - low) / span * self.height)
+            if i == 0:
+                segs.moveTo(*point)
+            else:
+                segs.drawTo(*point)
+        self.line = self.root.attachNewNode(segs.create())
+
+SPARK_COLORS = [(0.4, 1, 0.4, 1), (1, 0.8, 0.3, 1), (0.5, 0.7, 1, 1)]
+
 class HUD:
-    def __init__(self, parent):
+    def __init__(self, parent, series=None):
+        self.series = series
+
         # Semi-transparent background frame on the left
         self.frame = DirectFrame(
             frameColor=(0, 0, 0, 0.6),
-            frameSize=(-0.45, 0.45, -0.7, 0.7),
+            frameSize=(-0.45, 0.45, -0.9, 0.7),
             pos=(-1.2, 0, 0.2),
             parent=parent
         )
@@ -58,6 +92,29 @@ class HUD:
             self.building_labels[b_type] = label
             y_pos -= 0.055
 
+        # Goods in stock and produced per turn across the world, over the recorded turns,
+        # each in its own box since the two are scaled independently
+        self.stock_label = DirectLabel(
+            text="Stock",
+            scale=0.04,
+            pos=(-0.4, 0, y_pos - 0.02),
+            parent=self.frame,
+            frameColor=(0, 0, 0, 0),
+            text_fg=SPARK_COLORS[2],
+            text_align=TextNode.ALeft
+        )
+        self.stock_chart = Sparkline(self.frame, (-0.4, 0, y_pos - 0.17), 0.8, 0.1, SPARK_COLORS[2])
+        self.production_label = DirectLabel(
+            text="Production",
+            scale=0.04,
+            pos=(-0.4, 0, y_pos - 0.23),
+            parent=self.frame,
+            frameColor=(0, 0, 0, 0),
+            text_fg=SPARK_COLORS[0],
+            text_align=TextNode.ALeft
+        )
+        self.production_chart = Sparkline(self.frame, (-0.4, 0, y_pos - 0.38), 0.8, 0.1, SPARK_COLORS[0])
+
     def update(self, turn, stats):
         self.turn_label["text"] = f"Turn: {turn}"
         self.settlements_label["text"] = f"Settlements: {stats['settlements']}"
@@ -69,6 +126,14 @@ class HUD:
             if b_type in self.building_labels:
                 self.building_labels[b_type]["text"] = f"{name}: {count}"
 
+        if self.series:
+            stock = self.series.world_series()
+            self.stock_chart.set(stock)
+            self.production_chart.set(self.series.world_series(production=True))
+            if len(stock):
+                self.stock_label["text"] = f"Stock, {len(stock)} turns"
+                self.production_label["text"] = f"Production, {len(stock)} turns"
+
     def toggle_visibility(self):
         if self.frame.is_hidden():
             self.frame.show()
@@ -76,10 +141,11 @@ class HUD:
             self.frame.hide()
 
 class BuildingInfoUI:
-    def __init__(self, parent):
+    def __init__(self, parent, series=None):
+        self.series = series
         self.frame = DirectFrame(
             frameColor=(0, 0, 0, 0.8),
-            frameSize=(-0.4, 0.4, -0.5, 0.5),
+            frameSize=(-0.4, 0.4, -0.85, 0.5),
             pos=(1.1, 0, 0.3),
             parent=parent
         )
@@ -162,6 +228,21 @@ class BuildingInfoUI:
             text_align=TextNode.ALeft
         )
 
+        # Inventory history of the building's main resources, and its settlement's total stock
+        self.history_title = DirectLabel(
+            text="History:",
+            scale=0.045,
+            pos=(-0.35, 0, -0.55),
+            parent=self.frame,
+            frameColor=(0, 0, 0, 0),
+            text_fg=(1, 1, 0.7, 1),
+            text_align=TextNode.ALeft
+        )
+        self.resource_charts = [Sparkline(self.frame, (-0.35, 0, -0.7), 0.7, 0.1, color) for color in SPARK_COLORS]
+        self.settlement_chart = Sparkline(self.frame, (-0.35, 0, -0.82), 0.7, 0.08, (1, 1, 1, 0.8))
+        if not series:
+            self.history_title.hide()
+
         self.current_building = None
 
     def show(self, building, config):
@@ -197,3 +278,14 @@ class BuildingInfoUI:
         # Inventory
         inv_text = "\n".join([f"{res.name}: {amt}" for res, amt in b.inventory.items() if amt != 0])
         self.inv_label["text"] = inv_text if inv_text else "Empty"
+
+        if self.series:
+            # Produced resources first, then whatever else it holds
+            shown = list(prod) + [res for res, amt in b.inventory.items() if amt and res not in prod]
+            shown = shown[:len(self.resource_charts)]
+            for i, chart in enumerate(self.resource_charts):
+                chart.set(self.series.building_series(b, shown[i]) if i < len(shown) else [])
+            self.settlement_chart.set(self.series.settlement_series(b.settlement) if b.settlement else [])
+            names = ", ".join(res.name.lower() for res in shown)
+            settlement = " + settlement stock" if b.settlement else ""
+            self.history_title["text"] = f"History: {names or 'no stock'}{settlement}"